@@ -3,9 +3,16 @@ Models for contentstore
 """
 # pylint: disable=no-member
 
+import json
+
+from django.db import models
 from django.db.models.fields import TextField
+from django.dispatch import receiver
 
 from config_models.models import ConfigurationModel
+from xmodule.modulestore.courseware_index import CoursewareSearchIndexer
+from xmodule.modulestore.django import SignalHandler
+from xmodule_django.models import CourseKeyField
 
 
 class VideoUploadConfig(ConfigurationModel):
@@ -19,3 +26,39 @@ class VideoUploadConfig(ConfigurationModel):
     def get_profile_whitelist(cls):
         """Get the list of profiles to include in the encoding download"""
         return [profile for profile in cls.current().profile_whitelist.split(",") if profile]
+
+
+class CoursewareSearchIndexState(models.Model):
+    """
+    What was last sent to the courseware search index for a course, so that the next indexing
+    only has to send what has changed since.
+    """
+    course_key = CourseKeyField(max_length=255, unique=True)
+    # JSON object mapping the id of each indexed document to the version of the item it was indexed at
+    indexed_versions = TextField(default="{}")
+
+    @classmethod
+    def get_indexed_versions(cls, course_key):
+        """Get the indexed versions last recorded for course_key, or None if there are none"""
+        try:
+            return json.loads(cls.objects.get(course_key=course_key).indexed_versions)
+        except cls.DoesNotExist:
+            return None
+
+    @classmethod
+    def set_indexed_versions(cls, course_key, indexed_versions):
+        """Record the indexed versions for course_key"""
+        state, __ = cls.objects.get_or_create(course_key=course_key)
+        state.indexed_versions = json.dumps(indexed_versions)
+        state.save()
+
+
+@receiver(SignalHandler.course_published)
+def listen_for_course_publish(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Update the courseware search index for the published course in a celery task
+    """
+    # import here, because the task module imports the modulestore and much else besides
+    from contentstore.tasks import update_search_index
+    if CoursewareSearchIndexer.indexing_is_enabled():
+        update_search_index.delay(unicode(course_key))
@@ -4,16 +4,28 @@ This file contains celery tasks for contentstore views
 
 from celery.task import task
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils.translation import ugettext as _
 import json
 import logging
+import time
+from uuid import uuid4
 from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.courseware_index import CoursewareSearchIndexer, SearchIndexingError
 from xmodule.course_module import CourseFields
 
 from xmodule.modulestore.exceptions import DuplicateCourseError, ItemNotFoundError
 from course_action_state.models import CourseRerunState
+from contentstore.models import CoursewareSearchIndexState
 from contentstore.utils import initialize_permissions
 from opaque_keys.edx.keys import CourseKey
 
+# The lock on indexing a course expires in case whoever holds it dies before releasing it;
+# long runs renew it every SEARCH_INDEX_LOCK_RENEW_INTERVAL seconds
+SEARCH_INDEX_LOCK_EXPIRE = 60 * 10
+SEARCH_INDEX_LOCK_RENEW_INTERVAL = 60
+SEARCH_INDEX_RETRY_DELAY = 30
+
 
 @task()
 def rerun_course(source_course_key_string, destination_course_key_string, user_id, fields=None):
@@ -61,6 +73,99 @@ def rerun_course(source_course_key_string, destination_course_key_string, user_i
         return "exception: " + unicode(exc)
 
 
+def acquire_search_index_lock(course_key):
+    """
+    Mark the course as being indexed, so that two indexing runs can't interleave their
+    writes to the search index and to its CoursewareSearchIndexState.
+
+    Returns the token to renew and release the lock with if the course was not already
+    being indexed; None if it was.
+    """
+    token = uuid4().hex
+    # cache.add fails if the key already exists
+    if cache.add(_search_index_lock_key(course_key), token, SEARCH_INDEX_LOCK_EXPIRE):
+        return token
+    return None
+
+
+def renew_search_index_lock(course_key, token):
+    """
+    Extend the lock on indexing the course, held with token, for another SEARCH_INDEX_LOCK_EXPIRE
+    seconds.
+
+    Raises SearchIndexingError if the lock expired and was taken by another run meanwhile, as
+    the run holding token must then stop without writing what it has indexed.
+    """
+    # The cache has no compare-and-set, so there's a small window between checking the token and
+    # writing it, but only after the lock has been lost already by running longer than it lasts.
+    key = _search_index_lock_key(course_key)
+    if cache.get(key) != token:
+        raise SearchIndexingError(
+            _('Lost the lock on indexing the course'),
+            [_('The course was being indexed for too long, please try again shortly')]
+        )
+    cache.set(key, token, SEARCH_INDEX_LOCK_EXPIRE)
+
+
+def search_index_lock_renewer(course_key, token):
+    """
+    Returns a function to call often during a run holding the lock on indexing the course, which
+    renews the lock every SEARCH_INDEX_LOCK_RENEW_INTERVAL seconds (see renew_search_index_lock).
+    """
+    renewed_at = [time.time()]
+
+    def renew():
+        """Renew the lock, if it's due."""
+        now = time.time()
+        if now - renewed_at[0] >= SEARCH_INDEX_LOCK_RENEW_INTERVAL:
+            renew_search_index_lock(course_key, token)
+            renewed_at[0] = now
+    return renew
+
+
+def release_search_index_lock(course_key, token):
+    """
+    Unmark the course as being indexed, unless the lock held with token expired and was taken by
+    another run meanwhile.
+    """
+    key = _search_index_lock_key(course_key)
+    if cache.get(key) == token:
+        cache.delete(key)
+
+
+def _search_index_lock_key(course_key):
+    """The cache key of the lock on indexing course_key"""
+    return u"search-index-{}".format(course_key)
+
+
+@task(
+    default_retry_delay=SEARCH_INDEX_RETRY_DELAY,
+    max_retries=SEARCH_INDEX_LOCK_EXPIRE // SEARCH_INDEX_RETRY_DELAY,
+)
+def update_search_index(course_id):
+    """
+    Updates the courseware search index of a course with what has been published since it was last indexed.
+    """
+    course_key = CourseKey.from_string(course_id)
+    token = acquire_search_index_lock(course_key)
+    if token is None:
+        # The run holding the lock may have read the course before the publish which queued this
+        # one, so try again once it's done rather than dropping this one.
+        raise update_search_index.retry()
+    try:
+        indexed_versions = CoursewareSearchIndexer.index_course(
+            modulestore(),
+            course_key,
+            CoursewareSearchIndexState.get_indexed_versions(course_key),
+            heartbeat=search_index_lock_renewer(course_key, token),
+        )
+        if indexed_versions is not None:
+            renew_search_index_lock(course_key, token)
+            CoursewareSearchIndexState.set_indexed_versions(course_key, indexed_versions)
+    finally:
+        release_search_index_lock(course_key, token)
+
+
 def deserialize_fields(json_fields):
     fields = json.loads(json_fields)
     for field_name, value in fields.iteritems():
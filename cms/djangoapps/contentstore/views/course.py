@@ -34,6 +34,7 @@ from opaque_keys.edx.keys import CourseKey
 from openedx.core.djangoapps.course_groups.partition_scheme import get_cohorted_user_partition
 
 from django_future.csrf import ensure_csrf_cookie
+from contentstore.models import CoursewareSearchIndexState
 from contentstore.course_info_model import get_course_updates, update_course_updates, delete_course_update
 from contentstore.utils import (
     add_instructor,
@@ -60,7 +61,10 @@ from .component import (
     SPLIT_TEST_COMPONENT_TYPE,
     ADVANCED_COMPONENT_TYPES,
 )
-from contentstore.tasks import rerun_course
+from contentstore.tasks import (
+    rerun_course, acquire_search_index_lock, renew_search_index_lock, search_index_lock_renewer,
+    release_search_index_lock
+)
 from contentstore.views.entrance_exam import create_entrance_exam, delete_entrance_exam
 
 from .library import LIBRARIES_ENABLED
@@ -129,7 +133,22 @@ def reindex_course_and_check_access(course_key, user):
     """
     if not has_course_author_access(user, course_key):
         raise PermissionDenied()
-    return CoursewareSearchIndexer.do_course_reindex(modulestore(), course_key)
+    token = acquire_search_index_lock(course_key)
+    if token is None:
+        raise SearchIndexingError(
+            _('Course is already being indexed'),
+            [_('The course is already being indexed, please try again shortly')]
+        )
+    try:
+        indexed_versions = CoursewareSearchIndexer.do_course_reindex(
+            modulestore(), course_key, heartbeat=search_index_lock_renewer(course_key, token)
+        )
+        if indexed_versions is not None:
+            renew_search_index_lock(course_key, token)
+            CoursewareSearchIndexState.set_indexed_versions(course_key, indexed_versions)
+    finally:
+        release_search_index_lock(course_key, token)
+    return indexed_versions
 
 
 @login_required
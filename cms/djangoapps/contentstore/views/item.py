@@ -752,7 +752,7 @@ def create_xblock_info(xblock, data=None, metadata=None, include_ancestor_info=F
     # this should not be calculated for Sections and Subsections on Unit page or for library blocks
     has_changes = None
     if (is_xblock_unit or course_outline) and not is_library_block:
-        has_changes = modulestore().has_changes(xblock)
+        has_changes = _has_changes(xblock, course_outline)
 
     if graders is None:
         if not is_library_block:
@@ -831,6 +831,19 @@ def create_xblock_info(xblock, data=None, metadata=None, include_ancestor_info=F
     return xblock_info
 
 
+def _has_changes(xblock, course_outline):
+    """
+    Returns whether the xblock has unpublished changes. For the course outline, which asks this of every
+    section, subsection and unit, rather than diffing each xblock's subtree, looks it up in the course's set
+    of blocks with changes, which the modulestore computes once per request. Computing that set costs more
+    than diffing the subtree of a single unit, so other pages ask the modulestore about the xblock itself.
+    """
+    if not course_outline:
+        return modulestore().has_changes(xblock)
+    blocks_with_changes = modulestore().get_blocks_with_changes(xblock.location.course_key)
+    return xblock.location.version_agnostic().for_branch(None) in blocks_with_changes
+
+
 def add_container_page_publishing_info(xblock, xblock_info):  # pylint: disable=invalid-name
     """
     Adds information about the xblock's publish state to the supplied
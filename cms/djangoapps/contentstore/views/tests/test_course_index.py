@@ -7,6 +7,11 @@ import datetime
 import os
 import mock
 
+from contentstore.models import CoursewareSearchIndexState
+from contentstore.tasks import (
+    update_search_index, acquire_search_index_lock, renew_search_index_lock, release_search_index_lock,
+    _search_index_lock_key,
+)
 from contentstore.tests.utils import CourseTestCase
 from contentstore.utils import reverse_course_url, reverse_library_url, add_instructor
 from student.auth import has_course_author_access
@@ -15,7 +20,7 @@ from contentstore.views.item import create_xblock_info, VisibilityState
 from course_action_state.models import CourseRerunState
 from util.date_utils import get_default_time_display
 from xmodule.modulestore import ModuleStoreEnum
-from xmodule.modulestore.courseware_index import CoursewareSearchIndexer
+from xmodule.modulestore.courseware_index import CoursewareSearchIndexer, DOCUMENT_TYPE
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory, LibraryFactory
@@ -24,6 +29,7 @@ from opaque_keys.edx.locator import CourseLocator
 from student.tests.factories import UserFactory
 from course_action_state.managers import CourseRerunUIStateManager
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 from search.api import perform_search
 import pytz
@@ -519,6 +525,61 @@ class TestCourseReIndex(CourseTestCase):
         with self.assertRaises(SearchIndexingError):
             reindex_course_and_check_access(self.course.id, self.user)
 
+    def test_reindex_while_indexing(self):
+        """
+        Test that the course can't be reindexed while it's being indexed, and can once that's done
+        """
+        token = acquire_search_index_lock(self.course.id)
+        self.assertIsNotNone(token)
+        try:
+            with self.assertRaises(SearchIndexingError):
+                reindex_course_and_check_access(self.course.id, self.user)
+        finally:
+            release_search_index_lock(self.course.id, token)
+
+        self.assertIn(unicode(self.html.location), reindex_course_and_check_access(self.course.id, self.user))
+
+    def test_update_search_index_while_indexing(self):
+        """
+        Test that the indexing task is retried, rather than run, while the course is being indexed
+        """
+        token = acquire_search_index_lock(self.course.id)
+        self.assertIsNotNone(token)
+        try:
+            with mock.patch.object(update_search_index, 'retry', return_value=Exception('retry')):
+                with mock.patch.object(CoursewareSearchIndexer, 'index_course') as mock_index_course:
+                    with self.assertRaisesRegexp(Exception, 'retry'):
+                        update_search_index(unicode(self.course.id))
+                    self.assertFalse(mock_index_course.called)
+        finally:
+            release_search_index_lock(self.course.id, token)
+
+        # and the task releases the lock once it's done
+        update_search_index(unicode(self.course.id))
+        token = acquire_search_index_lock(self.course.id)
+        self.assertIsNotNone(token)
+        release_search_index_lock(self.course.id, token)
+
+    def test_lost_search_index_lock(self):
+        """
+        Test that a run whose lock expired and was taken by another run neither renews nor releases it
+        """
+        token = acquire_search_index_lock(self.course.id)
+        renew_search_index_lock(self.course.id, token)
+        # the lock expires, and another run takes it
+        cache.delete(_search_index_lock_key(self.course.id))
+        other_token = acquire_search_index_lock(self.course.id)
+        self.assertIsNotNone(other_token)
+
+        with self.assertRaises(SearchIndexingError):
+            renew_search_index_lock(self.course.id, token)
+        release_search_index_lock(self.course.id, token)
+        self.assertIsNone(acquire_search_index_lock(self.course.id))
+        release_search_index_lock(self.course.id, other_token)
+        token = acquire_search_index_lock(self.course.id)
+        self.assertIsNotNone(token)
+        release_search_index_lock(self.course.id, token)
+
     def test_reindex_no_permissions(self):
         # register a non-staff member and try to delete the course branch
         user2 = UserFactory()
@@ -539,15 +600,15 @@ class TestCourseReIndex(CourseTestCase):
         self.assertEqual(response['results'], [])
 
         # Start manual reindex
-        errors = CoursewareSearchIndexer.do_course_reindex(modulestore(), self.course.id)
-        self.assertEqual(errors, None)
+        indexed_versions = CoursewareSearchIndexer.do_course_reindex(modulestore(), self.course.id)
+        self.assertIn(unicode(self.html.location), indexed_versions)
 
         self.html.display_name = "My expanded HTML"
         modulestore().update_item(self.html, ModuleStoreEnum.UserID.test)
 
         # Start manual reindex
-        errors = CoursewareSearchIndexer.do_course_reindex(modulestore(), self.course.id)
-        self.assertEqual(errors, None)
+        indexed_versions = CoursewareSearchIndexer.do_course_reindex(modulestore(), self.course.id)
+        self.assertIn(unicode(self.html.location), indexed_versions)
 
         # Check results indexed now
         response = perform_search(
@@ -558,6 +619,49 @@ class TestCourseReIndex(CourseTestCase):
             course_id=unicode(self.course.id))
         self.assertEqual(response['total'], 1)
 
+    def test_incremental_indexing(self):
+        """
+        Test that indexing again only sends the items changed since, and removes deleted ones
+        """
+        indexed_versions = CoursewareSearchIndexer.do_course_reindex(modulestore(), self.course.id)
+        html_id = unicode(self.html.location)
+
+        with mock.patch('search.tests.mock_search_engine.MockSearchEngine.index') as mock_index:
+            indexed_versions = CoursewareSearchIndexer.index_course(modulestore(), self.course.id, indexed_versions)
+        self.assertFalse(mock_index.called)
+
+        self.html.display_name = "My expanded HTML"
+        modulestore().update_item(self.html, ModuleStoreEnum.UserID.test)
+        modulestore().publish(self.html.location, ModuleStoreEnum.UserID.test)
+        with mock.patch('search.tests.mock_search_engine.MockSearchEngine.index') as mock_index:
+            indexed_versions = CoursewareSearchIndexer.index_course(modulestore(), self.course.id, indexed_versions)
+        self.assertEqual([call[0][1]['id'] for call in mock_index.call_args_list], [html_id])
+
+        modulestore().delete_item(
+            self.html.location, ModuleStoreEnum.UserID.test, revision=ModuleStoreEnum.RevisionOption.all
+        )
+        with mock.patch('search.tests.mock_search_engine.MockSearchEngine.remove') as mock_remove:
+            indexed_versions = CoursewareSearchIndexer.index_course(modulestore(), self.course.id, indexed_versions)
+        mock_remove.assert_called_once_with(DOCUMENT_TYPE, html_id)
+        self.assertNotIn(html_id, indexed_versions)
+
+    def test_publish_updates_index(self):
+        """
+        Test that publishing indexes the course in a task, and records what it indexed
+        """
+        self.html.display_name = "My expanded HTML"
+        modulestore().update_item(self.html, ModuleStoreEnum.UserID.test)
+        modulestore().publish(self.html.location, ModuleStoreEnum.UserID.test)
+
+        self.assertIn(unicode(self.html.location), CoursewareSearchIndexState.get_indexed_versions(self.course.id))
+        response = perform_search(
+            "unique",
+            user=self.user,
+            size=10,
+            from_=0,
+            course_id=unicode(self.course.id))
+        self.assertEqual(response['total'], 1)
+
     @mock.patch('xmodule.video_module.VideoDescriptor.index_dictionary')
     def test_indexing_video_error_responses(self, mock_index_dictionary):
         """
@@ -251,6 +251,8 @@ if AWS_SECRET_ACCESS_KEY == "":
 
 DATABASES = AUTH_TOKENS['DATABASES']
 MODULESTORE = convert_module_store_setting_if_needed(AUTH_TOKENS.get('MODULESTORE', MODULESTORE))
+SPLIT_STRUCTURE_CACHE_SIZE = ENV_TOKENS.get('SPLIT_STRUCTURE_CACHE_SIZE', SPLIT_STRUCTURE_CACHE_SIZE)
+STATIC_CONTENT_DISK_CACHE_DIR = ENV_TOKENS.get('STATIC_CONTENT_DISK_CACHE_DIR', STATIC_CONTENT_DISK_CACHE_DIR)
 CONTENTSTORE = AUTH_TOKENS['CONTENTSTORE']
 DOC_STORE_CONFIG = AUTH_TOKENS['DOC_STORE_CONFIG']
 # Datadog for events!
@@ -36,7 +36,8 @@ import lms.envs.common
 # Although this module itself may not use these imported variables, other dependent modules may.
 from lms.envs.common import (
     USE_TZ, TECH_SUPPORT_EMAIL, PLATFORM_NAME, BUGS_EMAIL, DOC_STORE_CONFIG, ALL_LANGUAGES, WIKI_ENABLED, MODULESTORE,
-    update_module_store_settings, ASSET_IGNORE_REGEX, COPYRIGHT_YEAR
+    SPLIT_STRUCTURE_CACHE_SIZE, STATIC_CONTENT_DISK_CACHE_DIR, update_module_store_settings, ASSET_IGNORE_REGEX,
+    COPYRIGHT_YEAR
 )
 from path import path
 from warnings import simplefilter
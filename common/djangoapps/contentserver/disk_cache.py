@@ -0,0 +1,96 @@
+"""
+A local disk cache for assets too large to keep in memcached.
+
+Files are keyed by the asset's location and last modified time, so replacing an asset
+never serves stale content; files of replaced assets are simply no longer read and can
+be pruned by age (e.g., with tmpwatch).
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+
+from xmodule.contentstore.content import StaticContentStream
+
+log = logging.getLogger(__name__)
+
+
+def _cache_dir():
+    """
+    Returns the configured cache directory, or None if the disk cache is disabled.
+    """
+    return getattr(settings, 'STATIC_CONTENT_DISK_CACHE_DIR', None)
+
+
+def disk_cache_enabled():
+    """
+    Returns whether a disk cache directory is configured.
+    """
+    return _cache_dir() is not None
+
+
+def _cache_path(cache_dir, content):
+    """
+    Returns the path of the file caching content.
+    """
+    key = u'{}@{}'.format(content.location, content.last_modified_at.isoformat())
+    return os.path.join(cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+
+def _from_file(content, path):
+    """
+    Returns a copy of content which streams its data from the file at path.
+    """
+    return StaticContentStream(
+        content.location, content.name, content.content_type, open(path, 'rb'),
+        last_modified_at=content.last_modified_at, thumbnail_location=content.thumbnail_location,
+        import_path=content.import_path, length=content.length, locked=content.locked,
+        content_digest=getattr(content, 'content_digest', None)
+    )
+
+
+def get_disk_cached_content(content):
+    """
+    Given a StaticContentStream (whose metadata has been read but not its data), returns
+    an equivalent StaticContentStream reading from the disk cache, or None if it's not cached
+    there (or the disk cache is disabled).
+    """
+    cache_dir = _cache_dir()
+    if cache_dir is None:
+        return None
+    try:
+        return _from_file(content, _cache_path(cache_dir, content))
+    except IOError:
+        return None
+
+
+def set_disk_cached_content(content):
+    """
+    Write the data of the StaticContentStream content to the disk cache and returns an
+    equivalent StaticContentStream reading from the cached file. Returns None if the
+    disk cache is disabled or the file could not be written.
+    """
+    cache_dir = _cache_dir()
+    if cache_dir is None:
+        return None
+    path = _cache_path(cache_dir, content)
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        # write to a temporary file and rename it so that readers never see a partial file
+        handle, temp_path = tempfile.mkstemp(dir=cache_dir)
+        try:
+            with os.fdopen(handle, 'wb') as temp_file:
+                for chunk in content.stream_data():
+                    temp_file.write(chunk)
+            os.rename(temp_path, path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+        return _from_file(content, path)
+    except (IOError, OSError):
+        log.exception(u"Could not write %s to the static content disk cache", content.location)
+        return None
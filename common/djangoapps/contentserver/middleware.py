@@ -2,15 +2,19 @@
 Middleware to serve assets.
 """
 
+import calendar
 import logging
+from datetime import datetime
+from uuid import uuid4
 
 from django.http import (
     HttpResponse, HttpResponseNotModified, HttpResponseForbidden
 )
+from django.utils.http import http_date, parse_http_date_safe
 from student.models import CourseEnrollment
 
 from xmodule.assetstore.assetmgr import AssetManager
-from xmodule.contentstore.content import StaticContent, XASSET_LOCATION_TAG
+from xmodule.contentstore.content import StaticContent, StaticContentStream, XASSET_LOCATION_TAG
 from xmodule.modulestore import InvalidLocationError
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.locator import AssetLocator
@@ -18,11 +22,16 @@ from cache_toolbox.core import get_cached_content, set_cached_content
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.exceptions import NotFoundError
 
+from contentserver.disk_cache import disk_cache_enabled, get_disk_cached_content, set_disk_cached_content
+
 # TODO: Soon as we have a reasonable way to serialize/deserialize AssetKeys, we need
 # to change this file so instead of using course_id_partial, we're just using asset keys
 
 log = logging.getLogger(__name__)
 
+# assets at least this large are too big for memcached; they're cached on local disk instead if configured
+MEMCACHED_MAX_CONTENT_LENGTH = 1048576
+
 
 class StaticContentServer(object):
     def process_request(self, request):
@@ -53,7 +62,7 @@ class StaticContentServer(object):
                 # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
                 # this is because I haven't been able to find a means to stream data out of memcached
                 if content.length is not None:
-                    if content.length < 1048576:
+                    if content.length < MEMCACHED_MAX_CONTENT_LENGTH:
                         # since we've queried as a stream, let's read in the stream into memory to set in cache
                         content = content.copy_to_in_mem()
                         set_cached_content(content)
@@ -75,16 +84,32 @@ class StaticContentServer(object):
                     ):
                         return HttpResponseForbidden('Unauthorized')
 
-            # convert over the DB persistent last modified timestamp to a HTTP compatible
-            # timestamp, so we can simply compare the strings
-            last_modified_at_str = content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
+            # convert over the DB persistent last modified timestamp to a HTTP compatible timestamp
+            last_modified_at = calendar.timegm(content.last_modified_at.utctimetuple())
+            last_modified_at_str = http_date(last_modified_at)
+
+            # the md5 GridFS keeps for each file makes a strong validator
+            content_digest = getattr(content, 'content_digest', None)
+            etag = '"{}"'.format(content_digest) if content_digest else None
 
             # see if the client has cached this content, if so then compare the
-            # timestamps, if they are the same then just return a 304 (Not Modified)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
-                if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
-                if if_modified_since == last_modified_at_str:
-                    return HttpResponseNotModified()
+            # validators, if they match then just return a 304 (Not Modified)
+            if is_not_modified(request, etag, last_modified_at):
+                response = HttpResponseNotModified()
+                response['Last-Modified'] = last_modified_at_str
+                if etag:
+                    response['ETag'] = etag
+                return response
+
+            # serve large assets from the local disk cache rather than from GridFS
+            if isinstance(content, StaticContentStream) and disk_cache_enabled():
+                cached_content = get_disk_cached_content(content) or set_disk_cached_content(content)
+                content.close()
+                if cached_content is None:
+                    # failing to write to the disk cache may have consumed some of the stream
+                    content = AssetManager.find(loc, as_stream=True)
+                else:
+                    content = cached_content
 
             # *** File streaming within a byte range ***
             # If a Range is provided, parse Range attribute of the request
@@ -94,10 +119,6 @@ class StaticContentServer(object):
             # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35
             response = None
             if request.META.get('HTTP_RANGE'):
-                # Data from cache (StaticContent) has no easy byte management, so we use the DB instead (StaticContentStream)
-                if type(content) == StaticContent:
-                    content = AssetManager.find(loc, as_stream=True)
-
                 header_value = request.META['HTTP_RANGE']
                 try:
                     unit, ranges = parse_range_header(header_value, content.length)
@@ -110,43 +131,113 @@ class StaticContentServer(object):
                     if unit != 'bytes':
                         # Only accept ranges in bytes
                         log.warning(u"Unknown unit in Range header: %s for content: %s", header_value, unicode(loc))
-                    elif len(ranges) > 1:
-                        # According to Http/1.1 spec content for multiple ranges should be sent as a multipart message.
-                        # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
-                        # But we send back the full content.
-                        log.warning(
-                            u"More than 1 ranges in Range header: %s for content: %s", header_value, unicode(loc)
-                        )
                     else:
-                        first, last = ranges[0]
-
-                        if 0 <= first <= last < content.length:
-                            # If the byte range is satisfiable
-                            response = HttpResponse(content.stream_data_in_range(first, last))
+                        ranges = [(first, last) for first, last in ranges if 0 <= first <= last < content.length]
+                        if not ranges:
+                            log.warning(
+                                u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
+                            )
+                            if isinstance(content, StaticContentStream):
+                                content.close()
+                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                        elif len(ranges) == 1:
+                            first, last = ranges[0]
+                            response = HttpResponse(_closing(content, content.stream_data_in_range(first, last)))
                             response['Content-Range'] = 'bytes {first}-{last}/{length}'.format(
                                 first=first, last=last, length=content.length
                             )
                             response['Content-Length'] = str(last - first + 1)
-                            response.status_code = 206  # Partial Content
+                            response['Content-Type'] = content.content_type
                         else:
-                            log.warning(
-                                u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
-                            )
-                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                            # Content for multiple ranges is sent as a multipart message.
+                            # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
+                            response = multipart_byteranges_response(content, ranges)
+                        response.status_code = 206  # Partial Content
 
             # If Range header is absent or syntactically invalid return a full content response.
             if response is None:
-                response = HttpResponse(content.stream_data())
+                response = HttpResponse(_closing(content, content.stream_data()))
                 response['Content-Length'] = content.length
+                response['Content-Type'] = content.content_type
 
             # "Accept-Ranges: bytes" tells the user that only "bytes" ranges are allowed
             response['Accept-Ranges'] = 'bytes'
-            response['Content-Type'] = content.content_type
             response['Last-Modified'] = last_modified_at_str
+            if etag:
+                response['ETag'] = etag
 
             return response
 
 
+def is_not_modified(request, etag, last_modified_at):
+    """
+    Returns whether the client's cached copy, as described by the request's If-None-Match or
+    If-Modified-Since header, is still current. If-None-Match takes precedence when present.
+    """
+    if 'HTTP_IF_NONE_MATCH' in request.META:
+        if etag is None:
+            return False
+        if_none_match = [tag.strip() for tag in request.META['HTTP_IF_NONE_MATCH'].split(',')]
+        return '*' in if_none_match or etag in if_none_match
+
+    if 'HTTP_IF_MODIFIED_SINCE' in request.META:
+        if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
+        # clients may still have the timestamp in the format we used to send
+        if if_modified_since == datetime.utcfromtimestamp(last_modified_at).strftime("%a, %d-%b-%Y %H:%M:%S GMT"):
+            return True
+        if_modified_since = parse_http_date_safe(if_modified_since)
+        return if_modified_since is not None and last_modified_at <= if_modified_since
+
+    return False
+
+
+def _closing(content, chunks):
+    """
+    Generates `chunks` of the data of content, then closes the stream content reads from,
+    if it has one. The stream is also closed if the response is closed part way through.
+    """
+    try:
+        for chunk in chunks:
+            yield chunk
+    finally:
+        if isinstance(content, StaticContentStream):
+            content.close()
+
+
+def multipart_byteranges_response(content, ranges):
+    """
+    Returns a multipart/byteranges response with the parts of content in ranges.
+    """
+    boundary = uuid4().hex
+    part_headers = [
+        '--{boundary}\r\nContent-Type: {content_type}\r\nContent-Range: bytes {first}-{last}/{length}\r\n\r\n'.format(
+            boundary=boundary, content_type=content.content_type, first=first, last=last, length=content.length
+        )
+        for first, last in ranges
+    ]
+    closing = '--{}--\r\n'.format(boundary)
+
+    def stream_parts():
+        """
+        Generate the message body
+        """
+        for part_header, (first, last) in zip(part_headers, ranges):
+            yield part_header
+            for chunk in content.stream_data_in_range(first, last):
+                yield chunk
+            yield '\r\n'
+        yield closing
+
+    response = HttpResponse(
+        _closing(content, stream_parts()), content_type='multipart/byteranges; boundary={}'.format(boundary)
+    )
+    response['Content-Length'] = str(
+        sum(len(part_header) + last - first + 1 + 2 for part_header, (first, last) in zip(part_headers, ranges)) +
+        len(closing)
+    )
+    return response
+
+
 def parse_range_header(header_value, content_length):
     """
     Returns the unit and a list of (start, end) tuples of ranges.
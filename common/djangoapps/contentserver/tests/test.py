@@ -4,7 +4,11 @@ Tests for StaticContentServer
 import copy
 import ddt
 import logging
+import os
+import shutil
 import unittest
+from mock import patch
+from tempfile import mkdtemp
 from uuid import uuid4
 
 from django.conf import settings
@@ -17,6 +21,7 @@ from opaque_keys.edx.locations import SlashSeparatedCourseKey
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore.xml_importer import import_from_xml
 
+from cache_toolbox.core import del_cached_content
 from contentserver.middleware import parse_range_header
 from student.models import CourseEnrollment
 
@@ -145,17 +150,89 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
 
     def test_range_request_multiple_ranges(self):
         """
-        Test that multiple ranges in request outputs the full content.
+        Test that multiple ranges in request outputs a multipart message with each range.
         """
         first_byte = self.length_unlocked / 4
         last_byte = self.length_unlocked / 2
-        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, -100'.format(
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, -10'.format(
             first=first_byte, last=last_byte)
         )
 
-        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
         self.assertNotIn('Content-Range', resp)
-        self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
+        self.assertTrue(resp['Content-Type'].startswith('multipart/byteranges; boundary='))
+        self.assertEqual(resp['Content-Length'], str(len(resp.content)))
+        for first, last in ((first_byte, last_byte), (self.length_unlocked - 10, self.length_unlocked - 1)):
+            self.assertIn(
+                'Content-Range: bytes {first}-{last}/{length}'.format(
+                    first=first, last=last, length=self.length_unlocked
+                ),
+                resp.content
+            )
+
+    def test_etag(self):
+        """
+        Test that assets have an ETag and that requests with a matching If-None-Match get a 304.
+        """
+        resp = self.client.get(self.url_unlocked)
+        md5 = self.contentstore.get_attr(self.unlocked_asset, 'md5')
+        self.assertEqual(resp['ETag'], '"{}"'.format(md5))
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"other", "{}"'.format(md5))
+        self.assertEqual(resp.status_code, 304)
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(resp.status_code, 200)
+
+    def test_if_modified_since(self):
+        """
+        Test that If-Modified-Since is compared as a date.
+        """
+        resp = self.client.get(self.url_unlocked)
+        resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE=resp['Last-Modified'])
+        self.assertEqual(resp.status_code, 304)
+        resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE='Sat, 01 Jan 2000 00:00:00 GMT')
+        self.assertEqual(resp.status_code, 200)
+
+    def test_disk_cache(self):
+        """
+        Test that assets too large for memcached are served from, and written to, the disk cache.
+        """
+        cache_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        del_cached_content(self.unlocked_asset)
+        expected = self.contentstore.find(self.unlocked_asset).data
+        with patch('contentserver.middleware.MEMCACHED_MAX_CONTENT_LENGTH', 0):
+            with override_settings(STATIC_CONTENT_DISK_CACHE_DIR=cache_dir):
+                for __ in range(2):
+                    resp = self.client.get(self.url_unlocked)
+                    self.assertEqual(resp.status_code, 200)
+                    self.assertEqual(resp.content, expected)
+                    self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+    def test_disk_cache_files_closed(self):
+        """
+        Test that files read from the disk cache are closed once they're served.
+        """
+        cache_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        del_cached_content(self.unlocked_asset)
+        opened = []
+
+        def tracking_open(*args):
+            """Open a file and remember it."""
+            opened_file = open(*args)
+            opened.append(opened_file)
+            return opened_file
+
+        with patch('contentserver.middleware.MEMCACHED_MAX_CONTENT_LENGTH', 0):
+            with override_settings(STATIC_CONTENT_DISK_CACHE_DIR=cache_dir):
+                with patch('contentserver.disk_cache.open', tracking_open, create=True):
+                    self.client.get(self.url_unlocked)
+                    self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-1')
+                    self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-1, -1')
+                    self.client.get(self.url_unlocked, HTTP_RANGE='bytes={}-'.format(self.length_unlocked))
+        self.assertEqual(len(opened), 4)
+        self.assertTrue(all(opened_file.closed for opened_file in opened))
 
     @ddt.data(
         'bytes 0-',
@@ -26,3 +26,14 @@ class BaseBackend(object):
     def send(self, event):
         """Send event to tracker."""
         pass
+
+    def send_batch(self, events):
+        """
+        Send a list of events to tracker.
+
+        Backends which can store several events at once more cheaply
+        than one at a time should override this.
+
+        """
+        for event in events:
+            self.send(event)
@@ -0,0 +1,179 @@
+"""
+Event tracker backend that queues events in memory and sends them to
+another backend in batches from a background thread, so that requests
+don't wait on the backend.
+
+Wrap any backend by configuring it as the `backend` option::
+
+  TRACKING_BACKENDS = {
+      'mongo': {
+          'ENGINE': 'track.backends.buffered.BufferedBackend',
+          'OPTIONS': {
+              'backend': {
+                  'ENGINE': 'track.backends.mongodb.MongoBackend',
+                  'OPTIONS': {...},
+              },
+              'flush_interval': 1,
+              'batch_size': 100,
+          }
+      }
+  }
+
+"""
+
+from __future__ import absolute_import
+
+import atexit
+import logging
+import os
+import Queue
+import threading
+import time
+
+from dogapi import dog_stats_api
+
+from track.backends import BaseBackend
+
+
+log = logging.getLogger(__name__)
+
+# seconds between checks, while waiting for events, of whether the backend is closing
+STOP_POLL_INTERVAL = 0.1
+
+
+class BufferedBackend(BaseBackend):
+    """Event tracker backend that sends events to another backend in batches"""
+
+    def __init__(self, backend, max_queue_size=10000, flush_interval=1, batch_size=100, block_timeout=0, **kwargs):
+        """
+        Wrap another event tracker backend.
+
+        :Parameters:
+
+          - `backend`: dictionary with the `ENGINE` and `OPTIONS` of the
+            backend which stores the events
+          - `max_queue_size`: number of events which can wait to be sent
+          - `flush_interval`: longest time, in seconds, an event waits for
+            its batch to fill up
+          - `batch_size`: largest number of events sent at once
+          - `block_timeout`: how long, in seconds, `send` waits for room
+            in a full queue before dropping the event; 0 drops it at once
+
+        """
+        super(BufferedBackend, self).__init__(**kwargs)
+
+        # imported here since the tracker initializes its backends on import
+        from track import tracker
+        self.backend = tracker._instantiate_backend_from_name(  # pylint: disable=protected-access
+            backend['ENGINE'], backend.get('OPTIONS', {})
+        )
+
+        self.max_queue_size = max_queue_size
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.block_timeout = block_timeout
+
+        # counters of events, for monitoring
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+
+        self._queue = Queue.Queue(max_queue_size)
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._flusher = None
+        self._pid = None
+
+        atexit.register(self.close)
+
+    def send(self, event):
+        """Queue the event to be sent by the flusher thread"""
+        self._ensure_flusher()
+        try:
+            self._queue.put(event, self.block_timeout > 0, self.block_timeout or None)
+        except Queue.Full:
+            self.dropped += 1
+            dog_stats_api.increment('track.buffered.dropped')
+            log.warning('Event tracker queue is full; dropping event')
+
+    def close(self):
+        """Send all queued events and stop the flusher thread"""
+        self._stopping.set()
+        with self._lock:
+            if self._pid != os.getpid():
+                self._forget_parent_queue()
+        if self._flusher is not None and self._flusher.is_alive():
+            self._flusher.join()
+        else:
+            # nothing is running to send what is queued, so send it now
+            batch = self._next_batch(block=False)
+            while batch:
+                self._flush(batch)
+                batch = self._next_batch(block=False)
+
+    def _ensure_flusher(self):
+        """Start the flusher thread, unless it's already running in this process"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # threads don't survive a fork
+                self._forget_parent_queue()
+                self._start_flusher()
+                self._pid = os.getpid()
+
+    def _forget_parent_queue(self):
+        """
+        Empty the queue if it was copied from the parent process by a fork,
+        since the parent sends the events queued in it.
+        """
+        if self._pid is not None:
+            self._queue = Queue.Queue(self.max_queue_size)
+
+    def _start_flusher(self):
+        """Start the thread which sends queued events"""
+        self._flusher = threading.Thread(target=self._run, name='track-buffered-flusher')
+        self._flusher.daemon = True
+        self._flusher.start()
+
+    def _run(self):
+        """Send queued events in batches until stopped and the queue is empty"""
+        while not (self._stopping.is_set() and self._queue.empty()):
+            self._flush(self._next_batch(block=not self._stopping.is_set()))
+
+    def _next_batch(self, block=True):
+        """
+        Take up to `batch_size` events from the queue, waiting up to
+        `flush_interval` for them if block is True.
+        """
+        batch = []
+        deadline = time.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                if block:
+                    timeout = deadline - time.time()
+                    if timeout <= 0:
+                        break
+                    # wake up regularly so that closing doesn't wait for the whole interval
+                    batch.append(self._queue.get(True, min(timeout, STOP_POLL_INTERVAL)))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except Queue.Empty:
+                if not block or self._stopping.is_set():
+                    break
+        return batch
+
+    def _flush(self, batch):
+        """Send a batch of events to the wrapped backend"""
+        if not batch:
+            return
+        try:
+            with dog_stats_api.timer('track.buffered.flush'):
+                self.backend.send_batch(batch)
+        except Exception:  # pylint: disable=broad-except
+            self.failed += len(batch)
+            dog_stats_api.increment('track.buffered.failed', len(batch))
+            log.exception('Error sending a batch of %d events to event tracker backend', len(batch))
+        else:
+            self.sent += len(batch)
+            dog_stats_api.increment('track.buffered.sent', len(batch))
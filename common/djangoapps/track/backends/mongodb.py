@@ -95,3 +95,13 @@ class MongoBackend(BaseBackend):
             # during the next event.
             msg = 'Error inserting to MongoDB event tracker backend'
             log.exception(msg)
+
+    def send_batch(self, events):
+        """
+        Insert the events in to the Mongo collection in one batch.
+
+        Unlike `send`, errors are raised, so that the caller (the buffered
+        backend) can count and log the events which may have been lost.
+        """
+        # continue_on_error so that one bad event doesn't lose the rest of the batch
+        self.collection.insert(events, manipulate=False, continue_on_error=True)
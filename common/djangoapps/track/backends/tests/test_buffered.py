@@ -0,0 +1,73 @@
+from __future__ import absolute_import
+
+from mock import patch
+
+from django.test import TestCase
+
+from track.backends import BaseBackend
+from track.backends.buffered import BufferedBackend
+
+
+class BatchRecordingBackend(BaseBackend):
+    """Backend which records the batches it was sent"""
+    def __init__(self, **kwargs):
+        super(BatchRecordingBackend, self).__init__(**kwargs)
+        self.batches = []
+
+    def send(self, event):
+        self.batches.append([event])
+
+    def send_batch(self, events):
+        self.batches.append(events)
+
+
+class TestBufferedBackend(TestCase):
+    def make_backend(self, **options):
+        backend = BufferedBackend(
+            backend={'ENGINE': 'track.backends.tests.test_buffered.BatchRecordingBackend'},
+            **options
+        )
+        self.addCleanup(backend.close)
+        return backend
+
+    def test_events_are_sent_in_batches(self):
+        backend = self.make_backend(batch_size=2, flush_interval=10)
+        events = [{'test': index} for index in range(5)]
+
+        for event in events:
+            backend.send(event)
+        backend.close()
+
+        self.assertEqual(sum(backend.backend.batches, []), events)
+        self.assertTrue(all(len(batch) <= 2 for batch in backend.backend.batches))
+        self.assertEqual(backend.sent, 5)
+
+    @patch.object(BufferedBackend, '_start_flusher')
+    def test_events_are_dropped_when_queue_is_full(self, _start_flusher):
+        backend = self.make_backend(max_queue_size=2)
+        events = [{'test': index} for index in range(3)]
+
+        for event in events:
+            backend.send(event)
+        self.assertEqual(backend.dropped, 1)
+
+        # closing sends what was queued even without a flusher thread
+        backend.close()
+        self.assertEqual(backend.backend.batches, [events[:2]])
+
+    def test_failed_batches_are_counted(self):
+        backend = self.make_backend()
+        with patch.object(backend.backend, 'send_batch', side_effect=Exception):
+            backend.send({'test': 1})
+            backend.close()
+        self.assertEqual((backend.sent, backend.failed), (0, 1))
+
+    @patch.object(BufferedBackend, '_start_flusher')
+    def test_forked_child_does_not_resend_parent_events(self, _start_flusher):
+        backend = self.make_backend()
+        with patch('track.backends.buffered.os.getpid', return_value=1):
+            backend.send({'test': 1})
+        # the forked child exits without sending any events of its own
+        with patch('track.backends.buffered.os.getpid', return_value=2):
+            backend.close()
+        self.assertEqual(backend.backend.batches, [])
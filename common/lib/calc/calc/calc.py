@@ -10,6 +10,7 @@ import numbers
 import numpy
 import scipy.constants
 import functions
+from lru_cache import LRUCache
 
 from pyparsing import (
     Word, Literal, CaselessLiteral, ZeroOrMore, MatchFirst, Optional, Forward,
@@ -61,6 +62,12 @@ DEFAULT_VARIABLES = {
     'q': scipy.constants.e  # Fund. Charge: 1.602176565e-19 (Coulombs)
 }
 
+# The default functions which take NumPy arrays and apply elementwise; any
+# other function is applied to arrays of samples one sample at a time.
+ARRAY_FUNCTIONS = frozenset(
+    func for func in DEFAULT_FUNCTIONS.values() if func is not math.factorial
+)
+
 # We eliminated the following extreme suffixes:
 #   P (1e15), E (1e18), Z (1e21), Y (1e24),
 #   f (1e-15), a (1e-18), z (1e-21), y (1e-24)
@@ -91,6 +98,14 @@ def lower_dict(input_dict):
     return {k.lower(): v for k, v in input_dict.iteritems()}
 
 
+def is_operand(token):
+    """
+    Return whether a processed parse result is a value (a number or an array
+    of samples) rather than an operator or a parenthesis.
+    """
+    return isinstance(token, (numbers.Number, numpy.ndarray))
+
+
 # The following few functions define evaluation actions, which are run on lists
 # of results from each parse component. They convert the strings and (previously
 # calculated) numbers into the number that component represents.
@@ -122,7 +137,7 @@ def eval_atom(parse_result):
     In the case of parenthesis, ignore them.
     """
     # Find first number in the list
-    result = next(k for k in parse_result if isinstance(k, numbers.Number))
+    result = next(k for k in parse_result if is_operand(k))
     return result
 
 
@@ -136,7 +151,7 @@ def eval_power(parse_result):
     # `reduce` will go from left to right; reverse the list.
     parse_result = reversed(
         [k for k in parse_result
-         if isinstance(k, numbers.Number)]  # Ignore the '^' marks.
+         if is_operand(k)]  # Ignore the '^' marks.
     )
     # Having reversed it, raise `b` to the power of `a`.
     power = reduce(lambda a, b: b ** a, parse_result)
@@ -162,6 +177,20 @@ def eval_parallel(parse_result):
     return 1. / sum(reciprocals)
 
 
+def eval_parallel_samples(parse_result):
+    """
+    Like `eval_parallel`, but the inputs may be arrays of samples.
+
+    The result is NaN for each sample where any of the inputs is zero.
+    """
+    if len(parse_result) == 1:
+        return parse_result[0]
+    operands = [e for e in parse_result if is_operand(e)]
+    has_zero = reduce(numpy.logical_or, [numpy.equal(e, 0) for e in operands])
+    result = 1. / sum(1. / e for e in operands)
+    return numpy.where(has_zero, float('nan'), result)
+
+
 def eval_sum(parse_result):
     """
     Add the inputs, keeping in mind their sign.
@@ -173,12 +202,12 @@ def eval_sum(parse_result):
     total = 0.0
     current_op = operator.add
     for token in parse_result:
-        if token == '+':
+        if is_operand(token):
+            total = current_op(total, token)
+        elif token == '+':
             current_op = operator.add
         elif token == '-':
             current_op = operator.sub
-        else:
-            total = current_op(total, token)
     return total
 
 
@@ -191,12 +220,12 @@ def eval_product(parse_result):
     prod = 1.0
     current_op = operator.mul
     for token in parse_result:
-        if token == '*':
+        if is_operand(token):
+            prod = current_op(prod, token)
+        elif token == '*':
             current_op = operator.mul
         elif token == '/':
             current_op = operator.truediv
-        else:
-            prod = current_op(prod, token)
     return prod
 
 
@@ -258,6 +287,174 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
     return math_interpreter.reduce_tree(evaluate_actions)
 
 
+def apply_to_samples(func, arg):
+    """
+    Apply a unary function to a number or to each sample in an array.
+    """
+    if func in ARRAY_FUNCTIONS or numpy.ndim(arg) == 0:
+        return func(arg)
+    return numpy.array([func(value) for value in arg])
+
+
+def sample_evaluator(variables, functions, math_expr, num_samples, case_sensitive=False):
+    """
+    Evaluate an expression for many samples of its variables at once.
+
+    -Variables are passed as a dictionary from string to value, where a value
+     is either a number or a NumPy array of `num_samples` samples.
+    -Unary functions are passed as a dictionary from string to function.
+
+    Return a NumPy array of the `num_samples` results; result `n` is what
+    `evaluator` returns for the `n`th sample of every variable. The expression
+    is parsed and checked once and then computed with array operations. If
+    that fails or gives NaN or infinity for some sample, the samples are
+    evaluated one at a time instead, so that errors are raised (and edge cases
+    handled) exactly as `evaluator` does.
+    """
+    # No need to go further.
+    if math_expr.strip() == "":
+        return numpy.repeat(float('nan'), num_samples)
+
+    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
+    math_interpreter.parse_algebra()
+
+    all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
+    math_interpreter.check_variables(all_variables, all_functions)
+
+    if case_sensitive:
+        casify = lambda x: x
+    else:
+        casify = lambda x: x.lower()  # Lowercase for case insens.
+
+    evaluate_actions = {
+        'number': eval_number,
+        'variable': lambda x: all_variables[casify(x[0])],
+        'function': lambda x: apply_to_samples(all_functions[casify(x[0])], x[1]),
+        'atom': eval_atom,
+        'power': eval_power,
+        'parallel': eval_parallel_samples,
+        'product': eval_product,
+        'sum': eval_sum
+    }
+
+    try:
+        with numpy.errstate(all='ignore'):
+            results = math_interpreter.reduce_tree(evaluate_actions)
+        # The expression may not depend on the sampled variables at all.
+        results = numpy.asarray(results)
+        if results.ndim == 0:
+            results = numpy.repeat(results, num_samples)
+        if numpy.all(numpy.isfinite(results)):
+            return results
+    except Exception:  # pylint: disable=broad-except
+        pass
+
+    # Evaluate with plain Python numbers, as the arrays' elements are NumPy
+    # scalars, which don't raise the same errors.
+    columns = dict(
+        (name, numpy.asarray(value).tolist() if numpy.ndim(value) else value)
+        for name, value in variables.iteritems()
+    )
+    return numpy.array([
+        evaluator(
+            dict(
+                (name, value[index] if isinstance(value, list) else value)
+                for name, value in columns.iteritems()
+            ),
+            functions,
+            math_expr,
+            case_sensitive
+        )
+        for index in xrange(num_samples)
+    ])
+
+
+def _build_grammar():
+    """
+    Build the pyparsing grammar for algebraic expressions.
+
+    Parse results have proper groupings to reflect parenthesis and order of
+    operations. All operators are left in the tree and no strings of numbers
+    are parsed into their float versions.
+    """
+    # 0.33 or 7 or .34 or 16.
+    number_part = Word(nums)
+    inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
+    # pyparsing allows spaces between tokens--`Combine` prevents that.
+    inner_number = Combine(inner_number)
+
+    # SI suffixes and percent.
+    number_suffix = MatchFirst(Literal(k) for k in SUFFIXES.keys())
+
+    # 0.33k or 17
+    plus_minus = Literal('+') | Literal('-')
+    number = Group(
+        Optional(plus_minus) +
+        inner_number +
+        Optional(CaselessLiteral("E") + Optional(plus_minus) + number_part) +
+        Optional(number_suffix)
+    )
+    number = number("number")
+
+    # Predefine recursive variables.
+    expr = Forward()
+
+    # Handle variables passed in. They must start with letters/underscores
+    # and may contain numbers afterward.
+    inner_varname = Word(alphas + "_", alphanums + "_")
+    varname = Group(inner_varname)("variable")
+
+    # Same thing for functions.
+    function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
+
+    atom = number | function | varname | "(" + expr + ")"
+    atom = Group(atom)("atom")
+
+    # Do the following in the correct order to preserve order of operation.
+    pow_term = atom + ZeroOrMore("^" + atom)
+    pow_term = Group(pow_term)("power")
+
+    par_term = pow_term + ZeroOrMore('||' + pow_term)  # 5k || 4k
+    par_term = Group(par_term)("parallel")
+
+    prod_term = par_term + ZeroOrMore((Literal('*') | Literal('/')) + par_term)  # 7 * 5 / 4
+    prod_term = Group(prod_term)("product")
+
+    sum_term = Optional(plus_minus) + prod_term + ZeroOrMore(plus_minus + prod_term)  # -5 + 4 - 3
+    sum_term = Group(sum_term)("sum")
+
+    # Finish the recursion.
+    expr << sum_term  # pylint: disable=pointless-statement
+    return expr + stringEnd
+
+
+# The grammar is the same for every expression, so build it once.
+GRAMMAR = _build_grammar()
+
+
+# Maps a math expression to its parse tree and the sets of variables and
+# functions it uses. Parse trees are never modified once built, so they can be
+# shared. Parsing doesn't depend on case sensitivity (only checking the
+# variables does), so the expression alone is the key.
+PARSE_CACHE = LRUCache(max_size=1000)
+
+
+def _collect_names(node, variables_used, functions_used):
+    """
+    Add the names of the variables and functions used in the parse tree
+    `node` to the given sets.
+    """
+    if not isinstance(node, ParseResults):
+        return
+    node_name = node.getName()
+    if node_name == 'variable':
+        variables_used.add(node[0])
+    elif node_name == 'function':
+        functions_used.add(node[0])
+    for child in node:
+        _collect_names(child, variables_used, functions_used)
+
+
 class ParseAugmenter(object):
     """
     Holds the data for a particular parse.
@@ -278,23 +475,6 @@ class ParseAugmenter(object):
         self.variables_used = set()
         self.functions_used = set()
 
-        def vpa(tokens):
-            """
-            When a variable is recognized, store it in `variables_used`.
-            """
-            varname = tokens[0][0]
-            self.variables_used.add(varname)
-
-        def fpa(tokens):
-            """
-            When a function is recognized, store it in `functions_used`.
-            """
-            varname = tokens[0][0]
-            self.functions_used.add(varname)
-
-        self.variable_parse_action = vpa
-        self.function_parse_action = fpa
-
     def parse_algebra(self):
         """
         Parse an algebraic expression into a tree.
@@ -302,62 +482,27 @@ class ParseAugmenter(object):
         Store a `pyparsing.ParseResult` in `self.tree` with proper groupings to
         reflect parenthesis and order of operations. Leave all operators in the
         tree and do not parse any strings of numbers into their float versions.
+        Record the names of the variables and functions used.
+
+        Parses are cached in `PARSE_CACHE`, so the tree may be shared with
+        other parses of the same expression and must not be modified.
 
         Adding the groups and result names makes the `repr()` of the result
         really gross. For debugging, use something like
           print OBJ.tree.asXML()
         """
-        # 0.33 or 7 or .34 or 16.
-        number_part = Word(nums)
-        inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
-        # pyparsing allows spaces between tokens--`Combine` prevents that.
-        inner_number = Combine(inner_number)
-
-        # SI suffixes and percent.
-        number_suffix = MatchFirst(Literal(k) for k in SUFFIXES.keys())
-
-        # 0.33k or 17
-        plus_minus = Literal('+') | Literal('-')
-        number = Group(
-            Optional(plus_minus) +
-            inner_number +
-            Optional(CaselessLiteral("E") + Optional(plus_minus) + number_part) +
-            Optional(number_suffix)
-        )
-        number = number("number")
-
-        # Predefine recursive variables.
-        expr = Forward()
-
-        # Handle variables passed in. They must start with letters/underscores
-        # and may contain numbers afterward.
-        inner_varname = Word(alphas + "_", alphanums + "_")
-        varname = Group(inner_varname)("variable")
-        varname.setParseAction(self.variable_parse_action)
-
-        # Same thing for functions.
-        function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
-        function.setParseAction(self.function_parse_action)
-
-        atom = number | function | varname | "(" + expr + ")"
-        atom = Group(atom)("atom")
-
-        # Do the following in the correct order to preserve order of operation.
-        pow_term = atom + ZeroOrMore("^" + atom)
-        pow_term = Group(pow_term)("power")
-
-        par_term = pow_term + ZeroOrMore('||' + pow_term)  # 5k || 4k
-        par_term = Group(par_term)("parallel")
-
-        prod_term = par_term + ZeroOrMore((Literal('*') | Literal('/')) + par_term)  # 7 * 5 / 4
-        prod_term = Group(prod_term)("product")
-
-        sum_term = Optional(plus_minus) + prod_term + ZeroOrMore(plus_minus + prod_term)  # -5 + 4 - 3
-        sum_term = Group(sum_term)("sum")
-
-        # Finish the recursion.
-        expr << sum_term  # pylint: disable=pointless-statement
-        self.tree = (expr + stringEnd).parseString(self.math_expr)[0]
+        entry = PARSE_CACHE.get(self.math_expr)
+        if entry is None:
+            tree = GRAMMAR.parseString(self.math_expr)[0]
+            variables_used = set()
+            functions_used = set()
+            _collect_names(tree, variables_used, functions_used)
+            entry = (tree, frozenset(variables_used), frozenset(functions_used))
+            PARSE_CACHE.set(self.math_expr, entry)
+
+        self.tree = entry[0]
+        self.variables_used = set(entry[1])
+        self.functions_used = set(entry[2])
 
     def reduce_tree(self, handle_actions, terminal_converter=None):
         """
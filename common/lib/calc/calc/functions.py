@@ -49,10 +49,9 @@ def arccot(val):
     """
     Inverse cotangent
     """
-    if numpy.real(val) < 0:
-        return -numpy.pi / 2 - numpy.arctan(val)
-    else:
-        return numpy.pi / 2 - numpy.arctan(val)
+    # Choose the branch elementwise, so that `val` can be an array of samples.
+    offset = numpy.where(numpy.real(val) < 0, -numpy.pi / 2, numpy.pi / 2)
+    return offset - numpy.arctan(val)
 
 
 # Hyperbolic Trig
@@ -559,3 +559,63 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({'r1': 5}, {}, "r1+r2")
         with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1 r3'):
             calc.evaluator(variables, {}, "r1*r3", case_sensitive=True)
+
+    def test_parse_cache(self):
+        """
+        Check that parses are cached and shared between evaluations
+        """
+        calc.PARSE_CACHE.clear()
+        first = calc.ParseAugmenter("x+f(y)")
+        first.parse_algebra()
+        second = calc.ParseAugmenter("x+f(y)", case_sensitive=True)
+        second.parse_algebra()
+        self.assertIs(first.tree, second.tree)
+        self.assertEqual(second.variables_used, set(['x', 'y']))
+        self.assertEqual(second.functions_used, set(['f']))
+
+        # the same parse evaluates with different variables
+        self.assertEqual(calc.evaluator({'x': 1, 'y': 2}, {'f': abs}, "x+f(y)"), 3)
+        self.assertEqual(calc.evaluator({'x': 2, 'y': -3}, {'f': abs}, "x+f(y)"), 5)
+
+    def assert_samples_match_evaluator(self, variables, math_expr):
+        """
+        Check that sample_evaluator gives what evaluator gives for each sample
+        """
+        num_samples = len(variables.values()[0])
+        results = calc.sample_evaluator(variables, {}, math_expr, num_samples)
+        self.assertEqual(len(results), num_samples)
+        for index in range(num_samples):
+            sample = dict((name, values[index]) for name, values in variables.iteritems())
+            expected = calc.evaluator(sample, {}, math_expr)
+            self.assertAlmostEqual(results[index], expected)
+
+    def test_sample_evaluator(self):
+        """
+        Check that sample_evaluator computes each sample like evaluator
+        """
+        variables = {'x': numpy.linspace(-2, 2, 9), 'y': numpy.linspace(0.5, 4.5, 9)}
+        self.assert_samples_match_evaluator(variables, "3*x^2 - x/y + 1")
+        self.assert_samples_match_evaluator(variables, "sin(x)*exp(-y) + sec(y) + arccot(x)")
+        self.assert_samples_match_evaluator(variables, "2k*x + 5%*y - 10m")
+        self.assert_samples_match_evaluator(variables, "x || y")
+        self.assert_samples_match_evaluator(variables, "(x+j*y)^2")
+        self.assert_samples_match_evaluator(variables, "fact(4) + pi")
+
+    def test_sample_evaluator_falls_back_to_evaluator(self):
+        """
+        Check that sample_evaluator handles special cases like evaluator
+        """
+        samples = numpy.array([1.0, 3.0, 0.0])
+        self.assertEqual(
+            calc.sample_evaluator({'x': samples}, {}, "fact(x)", 3).tolist(),
+            [1, 6, 1]
+        )
+        # parallel resistors are NaN if one of them is zero
+        results = calc.sample_evaluator({'x': samples}, {}, "x || 1", 3)
+        self.assertTrue(numpy.isnan(results[2]))
+        self.assertAlmostEqual(results[1], 0.75)
+
+        with self.assertRaisesRegexp(ValueError, 'factorial'):
+            calc.sample_evaluator({'x': numpy.array([1.0, 1.5])}, {}, "fact(x)", 2)
+        with self.assertRaises(calc.UndefinedVariable):
+            calc.sample_evaluator({'x': samples}, {}, "x + z", 3)
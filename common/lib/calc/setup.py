@@ -2,11 +2,12 @@ from setuptools import setup
 
 setup(
     name="calc",
-    version="0.2",
+    version="0.4",
     packages=["calc"],
     install_requires=[
         "pyparsing==2.0.1",
         "numpy",
-        "scipy"
+        "scipy",
+        "lru_cache",
     ],
 )
@@ -13,8 +13,10 @@ Main module which shows problems (of "capa" type).
 This is used by capa_module.
 """
 
+from collections import namedtuple
 from copy import deepcopy
 from datetime import datetime
+import hashlib
 import logging
 import os.path
 import re
@@ -23,6 +25,7 @@ from lxml import etree
 from pytz import UTC
 from xml.sax.saxutils import unescape
 
+from lru_cache import LRUCache
 from capa.correctmap import CorrectMap
 import capa.inputtypes as inputtypes
 import capa.customrender as customrender
@@ -58,6 +61,22 @@ html_problem_semantics = [
 
 log = logging.getLogger(__name__)
 
+
+# The part of a problem that doesn't depend on the student or the seed: the
+# problem text, its XML tree with includes processed, and the Python code of
+# its scripts with the path that code needs.  It also records the files the
+# problem includes and a hash of what they held, so that it's rebuilt when they
+# change.
+ProblemTemplate = namedtuple(
+    'ProblemTemplate', 'problem_text tree script_code python_path include_files include_digest'
+)
+
+
+# Templates are keyed by a hash of the problem XML and the root of the filestore
+# its includes and Python path are found in.  A template's tree is never
+# modified: each LoncapaProblem works on its own copy.
+TEMPLATE_CACHE = LRUCache(max_size=500)
+
 #-----------------------------------------------------------------------------
 # main class for this module
 
@@ -154,19 +173,14 @@ class LoncapaProblem(object):
         self.done = state.get('done', False)
         self.input_state = state.get('input_state', {})
 
-        # Convert startouttext and endouttext to proper <text></text>
-        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
-        problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
-        self.problem_text = problem_text
-
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
-
-        # handle any <include file="foo"> tags
-        self._process_includes()
+        # Parsing the XML and finding the scripts is the same for every
+        # student, so start from a copy of the problem's cached template.
+        template = self._get_template(problem_text)
+        self.problem_text = template.problem_text
+        self.tree = deepcopy(template.tree)
 
         # construct script processor context (eg for customresponse problems)
-        self.context = self._extract_context(self.tree)
+        self.context = self._extract_context(template.script_code, template.python_path)
 
         # Pre-parse the XML tree: modifies it to add ID's and perform some in-place
         # transformations.  This also creates the dict (self.responders) of Response
@@ -529,6 +543,66 @@ class LoncapaProblem(object):
 
     # ======= Private Methods Below ========
 
+    def _get_template(self, problem_text):
+        """
+        Return the ProblemTemplate for `problem_text`, from TEMPLATE_CACHE if
+        we've made it before.
+        """
+        root_path = getattr(self.capa_system.filestore, 'root_path', None)
+        md5er = hashlib.md5()
+        md5er.update(problem_text.encode('utf-8') if isinstance(problem_text, unicode) else problem_text)
+        key = (md5er.hexdigest(), root_path)
+
+        template = TEMPLATE_CACHE.get(key)
+        if template is not None and template.include_files:
+            if self._include_digest(template.include_files) != template.include_digest:
+                template = None
+
+        if template is None:
+            # Convert startouttext and endouttext to proper <text></text>
+            problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
+            problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
+
+            # parse problem XML file into an element tree
+            self.tree = etree.XML(problem_text)
+
+            # handle any <include file="foo"> tags
+            include_files = [
+                inc.get('file') for inc in self.tree.findall('.//include') if inc.get('file') is not None
+            ]
+            include_digest = self._include_digest(include_files)
+            self._process_includes()
+
+            script_code, python_path = self._extract_script_code(self.tree)
+            template = ProblemTemplate(
+                problem_text, self.tree, script_code, python_path, include_files, include_digest
+            )
+            TEMPLATE_CACHE.set(key, template)
+        return template
+
+    def _include_digest(self, filenames):
+        """
+        Return a hash of what the included files `filenames` hold, including
+        whether they could be opened at all.
+        """
+        md5er = hashlib.md5()
+        for filename in filenames:
+            try:
+                ifp = self.capa_system.filestore.open(filename)
+                try:
+                    contents = ifp.read()
+                finally:
+                    ifp.close()
+            except Exception:  # pylint: disable=broad-except
+                # _process_includes reports the error, if it's still there
+                md5er.update('missing\n')
+                continue
+            if isinstance(contents, unicode):
+                contents = contents.encode('utf-8')
+            md5er.update('found:{}\n'.format(len(contents)))
+            md5er.update(contents)
+        return md5er.hexdigest()
+
     def _process_includes(self):
         """
         Handle any <include file="foo"> tags by reading in the specified file and inserting it
@@ -613,17 +687,14 @@ class LoncapaProblem(object):
 
         return path
 
-    def _extract_context(self, tree):
+    def _extract_script_code(self, tree):
         """
-        Extract content of <script>...</script> from the problem.xml file, and exec it in the
-        context of this problem.  Provides ability to randomize problems, and also set
-        variables for problem answer checking.
+        Extract content of <script>...</script> from the problem.xml file, and the Python
+        path it needs.
 
-        Problem XML goes to Python execution context. Runs everything in script tags.
+        Returns the code of all the Python scripts, concatenated, and the list of
+        directories for the path.
         """
-        context = {}
-        context['seed'] = self.seed
-        context['anonymous_student_id'] = self.capa_system.anonymous_student_id
         all_code = ''
 
         python_path = []
@@ -646,6 +717,25 @@ class LoncapaProblem(object):
             code = unescape(script.text, XMLESC)
             all_code += code
 
+        return all_code, python_path
+
+    def _extract_context(self, all_code, python_path):
+        """
+        Exec the problem's script code, `all_code`, in the context of this problem.  Provides
+        ability to randomize problems, and also set variables for problem answer checking.
+
+        Problem XML goes to Python execution context. Runs everything in script tags.
+        """
+        context = {}
+        context['seed'] = self.seed
+        anonymous_student_id = self.capa_system.anonymous_student_id
+        # Code that doesn't use the student's id gets the same context for
+        # everyone with the same seed, so leave the id out of what safe_exec
+        # caches by.
+        if 'anonymous_student_id' in all_code:
+            context['anonymous_student_id'] = anonymous_student_id
+
+        python_path = list(python_path)
         extra_files = []
         if all_code:
             # An asset named python_lib.zip can be imported by Python code.
@@ -670,6 +760,8 @@ class LoncapaProblem(object):
                 msg = "Error while executing script code: %s" % str(err).replace('<', '&lt;')
                 raise responsetypes.LoncapaProblemError(msg)
 
+        context['anonymous_student_id'] = anonymous_student_id
+
         # Store code source in context, along with the Python path needed to run it correctly.
         context['script_code'] = all_code
         context['python_path'] = python_path
@@ -36,7 +36,7 @@ from shapely.geometry import Point, MultiPoint
 import dogstats_wrapper as dog_stats_api
 
 # specific library imports
-from calc import evaluator, UndefinedVariable
+from calc import evaluator, sample_evaluator, UndefinedVariable
 from . import correctmap
 from .registry import TagRegistry
 from datetime import datetime
@@ -2367,68 +2367,69 @@ class FormulaResponse(LoncapaResponse):
         )
         return CorrectMap(self.answer_id, correctness)
 
-    def tupleize_answers(self, answer, var_dict_list):
+    def tupleize_answers(self, answer, var_samples):
         """
-        Takes in an answer and a list of dictionaries mapping variables to values.
-        Each dictionary represents a test case for the answer.
-        Returns a tuple of formula evaluation results.
+        Takes in an answer and a dictionary mapping variables to arrays of
+        sample values, as returned by randomize_variables. Each sample
+        represents a test case for the answer.
+        Returns a list of formula evaluation results, one per test case.
         """
         _ = self.capa_system.i18n.ugettext
 
-        out = []
-        for var_dict in var_dict_list:
-            try:
-                out.append(evaluator(
-                    var_dict,
-                    dict(),
-                    answer,
-                    case_sensitive=self.case_sensitive,
-                ))
-            except UndefinedVariable as err:
+        num_samples = len(var_samples.itervalues().next())
+        try:
+            out = sample_evaluator(
+                var_samples,
+                dict(),
+                answer,
+                num_samples,
+                case_sensitive=self.case_sensitive,
+            ).tolist()
+        except UndefinedVariable as err:
+            log.debug(
+                'formularesponse: undefined variable in formula=%s',
+                cgi.escape(answer)
+            )
+            raise StudentInputError(
+                _("Invalid input: {bad_input} not permitted in answer.").format(bad_input=err.message)
+            )
+        except ValueError as err:
+            if 'factorial' in err.message:
+                # This is thrown when fact() or factorial() is used in a formularesponse answer
+                #   that tests on negative and/or non-integer inputs
+                # err.message will be: `factorial() only accepts integral values` or
+                # `factorial() not defined for negative values`
                 log.debug(
-                    'formularesponse: undefined variable in formula=%s',
+                    ('formularesponse: factorial function used in response '
+                     'that tests negative and/or non-integer inputs. '
+                     'Provided answer was: %s'),
                     cgi.escape(answer)
                 )
                 raise StudentInputError(
-                    _("Invalid input: {bad_input} not permitted in answer.").format(bad_input=err.message)
+                    _("factorial function not permitted in answer "
+                      "for this problem. Provided answer was: "
+                      "{bad_input}").format(bad_input=cgi.escape(answer))
                 )
-            except ValueError as err:
-                if 'factorial' in err.message:
-                    # This is thrown when fact() or factorial() is used in a formularesponse answer
-                    #   that tests on negative and/or non-integer inputs
-                    # err.message will be: `factorial() only accepts integral values` or
-                    # `factorial() not defined for negative values`
-                    log.debug(
-                        ('formularesponse: factorial function used in response '
-                         'that tests negative and/or non-integer inputs. '
-                         'Provided answer was: %s'),
-                        cgi.escape(answer)
-                    )
-                    raise StudentInputError(
-                        _("factorial function not permitted in answer "
-                          "for this problem. Provided answer was: "
-                          "{bad_input}").format(bad_input=cgi.escape(answer))
-                    )
-                # If non-factorial related ValueError thrown, handle it the same as any other Exception
-                log.debug('formularesponse: error %s in formula', err)
-                raise StudentInputError(
-                    _("Invalid input: Could not parse '{bad_input}' as a formula.").format(
-                        bad_input=cgi.escape(answer)
-                    )
+            # If non-factorial related ValueError thrown, handle it the same as any other Exception
+            log.debug('formularesponse: error %s in formula', err)
+            raise StudentInputError(
+                _("Invalid input: Could not parse '{bad_input}' as a formula.").format(
+                    bad_input=cgi.escape(answer)
                 )
-            except Exception as err:
-                # traceback.print_exc()
-                log.debug('formularesponse: error %s in formula', err)
-                raise StudentInputError(
-                    _("Invalid input: Could not parse '{bad_input}' as a formula").format(
-                        bad_input=cgi.escape(answer)
-                    )
+            )
+        except Exception as err:
+            # traceback.print_exc()
+            log.debug('formularesponse: error %s in formula', err)
+            raise StudentInputError(
+                _("Invalid input: Could not parse '{bad_input}' as a formula").format(
+                    bad_input=cgi.escape(answer)
                 )
+            )
         return out
 
     def randomize_variables(self, samples):
         """
-        Returns a list of dictionaries mapping variables to random values in range,
+        Returns a dictionary mapping variables to arrays of random values in range,
         as expected by tupleize_answers.
         """
         variables = samples.split('@')[0].split(',')
@@ -2437,15 +2438,12 @@ class FormulaResponse(LoncapaResponse):
                            samples.split('@')[1].split('#')[0].split(':')))
         ranges = dict(zip(variables, sranges))
 
-        out = []
-        for _ in range(numsamples):
-            var_dict = {}
-            # ranges give numerical ranges for testing
-            for var in ranges:
-                # TODO: allow specified ranges (i.e. integers and complex numbers) for random variables
-                value = random.uniform(*ranges[var])
-                var_dict[str(var)] = value
-            out.append(var_dict)
+        out = {}
+        # ranges give numerical ranges for testing
+        for var in ranges:
+            # TODO: allow specified ranges (i.e. integers and complex numbers) for random variables
+            low, high = ranges[var]
+            out[str(var)] = numpy.random.uniform(low, high, numsamples)
         return out
 
     def check_formula(self, expected, given, samples):
@@ -2454,9 +2452,9 @@ class FormulaResponse(LoncapaResponse):
         string, and a samples string, return whether the given answer is
         "correct" or "incorrect".
         """
-        var_dict_list = self.randomize_variables(samples)
-        student_result = self.tupleize_answers(given, var_dict_list)
-        instructor_result = self.tupleize_answers(expected, var_dict_list)
+        var_samples = self.randomize_variables(samples)
+        student_result = self.tupleize_answers(given, var_samples)
+        instructor_result = self.tupleize_answers(expected, var_samples)
 
         correct = all(compare_with_tolerance(student, instructor, self.tolerance)
                       for student, instructor in zip(student_result, instructor_result))
@@ -2476,9 +2474,9 @@ class FormulaResponse(LoncapaResponse):
         """
         Returns whether this answer is in a valid form.
         """
-        var_dict_list = self.randomize_variables(self.samples)
+        var_samples = self.randomize_variables(self.samples)
         try:
-            self.tupleize_answers(answer, var_dict_list)
+            self.tupleize_answers(answer, var_samples)
             return True
         except StudentInputError:
             return False
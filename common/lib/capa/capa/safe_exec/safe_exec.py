@@ -3,9 +3,12 @@
 from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
+from codejail.jail_code import is_configured
 from . import lazymod
+from . import sandbox_pool
 from dogapi import dog_stats_api
 
+import functools
 import hashlib
 
 # Establish the Python environment for Capa.
@@ -47,6 +50,17 @@ for name, modname in ASSUMED_IMPORTS:
 LAZY_IMPORTS = "".join(LAZY_IMPORTS)
 
 
+def configure_pool(size=4, max_uses=100, timeout=None):
+    """
+    Run code in a pool of warm sandbox processes which import the modules of
+    ASSUMED_IMPORTS up front.  See `sandbox_pool.configure`.
+    """
+    sandbox_pool.configure(
+        size=size, max_uses=max_uses, timeout=timeout,
+        preload=[modname for _, modname in ASSUMED_IMPORTS],
+    )
+
+
 def update_hash(hasher, obj):
     """
     Update a `hashlib` hasher with a nested object.
@@ -106,6 +120,9 @@ def safe_exec(
 
     If `unsafely` is true, then the code will actually be executed without sandboxing.
 
+    If `configure_pool` has been called, the code is run by one of the
+    pool's warm processes rather than a new one.
+
     """
     # Check the cache for a previous result.
     if cache:
@@ -127,8 +144,12 @@ def safe_exec(
     # Create the complete code we'll run.
     code_prolog = CODE_PROLOG % random_seed
 
-    # Decide which code executor to use.
-    if unsafely:
+    # Decide which code executor to use.  The pool can only sandbox code if
+    # codejail has been told how.
+    pool = sandbox_pool.get_pool()
+    if pool is not None and (unsafely or is_configured("python")):
+        exec_fn = functools.partial(pool.safe_exec, unsafely=unsafely)
+    elif unsafely:
         exec_fn = codejail_not_safe_exec
     else:
         exec_fn = codejail_safe_exec
@@ -0,0 +1,387 @@
+"""
+A pool of warm sandboxed Python processes for capa's safe_exec.
+
+codejail starts a new sandboxed Python for every execution, so each one pays
+for interpreter startup and for importing numpy and friends.  The processes in
+a pool are started once, import the modules capa code commonly uses, and then
+run code sent to them over a pipe.  See sandbox_worker.py for the other end.
+
+A worker is retired after `max_uses` executions, as soon as code it runs
+times out, or if its answer doesn't carry the nonce of the request it answers,
+and a fresh one is started in its place.
+
+"""
+
+import inspect
+import json
+import logging
+import os
+import os.path
+import select
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from codejail import jail_code
+from codejail.safe_exec import json_safe, SafeExecException
+
+log = logging.getLogger(__name__)
+
+# The program each worker runs: sandbox_worker.py, then codejail's json_safe.
+# A call of `main` with the modules to preload finishes it off.
+worker_py_file = os.path.join(os.path.dirname(__file__), "sandbox_worker.py")
+WORKER_PROGRAM = "".join([
+    open(worker_py_file).read(),
+    "\n\n",
+    inspect.getsource(json_safe),
+    "\n\n",
+])
+
+
+def read_chunk(stream, deadline=None):
+    """
+    Read one chunk of a worker's reply: a line with its length, then that many
+    bytes.  Returns None at end of stream.  If there's a `deadline` (a time.time()
+    value), raise WorkerTimeout if the chunk hasn't all arrived by then.
+    `stream` must be unbuffered.
+    """
+    fd = stream.fileno()
+
+    def read_some(size):
+        """Read up to `size` bytes, waiting until `deadline` for there to be some."""
+        if deadline is not None:
+            remaining = deadline - time.time()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                raise WorkerTimeout()
+        return os.read(fd, size)
+
+    # Read the length a byte at a time, so as not to read past the chunk.
+    header = ""
+    while not header.endswith("\n"):
+        char = read_some(1)
+        if not char:
+            return None
+        header += char
+    remaining_size = int(header)
+    data = []
+    while remaining_size > 0:
+        chunk = read_some(remaining_size)
+        if not chunk:
+            return None
+        data.append(chunk)
+        remaining_size -= len(chunk)
+    return "".join(data)
+
+
+def read_reply(stream, deadline=None):
+    """
+    Read a worker's reply to a request, as for `read_chunk`: the child's result,
+    in chunks up to an empty one, then the worker's status.  Returns the result
+    data and the status, or (None, None) at end of stream.
+    """
+    chunks = []
+    while True:
+        chunk = read_chunk(stream, deadline)
+        if chunk is None:
+            return None, None
+        if not chunk:
+            break
+        chunks.append(chunk)
+    status = read_chunk(stream, deadline)
+    if status is None:
+        return None, None
+    return "".join(chunks), json.loads(status)
+
+
+class WorkerTimeout(Exception):
+    """A worker didn't answer in time."""
+    pass
+
+
+def write_request(stream, nonce, timeout, request):
+    """Write a request: a header line of JSON, then the JSON of `request` for the worker's child."""
+    body = json.dumps(request)
+    header = json.dumps({"nonce": nonce, "timeout": timeout, "size": len(body)})
+    stream.write("%s\n%s" % (header, body))
+    stream.flush()
+
+
+class SandboxWorker(object):
+    """
+    One warm Python process, and the temp directory it runs in.
+
+    If `unsafely` is true, the process is the Python running this code, with
+    no sandbox and no limits.  Otherwise it's codejail's configured sandboxed
+    Python, run as codejail's sandbox user.
+
+    """
+    # Seconds past the time limit to wait for an answer before giving up on
+    # the process: enough for it to report a timeout of its own.
+    ANSWER_MARGIN = 5
+
+    def __init__(self, preload, unsafely=False):
+        self.unsafely = unsafely
+        self.uses = 0
+        # Set when the process stops answering.
+        self.broken = False
+
+        # Like codejail, give the process a directory it can read, with a
+        # "tmp" directory in it that it can write.
+        self.home = tempfile.mkdtemp(prefix="codejail-pool-")
+        os.chmod(self.home, 0775)
+        tmpdir = os.path.join(self.home, "tmp")
+        os.mkdir(tmpdir)
+        os.chmod(tmpdir, 0777)
+        with open(os.path.join(self.home, "sandbox_worker"), "w") as worker_py:
+            worker_py.write(WORKER_PROGRAM + "main(%r)\n" % (list(preload),))
+
+        cmd = []
+        if unsafely:
+            cmd.extend([sys.executable, "-E", "-B"])
+        else:
+            user = jail_code.COMMANDS["python"]["user"]
+            if user:
+                cmd.extend(["sudo", "-u", user, "TMPDIR=%s" % tmpdir])
+            cmd.extend(jail_code.COMMANDS["python"]["cmdline_start"])
+        cmd.append("sandbox_worker")
+
+        with open(os.devnull, "w") as devnull:
+            self.process = subprocess.Popen(
+                cmd, cwd=self.home, env={"TMPDIR": tmpdir}, close_fds=True, bufsize=0,
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=devnull,
+            )
+
+    def is_alive(self):
+        """Is the process still there to take requests?"""
+        return self.process.poll() is None
+
+    def close(self):
+        """Stop the process, and remove its directory."""
+        if self.is_alive():
+            try:
+                # The worker exits when its stdin closes.
+                self.process.stdin.close()
+                self.process.stdout.close()
+            except IOError:
+                pass
+            if self.unsafely:
+                # Our own child, so we can make sure.
+                self.process.kill()
+            if self.broken:
+                # It may be stopped, and not ours to kill, so don't wait for it.
+                self.process.poll()
+            else:
+                self.process.wait()
+        shutil.rmtree(self.home, ignore_errors=True)
+
+    def kill(self):
+        """Kill the process, as far as we're allowed to, because it stopped answering."""
+        self.broken = True
+        try:
+            self.process.kill()
+        except OSError:
+            pass
+
+    def execute(self, code, globals_dict, python_path, extra_files, limits, timeout):
+        """
+        Run `code` with the JSON-safe part of `globals_dict`.
+
+        `python_path` and `extra_files` are as for `safe_exec`.  `limits` is a
+        dict like codejail's LIMITS, or None for no limits.  Code still
+        running after `timeout` seconds is killed.
+
+        The worker enforces `timeout` itself, but the code it runs could stop
+        or hang it, so if no answer comes `ANSWER_MARGIN` seconds after that,
+        the worker is killed here.  It's killed too if its answer doesn't end
+        with the nonce sent with the request, since then its answers can't be
+        matched to requests any more.
+
+        Returns the worker's result: a dict with "globals" if the code ran, or
+        "error" if it didn't.
+
+        """
+        self.uses += 1
+
+        # The files the code needs go in a directory of their own.
+        directory = tempfile.mkdtemp(dir=self.home)
+        os.chmod(directory, 0775)
+        try:
+            extra_names = set(name for name, _ in extra_files)
+            for name, contents in extra_files:
+                with open(os.path.join(directory, name), "wb") as extra_file:
+                    extra_file.write(contents)
+
+            sys_path = []
+            for pydir in python_path:
+                pybase = os.path.basename(pydir)
+                sys_path.append(os.path.join(directory, pybase))
+                if pybase not in extra_names:
+                    if os.path.isdir(pydir):
+                        shutil.copytree(pydir, os.path.join(directory, pybase))
+                    else:
+                        shutil.copyfile(pydir, os.path.join(directory, pybase))
+
+            request = {
+                "code": code,
+                "globals": json_safe(globals_dict),
+                "python_path": sys_path,
+                "directory": directory,
+                "limits": limits,
+            }
+            nonce = uuid.uuid4().hex
+            try:
+                write_request(self.process.stdin, nonce, timeout, request)
+                deadline = time.time() + timeout + self.ANSWER_MARGIN if timeout else None
+                data, status = read_reply(self.process.stdout, deadline)
+            except WorkerTimeout:
+                self.kill()
+                return {"error": "sandboxed process stopped answering", "timed_out": True}
+            except (IOError, OSError, ValueError):
+                data = status = None
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        if status is None:
+            self.broken = True
+            return {"error": "sandboxed process exited unexpectedly"}
+        if status.get("nonce") != nonce:
+            self.kill()
+            return {"error": "sandboxed process answered out of turn"}
+        if "error" in status:
+            # The worker exits after an error of its own.
+            self.broken = True
+            return status
+        try:
+            return json.loads(data)
+        except ValueError:
+            self.broken = True
+            return {"error": "sandboxed process gave an unreadable result"}
+
+
+class SandboxPool(object):
+    """
+    Warm sandboxed processes, handed out to one execution at a time.
+
+    Up to `size` idle workers are kept for sandboxed execution, and as many
+    again for unsafe execution.  A worker is retired after `max_uses`
+    executions.  `timeout` is the number of seconds code can run, by default
+    codejail's REALTIME limit for sandboxed code, and unlimited for unsafe.
+    Each worker imports the `preload` modules before it runs any code.
+
+    """
+    def __init__(self, size=4, max_uses=100, timeout=None, preload=()):
+        self.size = size
+        self.max_uses = max_uses
+        self.timeout = timeout
+        self.preload = preload
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._idle = {False: [], True: []}
+
+    def warm(self, unsafely=False):
+        """Start workers until `size` of them are idle."""
+        with self._lock:
+            self._check_pid()
+            idle = self._idle[unsafely]
+            while len(idle) < self.size:
+                idle.append(SandboxWorker(self.preload, unsafely))
+
+    def close(self):
+        """Stop all the idle workers."""
+        with self._lock:
+            self._check_pid()
+            workers = self._idle[False] + self._idle[True]
+            self._idle = {False: [], True: []}
+        for worker in workers:
+            worker.close()
+
+    def _check_pid(self):
+        """Forget the workers of the process we were forked from.  Call with the lock held."""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle = {False: [], True: []}
+
+    def _checkout(self, unsafely):
+        """Take an idle worker from the pool, or start one if none are idle."""
+        with self._lock:
+            self._check_pid()
+            idle = self._idle[unsafely]
+            while idle:
+                worker = idle.pop()
+                if worker.is_alive():
+                    return worker
+                worker.close()
+        return SandboxWorker(self.preload, unsafely)
+
+    def _checkin(self, worker, retire):
+        """Give `worker` back to the pool, retiring it (and starting a replacement) if need be."""
+        if retire or worker.broken or worker.uses >= self.max_uses or not worker.is_alive():
+            worker.close()
+            # Starting a process doesn't wait for its imports, so it's cheap
+            # to get the replacement warming up now rather than on next use.
+            worker = SandboxWorker(self.preload, worker.unsafely)
+        with self._lock:
+            self._check_pid()
+            idle = self._idle[worker.unsafely]
+            if len(idle) < self.size:
+                idle.append(worker)
+                return
+        worker.close()
+
+    def safe_exec(self, code, globals_dict, python_path=None, extra_files=None, slug=None, unsafely=False):
+        """
+        Execute `code` in a worker, with the same interface as codejail's `safe_exec`.
+
+        Changes the code makes to the JSON-safe part of `globals_dict` are
+        visible in `globals_dict` when this returns.  If the code raises an
+        exception, or runs out of time, SafeExecException is raised.
+
+        """
+        if unsafely:
+            limits = None
+            timeout = self.timeout
+        else:
+            limits = dict(jail_code.LIMITS)
+            timeout = self.timeout or limits.get("REALTIME")
+
+        worker = self._checkout(unsafely)
+        result = {"timed_out": True}    # Retire the worker if execute blows up.
+        try:
+            result = worker.execute(
+                code, globals_dict, python_path or (), extra_files or (), limits, timeout,
+            )
+        finally:
+            self._checkin(worker, retire=result.get("timed_out"))
+
+        if "error" in result:
+            log.debug("Sandboxed code failed (%s): %s", slug, result["error"])
+            raise SafeExecException("Couldn't execute jailed code: %s" % result["error"])
+        globals_dict.update(result["globals"])
+
+
+# The pool safe_exec uses, if `configure` has been called.
+POOL = None
+
+
+def configure(size=4, max_uses=100, timeout=None, preload=()):
+    """
+    Make safe_exec run code in a pool of warm workers.  A `size` of 0 stops using a pool.
+
+    safe_exec's `configure_pool` calls this with the modules it assumes as `preload`.
+    """
+    global POOL  # pylint: disable=global-statement
+    if POOL is not None:
+        POOL.close()
+    if size:
+        POOL = SandboxPool(size=size, max_uses=max_uses, timeout=timeout, preload=preload)
+    else:
+        POOL = None
+
+
+def get_pool():
+    """The configured SandboxPool, or None."""
+    return POOL
@@ -0,0 +1,238 @@
+"""The program run by each process in a sandbox pool.
+
+This file isn't imported: sandbox_pool.py reads its source and runs it in the
+sandbox, followed by the source of codejail's `json_safe` and a call of
+`main`.  It uses only the standard library, since that's all we can count on
+in the sandbox.
+
+The worker imports the modules capa code commonly uses once, then reads
+requests from its stdin.  For each request it forks a child which runs the
+code with the request's limits, and writes the result to its stdout.  Running
+every request in a fresh child means no request sees what earlier ones did
+to the worker.
+
+The code a child runs has the same uid as the worker, so the worker guards
+what the child can reach:
+
+* The worker makes itself non-dumpable before anything else, so a child can't
+  open the worker's pipes or memory through /proc/<ppid>.
+
+* The worker never reads a request's code or globals, nor a result, into its
+  own memory, which every later child would inherit.  It reads only a small
+  header; the child reads the request itself, and the worker passes the
+  child's result on through one reused buffer which it clears afterwards.
+
+* Every request carries a nonce, which the worker echoes at the end of its
+  reply, so that the pool can tell if anything else has written to the pipe.
+
+A request is a header line of JSON with "nonce", "timeout" and "size", then
+`size` bytes of JSON for the child.  A reply is the child's result in chunks,
+each preceded by a line with its length, then an empty chunk, then a status:
+JSON preceded by a line with its length.
+
+"""
+
+import ctypes
+import io
+import json
+import os
+import resource
+import select
+import shutil
+import signal
+import sys
+import time
+import traceback
+
+
+# From <linux/prctl.h>.
+PR_SET_DUMPABLE = 4
+
+# The most the worker reads from a child at once.
+CHUNK_SIZE = 65536
+
+
+def make_non_dumpable():
+    """Stop processes of the same uid, like our children, from reading our memory or fds through /proc."""
+    if not sys.platform.startswith("linux"):
+        return
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.prctl(PR_SET_DUMPABLE, 0, 0, 0, 0) != 0:
+        raise OSError(ctypes.get_errno(), "prctl(PR_SET_DUMPABLE) failed")
+
+
+def read_header(fd):
+    """Read one line of JSON from fd, or None at end of file, without reading anything after it."""
+    chars = []
+    while True:
+        char = os.read(fd, 1)
+        if not char:
+            return None
+        if char == "\n":
+            return json.loads("".join(chars))
+        chars.append(char)
+
+
+def read_exactly(fd, size):
+    """Read `size` bytes from fd, or fewer at end of file."""
+    chunks = []
+    while size > 0:
+        chunk = os.read(fd, size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size -= len(chunk)
+    return "".join(chunks)
+
+
+def write_all(fd, data):
+    """Write all of `data`, a string or buffer, to fd."""
+    data = memoryview(data)
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def write_chunk(fd, data):
+    """Write `data`, a string or buffer, preceded by a line with its length."""
+    write_all(fd, "%d\n" % len(data))
+    write_all(fd, data)
+
+
+def set_limits(limits):
+    """Set the resource limits of the current process from codejail's LIMITS."""
+    # No subprocesses.
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+
+    # CPU seconds, not wall clock time.  A forked child starts from zero.
+    cpu = limits.get("CPU")
+    if cpu:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+
+    # Memory the code can use on top of what the warm worker already has.
+    vmem = limits.get("VMEM")
+    if vmem:
+        with open("/proc/self/statm") as statm:
+            current = int(statm.read().split()[0]) * resource.getpagesize()
+        resource.setrlimit(resource.RLIMIT_AS, (current + vmem, current + vmem))
+
+    # Size of written files.
+    fsize = limits.get("FSIZE")
+    if fsize:
+        resource.setrlimit(resource.RLIMIT_FSIZE, (fsize, fsize))
+
+
+def run_code(request_fd, size, result_fd, pool_fds):
+    """
+    Read a request of `size` bytes from request_fd and run its code, writing its
+    result to result_fd.  Runs in the forked child, which closes `pool_fds` once
+    it has the request, so that the code can't talk to the pool.
+    """
+    try:
+        request = json.loads(read_exactly(request_fd, size))
+        for fd in pool_fds:
+            os.close(fd)
+        if request["limits"] is not None:
+            set_limits(request["limits"])
+        os.chdir(request["directory"])
+        sys.path.extend(request["python_path"])
+        globals_dict = request["globals"]
+        exec request["code"] in globals_dict
+        result = {"globals": json_safe(globals_dict)}  # pylint: disable=undefined-variable
+    except BaseException:  # pylint: disable=broad-except
+        result = {"error": traceback.format_exc()}
+
+    write_all(result_fd, json.dumps(result))
+
+
+def execute(header, request_fd, result_fd, buf):
+    """
+    Run the request described by `header` in a forked child, passing its result
+    on to result_fd through `buf`, and return the status to end the reply with.
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            run_code(request_fd, header["size"], write_fd, [request_fd, result_fd])
+        finally:
+            os._exit(0)  # pylint: disable=protected-access
+    os.close(write_fd)
+
+    timeout = header["timeout"]
+    deadline = time.time() + timeout if timeout else None
+    child_output = io.FileIO(read_fd, "r")
+    wrote = False
+    timed_out = False
+    try:
+        while True:
+            wait = None if deadline is None else max(deadline - time.time(), 0)
+            ready, _, _ = select.select([read_fd], [], [], wait)
+            if not ready:
+                timed_out = True
+                os.kill(pid, signal.SIGKILL)
+                break
+            count = child_output.readinto(buf)
+            if not count:
+                break
+            write_chunk(result_fd, memoryview(buf)[:count])
+            wrote = True
+    finally:
+        buf[:] = bytearray(len(buf))
+        child_output.close()
+    write_chunk(result_fd, "")
+    _, status = os.waitpid(pid, 0)
+
+    if timed_out:
+        return {"error": "timed out after %s seconds" % timeout, "timed_out": True}
+    if not wrote:
+        return {"error": "sandboxed process exited with status %d" % status}
+    return {}
+
+
+def clean_temp_dir():
+    """Remove whatever the executed code left in the worker's temp directory."""
+    for name in os.listdir("tmp"):
+        path = os.path.join("tmp", name)
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def main(preload):
+    """Import the `preload` modules, then serve requests until stdin closes or a request goes wrong."""
+    make_non_dumpable()
+
+    # Keep the pipes to the pool for ourselves: the code we run gets nothing
+    # to read and anything it prints is thrown away.
+    request_fd = os.dup(0)
+    result_fd = os.dup(1)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+
+    for modname in preload:
+        try:
+            __import__(modname)
+        except Exception:  # pylint: disable=broad-except
+            # The code will get the error if it uses the module.
+            pass
+
+    buf = bytearray(CHUNK_SIZE)
+    while True:
+        header = read_header(request_fd)
+        if header is None:
+            break
+        status = execute(header, request_fd, result_fd, buf)
+        clean_temp_dir()
+        status["nonce"] = header["nonce"]
+        write_chunk(result_fd, json.dumps(status))
+        if "error" in status:
+            # Either the code timed out, and the pool won't trust the worker
+            # any more, or the child may have left some of its request unread.
+            # Either way, make way for a new worker.
+            break
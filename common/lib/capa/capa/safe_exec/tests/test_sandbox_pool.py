@@ -0,0 +1,136 @@
+"""Test sandbox_pool.py"""
+
+import os.path
+import sys
+import unittest
+
+from codejail.safe_exec import SafeExecException
+from mock import patch
+
+from capa.safe_exec import safe_exec, sandbox_pool, configure_pool
+from capa.safe_exec.safe_exec import ASSUMED_IMPORTS
+
+
+class TestSandboxPool(unittest.TestCase):
+    """Run code in a pool of unsandboxed workers."""
+
+    def setUp(self):
+        super(TestSandboxPool, self).setUp()
+        self.pool = sandbox_pool.SandboxPool(size=2, max_uses=3, timeout=5, preload=["math"])
+        self.addCleanup(self.pool.close)
+
+    def test_set_values(self):
+        g = {'a': 17}
+        self.pool.safe_exec("b = a + 1", g, unsafely=True)
+        self.assertEqual(g['b'], 18)
+
+    def test_raising_exceptions(self):
+        with self.assertRaises(SafeExecException) as cm:
+            self.pool.safe_exec("1/0", {}, unsafely=True)
+        self.assertIn("ZeroDivisionError", cm.exception.message)
+
+    def test_python_lib(self):
+        pylib = os.path.dirname(__file__) + "/test_files/pylib"
+        g = {}
+        self.pool.safe_exec("import constant; a = constant.THE_CONST", g, python_path=[pylib], unsafely=True)
+        self.assertEqual(g['a'], 23)
+
+    def test_extra_files(self):
+        g = {}
+        self.pool.safe_exec(
+            "a = open('data.txt').read()", g, extra_files=[("data.txt", "hello")], unsafely=True
+        )
+        self.assertEqual(g['a'], "hello")
+
+    def test_workers_are_reused(self):
+        g = {}
+        self.pool.safe_exec("import os; pid = os.getppid()", g, unsafely=True)
+        first_pid = g['pid']
+        self.pool.safe_exec("import os; pid = os.getppid()", g, unsafely=True)
+        self.assertEqual(g['pid'], first_pid)
+
+    def test_executions_dont_share_state(self):
+        g = {}
+        self.pool.safe_exec("import math; math.leftover = 1", g, unsafely=True)
+        self.pool.safe_exec("import math; a = hasattr(math, 'leftover')", g, unsafely=True)
+        self.assertFalse(g['a'])
+
+    def test_workers_are_recycled(self):
+        pids = set()
+        for _ in xrange(6):
+            g = {}
+            self.pool.safe_exec("import os; pid = os.getppid()", g, unsafely=True)
+            pids.add(g['pid'])
+        self.assertEqual(len(pids), 2)
+
+    def test_timeout(self):
+        self.pool.timeout = 0.5
+        with self.assertRaises(SafeExecException) as cm:
+            self.pool.safe_exec("while True: pass", {}, unsafely=True)
+        self.assertIn("timed out", cm.exception.message)
+
+        # The pool carries on with a new worker.
+        g = {}
+        self.pool.safe_exec("a = 1", g, unsafely=True)
+        self.assertEqual(g['a'], 1)
+
+    @patch.object(sandbox_pool.SandboxWorker, "ANSWER_MARGIN", 0.5)
+    def test_stopped_worker(self):
+        # The code stops the worker running it, so the worker can't time it out.
+        self.pool.timeout = 0.5
+        with self.assertRaises(SafeExecException) as cm:
+            self.pool.safe_exec("import os, signal; os.kill(os.getppid(), signal.SIGSTOP)", {}, unsafely=True)
+        self.assertIn("stopped answering", cm.exception.message)
+
+        # The pool carries on with a new worker.
+        g = {}
+        self.pool.safe_exec("a = 1", g, unsafely=True)
+        self.assertEqual(g['a'], 1)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "prctl is Linux-only")
+    def test_worker_is_not_dumpable(self):
+        # The child inherits the worker's dumpable flag: PR_GET_DUMPABLE is 3.
+        g = {}
+        self.pool.safe_exec("import ctypes; a = ctypes.CDLL(None).prctl(3, 0, 0, 0, 0)", g, unsafely=True)
+        self.assertEqual(g['a'], 0)
+
+    def test_answer_out_of_turn(self):
+        g = {}
+        self.pool.safe_exec("import os; pid = os.getppid()", g, unsafely=True)
+        first_pid = g['pid']
+
+        forged = ('{"globals": {"a": 2}}', {"nonce": "forged"})
+        with patch.object(sandbox_pool, "read_reply", return_value=forged):
+            with self.assertRaises(SafeExecException) as cm:
+                self.pool.safe_exec("a = 1", {}, unsafely=True)
+        self.assertIn("out of turn", cm.exception.message)
+
+        # The pool carries on with a new worker.
+        self.pool.safe_exec("import os; pid = os.getppid()", g, unsafely=True)
+        self.assertNotEqual(g['pid'], first_pid)
+
+
+class TestSafeExecWithPool(unittest.TestCase):
+    """safe_exec uses the pool once it is configured."""
+
+    def setUp(self):
+        super(TestSafeExecWithPool, self).setUp()
+        configure_pool(size=1, max_uses=10, timeout=5)
+        self.addCleanup(sandbox_pool.configure, size=0)
+
+    def test_preloads_assumed_imports(self):
+        self.assertEqual(
+            sandbox_pool.get_pool().preload,
+            [modname for _, modname in ASSUMED_IMPORTS],
+        )
+
+    def test_assumed_imports(self):
+        g = {}
+        safe_exec("a = int(math.pi)", g, unsafely=True)
+        self.assertEqual(g['a'], 3)
+
+    def test_random_seeding(self):
+        g = {}
+        safe_exec("a = random.randint(0, 999)", g, random_seed=17, unsafely=True)
+        safe_exec("b = random.randint(0, 999)", g, random_seed=17, unsafely=True)
+        self.assertEqual(g['a'], g['b'])
@@ -0,0 +1,86 @@
+"""Tests of the ProblemTemplate cache in capa_problem.py"""
+
+import os
+import shutil
+import tempfile
+import textwrap
+import unittest
+
+import fs.osfs
+from mock import patch
+
+from capa import capa_problem
+from capa.safe_exec.tests.test_safe_exec import DictCache
+from . import new_loncapa_problem, test_capa_system
+
+
+class ProblemTemplateCacheTest(unittest.TestCase):
+    """LoncapaProblems made from the same XML share a template, but not a tree."""
+
+    xml_str = textwrap.dedent("""
+        <problem>
+        <script type="loncapa/python">
+        x = random.randint(0, 1000000)
+        </script>
+        <startouttext/>What is $x?<endouttext/>
+        <stringresponse answer="$x">
+            <textline size="20"/>
+        </stringresponse>
+        </problem>
+    """)
+
+    def setUp(self):
+        super(ProblemTemplateCacheTest, self).setUp()
+        capa_problem.TEMPLATE_CACHE.clear()
+        self.addCleanup(capa_problem.TEMPLATE_CACHE.clear)
+
+    def test_parsed_once(self):
+        with patch('capa.capa_problem.etree.XML', wraps=capa_problem.etree.XML) as mock_xml:
+            new_loncapa_problem(self.xml_str, seed=1)
+            new_loncapa_problem(self.xml_str, seed=2)
+        # lxml's XML is patched everywhere, so only count parses of the problem.
+        problem_parses = [args for args, _ in mock_xml.call_args_list if '<problem>' in args[0]]
+        self.assertEqual(len(problem_parses), 1)
+
+    def test_problems_get_their_own_tree(self):
+        problem1 = new_loncapa_problem(self.xml_str, seed=1)
+        problem2 = new_loncapa_problem(self.xml_str, seed=2)
+        self.assertIsNot(problem1.tree, problem2.tree)
+        self.assertNotEqual(problem1.context['x'], problem2.context['x'])
+        self.assertIn(str(problem1.context['x']), problem1.get_html())
+        self.assertIn(str(problem2.context['x']), problem2.get_html())
+        self.assertIn('<text>', problem1.problem_text)
+
+    def test_rebuilt_when_include_changes(self):
+        xml_str = textwrap.dedent("""
+            <problem>
+            <include file="extra.xml"/>
+            </problem>
+        """)
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        capa_system = test_capa_system()
+        capa_system.filestore = fs.osfs.OSFS(root)
+
+        # with DEBUG on, a missing include is left out of the problem
+        self.assertNotIn('Included text', new_loncapa_problem(xml_str, capa_system=capa_system).get_html())
+
+        with open(os.path.join(root, 'extra.xml'), 'w') as include_file:
+            include_file.write('<p>Included text</p>')
+        self.assertIn('Included text', new_loncapa_problem(xml_str, capa_system=capa_system).get_html())
+
+        with open(os.path.join(root, 'extra.xml'), 'w') as include_file:
+            include_file.write('<p>Changed text</p>')
+        self.assertIn('Changed text', new_loncapa_problem(xml_str, capa_system=capa_system).get_html())
+
+    def test_student_id_not_in_cached_globals(self):
+        # Students with the same seed share safe_exec's cached result unless
+        # the code uses their id.
+        cache = {}
+        capa_system = test_capa_system()
+        capa_system.cache = DictCache(cache)
+        for student_id in ("student1", "student2"):
+            capa_system.anonymous_student_id = student_id
+            problem = new_loncapa_problem(self.xml_str, capa_system=capa_system, seed=1)
+            self.assertEqual(problem.context['anonymous_student_id'], student_id)
+        self.assertEqual(len(cache), 1)
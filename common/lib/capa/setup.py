@@ -4,5 +4,5 @@ setup(
     name="capa",
     version="0.1",
     packages=find_packages(exclude=["tests"]),
-    install_requires=["distribute>=0.6.28"],
+    install_requires=["distribute>=0.6.28", "lru_cache"],
 )
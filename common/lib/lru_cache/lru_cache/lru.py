@@ -0,0 +1,57 @@
+"""
+A size-bounded, least recently used cache, for the process-wide caches of the
+libraries in common/lib.
+"""
+
+import threading
+from collections import OrderedDict
+
+# marks a missing entry, since None may be cached
+_MISSING = object()
+
+
+class LRUCache(object):
+    """
+    A thread safe cache of at most `max_size` entries, which evicts the least
+    recently used one when it's full.
+
+    Values are handed out as they were stored; callers which cache mutable
+    values must not change them, or must copy them on the way in and out.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the value cached under `key`, or `default` if there isn't one.
+        """
+        with self._lock:
+            value = self._entries.pop(key, _MISSING)
+            if value is _MISSING:
+                return default
+            # reinsert it to make it the most recently used
+            self._entries[key] = value
+            return value
+
+    def set(self, key, value):
+        """
+        Cache `value` under `key`, evicting the least recently used entries
+        beyond `max_size`.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Forget all the entries.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,45 @@
+"""
+Unit tests for lru.py
+"""
+
+import unittest
+
+from lru_cache import LRUCache
+
+
+class LRUCacheTest(unittest.TestCase):
+    """
+    Tests of the LRUCache.
+    """
+    def test_cache_is_bounded(self):
+        """
+        Check that the least recently used entries are evicted
+        """
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(len(cache), 2)
+
+    def test_cache_of_none(self):
+        """
+        Check that None can be cached and told apart from a miss
+        """
+        cache = LRUCache(max_size=2)
+        cache.set('a', None)
+        self.assertIsNone(cache.get('a', 'missing'))
+        self.assertEqual(cache.get('b', 'missing'), 'missing')
+
+    def test_clear(self):
+        """
+        Check that clearing the cache forgets every entry
+        """
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertIsNone(cache.get('a'))
@@ -0,0 +1,7 @@
+from setuptools import setup
+
+setup(
+    name="lru_cache",
+    version="0.1",
+    packages=["lru_cache"],
+)
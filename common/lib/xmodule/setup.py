@@ -57,6 +57,7 @@ setup(
         'distribute',
         'docopt',
         'capa',
+        'lru_cache',
         'path.py',
         'webob',
         'opaque-keys',
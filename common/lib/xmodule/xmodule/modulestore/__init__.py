@@ -115,6 +115,7 @@ class BulkOpsRecord(object):
     """
     def __init__(self):
         self._active_count = 0
+        self.has_publish_item = False
 
     @property
     def active(self):
@@ -267,6 +268,9 @@ class BulkOperationsMixin(object):
 
         self._end_outermost_bulk_operation(bulk_ops_record, course_key)
 
+        if bulk_ops_record.has_publish_item:
+            self.send_course_published(course_key)
+
         self._clear_bulk_ops_record(course_key)
 
     def _is_in_bulk_operation(self, course_key, ignore_case=False):
@@ -275,6 +279,26 @@ class BulkOperationsMixin(object):
         """
         return self._get_bulk_ops_record(course_key, ignore_case).active
 
+    def _flag_publish_event(self, course_key):
+        """
+        Record that the published content of `course_key` changed. Outside of a bulk operation
+        the course_published signal is sent right away; inside one, it is sent once when the
+        outermost bulk operation ends.
+        """
+        bulk_ops_record = self._get_bulk_ops_record(course_key)
+        if bulk_ops_record.active:
+            bulk_ops_record.has_publish_item = True
+        else:
+            self.send_course_published(course_key)
+
+    def send_course_published(self, course_key):
+        """
+        Send the course_published signal for `course_key`, if this store has a signal handler.
+        """
+        signal_handler = getattr(self, 'signal_handler', None)
+        if signal_handler is not None:
+            signal_handler.send("course_published", course_key=course_key.for_branch(None))
+
 
 class IncorrectlySortedList(Exception):
     """
@@ -457,14 +481,11 @@ class ModuleStoreAssetWriteInterface(ModuleStoreAssetBase):
     """
     The write operations for assets and asset metadata
     """
-    def _save_assets_by_type(self, course_key, asset_metadata_list, course_assets, user_id, import_only):
+    def _assets_to_save(self, course_key, asset_metadata_list, user_id, import_only):
         """
-        Common private method that saves/updates asset metadata items in the internal modulestore
-        structure used to store asset metadata items.
+        Common private method that yields the items of asset_metadata_list which belong to course_key,
+        recording the edit on each of them unless import_only.
         """
-        # Lazily create a sorted list if not already created.
-        assets_by_type = defaultdict(lambda: SortedAssetList(iterable=course_assets.get(asset_type, [])))
-
         for asset_md in asset_metadata_list:
             if asset_md.asset_id.course_key != course_key:
                 # pylint: disable=logging-format-interpolation
@@ -474,6 +495,17 @@ class ModuleStoreAssetWriteInterface(ModuleStoreAssetBase):
                 continue
             if not import_only:
                 asset_md.update({'edited_by': user_id, 'edited_on': datetime.datetime.now(UTC)})
+            yield asset_md
+
+    def _save_assets_by_type(self, course_key, asset_metadata_list, course_assets, user_id, import_only):
+        """
+        Common private method that saves/updates asset metadata items in the internal modulestore
+        structure used to store asset metadata items.
+        """
+        # Lazily create a sorted list if not already created.
+        assets_by_type = defaultdict(lambda: SortedAssetList(iterable=course_assets.get(asset_type, [])))
+
+        for asset_md in self._assets_to_save(course_key, asset_metadata_list, user_id, import_only):
             asset_type = asset_md.asset_id.asset_type
             all_assets = assets_by_type[asset_type]
             all_assets.insert_or_update(asset_md)
@@ -925,7 +957,7 @@ class ModuleStoreReadBase(BulkOperationsMixin, ModuleStoreRead):
         contentstore=None,
         doc_store_config=None,  # ignore if passed up
         metadata_inheritance_cache_subsystem=None, request_cache=None,
-        xblock_mixins=(), xblock_select=None,
+        xblock_mixins=(), xblock_select=None, signal_handler=None,
         # temporary parms to enable backward compatibility. remove once all envs migrated
         db=None, collection=None, host=None, port=None, tz_aware=True, user=None, password=None,
         # allow lower level init args to pass harmlessly
@@ -943,6 +975,7 @@ class ModuleStoreReadBase(BulkOperationsMixin, ModuleStoreRead):
         self.xblock_mixins = xblock_mixins
         self.xblock_select = xblock_select
         self.contentstore = contentstore
+        self.signal_handler = signal_handler
 
     def get_course_errors(self, course_key):
         """
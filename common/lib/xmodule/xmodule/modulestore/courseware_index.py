@@ -4,7 +4,6 @@ from __future__ import absolute_import
 import logging
 
 from django.utils.translation import ugettext as _
-from opaque_keys.edx.locator import CourseLocator
 from search.search_engine_base import SearchEngine
 
 from . import ModuleStoreEnum
@@ -25,50 +24,65 @@ class SearchIndexingError(Exception):
         self.error_list = error_list
 
 
+def _item_version(item, start_date):
+    """
+    A token which changes whenever the index document for `item` would: split records the structure
+    version of each block's last change, old mongo only the time of it. The start date is inherited,
+    so it is part of the token too. Returns None if the store records neither.
+    """
+    version = getattr(item, 'update_version', None) or getattr(item, 'edited_on', None)
+    if version is None:
+        return None
+    return u"{}|{}".format(version, start_date.isoformat() if start_date else u"")
+
+
 class CoursewareSearchIndexer(object):
     """
     Class to perform indexing for courseware search from different modulestores
     """
 
     @staticmethod
-    def add_to_search_index(modulestore, location, delete=False, raise_on_error=False):
+    def indexing_is_enabled():
         """
-        Add to courseware search index from given location and its children
+        Whether a search engine is configured to index courseware into
         """
-        error_list = []
-        # TODO - inline for now, need to move this out to a celery task
+        return SearchEngine.get_search_engine(INDEX_NAME) is not None
+
+    @staticmethod
+    def index_course(modulestore, course_key, indexed_versions=None, raise_on_error=False, heartbeat=None):
+        """
+        Bring the courseware index up to date with the published content of the given course.
+
+        The whole published course is loaded at once and walked in memory. `indexed_versions` maps the
+        id of each document indexed last time to the version it was indexed at, as returned by the
+        previous call; only items whose version has changed since are sent to the search engine, and
+        documents for items no longer in the course are removed. Without it, everything is indexed.
+
+        `heartbeat`, if given, is called between items, e.g. to renew a lock held during the run. If
+        it raises, indexing stops with a general indexing error.
+
+        Returns the indexed_versions to pass to the next call.
+        """
+        if heartbeat is None:
+            heartbeat = lambda: None
+
         searcher = SearchEngine.get_search_engine(INDEX_NAME)
         if not searcher:
-            return
-
-        if isinstance(location, CourseLocator):
-            course_key = location
-        else:
-            course_key = location.course_key
+            return indexed_versions
 
+        indexed_versions = indexed_versions or {}
+        error_list = []
+        new_versions = {}
+        documents = []
+        # the ids of every indexable item now in the course, whether or not it needs indexing again
+        current_ids = set()
         location_info = {
             "course": unicode(course_key),
         }
 
-        def _fetch_item(item_location):
-            """ Fetch the item from the modulestore location, log if not found, but continue """
-            try:
-                if isinstance(item_location, CourseLocator):
-                    item = modulestore.get_course(item_location)
-                else:
-                    item = modulestore.get_item(item_location, revision=ModuleStoreEnum.RevisionOption.published_only)
-            except ItemNotFoundError:
-                log.warning('Cannot find: %s', item_location)
-                return None
-
-            return item
-
-        def index_item_location(item_location, current_start_date):
-            """ add this item to the search index """
-            item = _fetch_item(item_location)
-            if not item:
-                return
-
+        def prepare_item_index(item, current_start_date):
+            """ collect the index documents for this item and its children """
+            heartbeat()
             is_indexable = hasattr(item, "index_dictionary")
             # if it's not indexable and it does not have children, then ignore
             if not is_indexable and not item.has_children:
@@ -79,42 +93,55 @@ class CoursewareSearchIndexer(object):
                 current_start_date = item.start
 
             if item.has_children:
-                for child_loc in item.children:
-                    index_item_location(child_loc, current_start_date)
+                for child in item.get_children():
+                    prepare_item_index(child, current_start_date)
 
-            item_index = {}
-            item_index_dictionary = item.index_dictionary() if is_indexable else None
+            if not is_indexable:
+                return
 
-            # if it has something to add to the index, then add it
-            if item_index_dictionary:
-                try:
+            item_id = unicode(item.scope_ids.usage_id)
+            current_ids.add(item_id)
+            version = _item_version(item, current_start_date)
+            if version is not None and indexed_versions.get(item_id) == version:
+                new_versions[item_id] = version
+                return
+
+            try:
+                item_index_dictionary = item.index_dictionary()
+                # if it has something to add to the index, then add it
+                if item_index_dictionary:
+                    item_index = {}
                     item_index.update(location_info)
                     item_index.update(item_index_dictionary)
-                    item_index['id'] = unicode(item.scope_ids.usage_id)
+                    item_index['id'] = item_id
                     if current_start_date:
                         item_index['start_date'] = current_start_date
+                    documents.append((item_id, version, item_index))
+                else:
+                    current_ids.discard(item_id)
+            except Exception as err:  # pylint: disable=broad-except
+                # broad exception so that index operation does not fail on one item of many
+                log.warning('Could not index item: %s - %s', item.location, unicode(err))
+                error_list.append(_('Could not index item: {}').format(item.location))
 
+        try:
+            with modulestore.branch_setting(ModuleStoreEnum.Branch.published_only, course_key):
+                course = modulestore.get_course(course_key, depth=None)
+                if course is None:
+                    raise ItemNotFoundError(course_key)
+                prepare_item_index(course, None)
+
+            for item_id, version, item_index in documents:
+                heartbeat()
+                try:
                     searcher.index(DOCUMENT_TYPE, item_index)
+                    new_versions[item_id] = version
                 except Exception as err:  # pylint: disable=broad-except
-                    # broad exception so that index operation does not fail on one item of many
-                    log.warning('Could not index item: %s - %s', item_location, unicode(err))
-                    error_list.append(_('Could not index item: {}').format(item_location))
+                    log.warning('Could not index item: %s - %s', item_id, unicode(err))
+                    error_list.append(_('Could not index item: {}').format(item_id))
 
-        def remove_index_item_location(item_location):
-            """ remove this item from the search index """
-            item = _fetch_item(item_location)
-            if item:
-                if item.has_children:
-                    for child_loc in item.children:
-                        remove_index_item_location(child_loc)
-
-                searcher.remove(DOCUMENT_TYPE, unicode(item.scope_ids.usage_id))
-
-        try:
-            if delete:
-                remove_index_item_location(location)
-            else:
-                index_item_location(location, None)
+            for item_id in set(indexed_versions) - current_ids:
+                searcher.remove(DOCUMENT_TYPE, item_id)
         except Exception as err:  # pylint: disable=broad-except
             # broad exception so that index operation does not prevent the rest of the application from working
             log.exception(
@@ -123,13 +150,17 @@ class CoursewareSearchIndexer(object):
                 unicode(err)
             )
             error_list.append(_('General indexing error occurred'))
+            # keep comparing against what was known to be indexed, so that nothing is missed next time
+            new_versions = indexed_versions
 
         if raise_on_error and error_list:
             raise SearchIndexingError(_('Error(s) present during indexing'), error_list)
 
+        return new_versions
+
     @classmethod
-    def do_course_reindex(cls, modulestore, course_key):
+    def do_course_reindex(cls, modulestore, course_key, heartbeat=None):
         """
         (Re)index all content within the given course
         """
-        return cls.add_to_search_index(modulestore, course_key, delete=False, raise_on_error=True)
+        return cls.index_course(modulestore, course_key, raise_on_error=True, heartbeat=heartbeat)
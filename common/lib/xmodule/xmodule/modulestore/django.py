@@ -11,14 +11,18 @@ from django.conf import settings
 if not settings.configured:
     settings.configure()
 from django.core.cache import get_cache, InvalidCacheBackendError
+import django.dispatch
 import django.utils
 
+import logging
 import re
 
 from xmodule.util.django import get_current_request_hostname
 import xmodule.modulestore  # pylint: disable=unused-import
 from xmodule.modulestore.mixed import MixedModuleStore
 from xmodule.modulestore.draft_and_published import BranchSettingMixin
+from xmodule.modulestore.split_mongo.mongo_connection import StructureCache
+from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
 from xmodule.contentstore.django import contentstore
 import xblock.reference.plugins
 
@@ -37,6 +41,8 @@ try:
 except ImportError:
     HAS_USER_SERVICE = False
 
+log = logging.getLogger(__name__)
+
 ASSET_IGNORE_REGEX = getattr(settings, "ASSET_IGNORE_REGEX", r"(^\._.*$)|(^\.DS_Store$)|(^.*~$)")
 
 
@@ -51,6 +57,36 @@ def load_function(path):
     return getattr(import_module(module_path), name)
 
 
+class SignalHandler(object):
+    """
+    The signals a modulestore sends, each with the class of the store that sent it as the sender.
+
+    course_published is sent when the published content of a course changes: when some of it is
+    published, or when published content is deleted. Inside a bulk operation it is sent once, when
+    the outermost bulk operation ends. Its only argument is the course_key.
+
+    Receivers run in the request that changed the course, so any real work should be handed off
+    to a celery task.
+    """
+    course_published = django.dispatch.Signal(providing_args=["course_key"])
+
+    _mapping = {
+        "course_published": course_published,
+    }
+
+    def __init__(self, modulestore_class):
+        self.modulestore_class = modulestore_class
+
+    def send(self, signal_name, **kwargs):
+        """
+        Send the signal named `signal_name`. A receiver's error is logged, not raised.
+        """
+        signal = self._mapping[signal_name]
+        for receiver, response in signal.send_robust(sender=self.modulestore_class, **kwargs):
+            if isinstance(response, Exception):
+                log.error(u"Error in %s receiver %s: %r", signal_name, receiver, response)
+
+
 def create_modulestore_instance(
         engine,
         content_store,
@@ -89,6 +125,9 @@ def create_modulestore_instance(
     if issubclass(class_, BranchSettingMixin):
         _options['branch_setting_func'] = _get_modulestore_branch_setting
 
+    if issubclass(class_, SplitMongoModuleStore):
+        _options['structure_cache'] = split_structure_cache()
+
     if HAS_USER_SERVICE and not user_service:
         xb_user_service = DjangoXBlockUserService(get_current_user())
     else:
@@ -104,10 +143,32 @@ def create_modulestore_instance(
         i18n_service=i18n_service or ModuleI18nService(),
         fs_service=fs_service or xblock.reference.plugins.FSService(),
         user_service=user_service or xb_user_service,
+        signal_handler=SignalHandler(class_),
         **_options
     )
 
 
+# The process-wide cache of split modulestore structures
+_STRUCTURE_CACHE = None
+
+
+def split_structure_cache():
+    """
+    Returns the :class:`StructureCache` shared by all split modulestores in this process,
+    or None if structure caching is turned off.
+    """
+    global _STRUCTURE_CACHE  # pylint: disable=global-statement
+    if _STRUCTURE_CACHE is None:
+        max_size = getattr(settings, 'SPLIT_STRUCTURE_CACHE_SIZE', 100)
+        try:
+            backing_cache = get_cache('course_structure_cache')
+        except InvalidCacheBackendError:
+            backing_cache = None
+        if max_size or backing_cache is not None:
+            _STRUCTURE_CACHE = StructureCache(max_size=max_size, backing_cache=backing_cache)
+    return _STRUCTURE_CACHE
+
+
 # A singleton instance of the Mixed Modulestore
 _MIXED_MODULESTORE = None
 
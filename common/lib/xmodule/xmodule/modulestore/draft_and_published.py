@@ -81,6 +81,10 @@ class ModuleStoreDraftAndPublished(BranchSettingMixin):
     def has_changes(self, xblock):
         raise NotImplementedError
 
+    @abstractmethod
+    def get_blocks_with_changes(self, course_key):
+        raise NotImplementedError
+
     @abstractmethod
     def publish(self, location, user_id):
         raise NotImplementedError
@@ -850,6 +850,14 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
         store = self._verify_modulestore_support(xblock.location.course_key, 'has_changes')
         return store.has_changes(xblock)
 
+    def get_blocks_with_changes(self, course_key):
+        """
+        Returns the set of usage keys (without branch or version) of the blocks in the course which have
+        unpublished changes, as has_changes would report them.
+        """
+        store = self._verify_modulestore_support(course_key, 'get_blocks_with_changes')
+        return store.get_blocks_with_changes(course_key)
+
     def check_supports(self, course_key, method):
         """
         Verifies that the modulestore for a particular course supports a feature.
@@ -75,6 +75,16 @@ BLOCK_TYPES_WITH_CHILDREN = list(set(
 _OSFS_INSTANCE = {}
 
 
+def _metadata_inheritance_cache_key(course_id):
+    """
+    Return the key of the course's (version, tree) entry in the metadata inheritance cache.
+
+    Entries used to be bare trees stored under the course id, so the key has a
+    prefix that servers still running that code won't read or overwrite.
+    """
+    return u'versioned-inheritance:{}'.format(course_id)
+
+
 class MongoRevisionKey(object):
     """
     Key Revision constants to use for Location and Usage Keys in the Mongo modulestore
@@ -632,21 +642,10 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         else:
             return ParentLocationCache()
 
-    def _compute_metadata_inheritance_tree(self, course_id):
-        '''
-        Find all inheritable fields from all xblocks in the course which may define inheritable data
-        '''
-        # get all collections in the course, this query should not return any leaf nodes
-        course_id = self.fill_in_run(course_id)
-        query = SON([
-            ('_id.tag', 'i4x'),
-            ('_id.org', course_id.org),
-            ('_id.course', course_id.course),
-            ('_id.category', {'$in': BLOCK_TYPES_WITH_CHILDREN})
-        ])
-        # if we're only dealing in the published branch, then only get published containers
-        if self.get_branch_setting() == ModuleStoreEnum.Branch.published_only:
-            query['_id.revision'] = None
+    def _inheritance_record_filter(self):
+        """
+        Return the record filter which fetches only the fields needed to compute metadata inheritance
+        """
         # we just want the Location, children, and inheritable metadata
         record_filter = {'_id': 1, 'definition.children': 1}
 
@@ -654,21 +653,38 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         # this minimizes both data pushed over the wire
         for field_name in InheritanceMixin.fields:
             record_filter['metadata.{0}'.format(field_name)] = 1
+        return record_filter
 
-        # call out to the DB
-        resultset = self.collection.find(query, record_filter)
+    def _find_inheritance_containers(self, course_id, query, results_by_url, wanted=None):
+        """
+        Find the containers matching query and add them to results_by_url keyed by their
+        published location url, merging the children of draft and published versions.
+        If wanted is given, ignore any container whose url isn't in it.
 
-        # it's ok to keep these as deprecated strings b/c the overall cache is indexed by course_key and this
-        # is a dictionary relative to that course
-        results_by_url = {}
-        root = None
+        Returns the urls added or updated by this query.
+        """
+        query = SON([
+            ('_id.tag', 'i4x'),
+            ('_id.org', course_id.org),
+            ('_id.course', course_id.course),
+            ('_id.category', {'$in': BLOCK_TYPES_WITH_CHILDREN}),
+        ] + query.items())
+        # if we're only dealing in the published branch, then only get published containers
+        if self.get_branch_setting() == ModuleStoreEnum.Branch.published_only:
+            query['_id.revision'] = None
+
+        # call out to the DB
+        resultset = self.collection.find(query, self._inheritance_record_filter())
 
+        found = set()
         # now go through the results and order them by the location url
         for result in resultset:
             # manually pick it apart b/c the db has tag and we want as_published revision regardless
             location = as_published(Location._from_deprecated_son(result['_id'], course_id.run))
 
             location_url = unicode(location)
+            if wanted is not None and location_url not in wanted:
+                continue
             if location_url in results_by_url:
                 # found either draft or live to complement the other revision
                 # FIXME this is wrong. If the child was moved in draft from one parent to the other, it will
@@ -680,42 +696,161 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 results_by_url[location_url].setdefault('definition', {})['children'] = set(total_children)
             else:
                 results_by_url[location_url] = result
-            if location.category == 'course':
-                root = location_url
+            found.add(location_url)
+        return found
+
+    def _inherit_metadata_down(self, url, results_by_url, metadata_to_inherit):
+        """
+        Compute the metadata inherited by the descendants of url and record it in metadata_to_inherit.
+        results_by_url must contain url and its descendant containers; url's metadata must already
+        include what it inherits.
+        """
+        my_metadata = results_by_url[url].get('metadata', {})
+
+        # go through all the children and recurse, but only if we have
+        # in the result set. Remember results will not contain leaf nodes
+        for child in results_by_url[url].get('definition', {}).get('children', []):
+            if child in results_by_url:
+                new_child_metadata = copy.deepcopy(my_metadata)
+                new_child_metadata.update(results_by_url[child].get('metadata', {}))
+                results_by_url[child]['metadata'] = new_child_metadata
+                metadata_to_inherit[child] = new_child_metadata
+                self._inherit_metadata_down(child, results_by_url, metadata_to_inherit)
+            else:
+                # this is likely a leaf node, so let's record what metadata we need to inherit
+                metadata_to_inherit[child] = my_metadata.copy()
+            # WARNING: 'parent' is not part of inherited metadata, but
+            # we're piggybacking on this recursive traversal to grab
+            # and cache the child's parent, as a performance optimization.
+            # The 'parent' key will be popped out of the dictionary during
+            # CachingDescriptorSystem.load_item
+            metadata_to_inherit[child].setdefault('parent', {})[self.get_branch_setting()] = url
 
-        # now traverse the tree and compute down the inherited metadata
-        metadata_to_inherit = {}
+    def _compute_metadata_inheritance_tree(self, course_id):
+        '''
+        Find all inheritable fields from all xblocks in the course which may define inheritable data
+        '''
+        # get all collections in the course, this query should not return any leaf nodes
+        course_id = self.fill_in_run(course_id)
 
-        def _compute_inherited_metadata(url):
-            """
-            Helper method for computing inherited metadata for a specific location url
-            """
-            my_metadata = results_by_url[url].get('metadata', {})
-
-            # go through all the children and recurse, but only if we have
-            # in the result set. Remember results will not contain leaf nodes
-            for child in results_by_url[url].get('definition', {}).get('children', []):
-                if child in results_by_url:
-                    new_child_metadata = copy.deepcopy(my_metadata)
-                    new_child_metadata.update(results_by_url[child].get('metadata', {}))
-                    results_by_url[child]['metadata'] = new_child_metadata
-                    metadata_to_inherit[child] = new_child_metadata
-                    _compute_inherited_metadata(child)
-                else:
-                    # this is likely a leaf node, so let's record what metadata we need to inherit
-                    metadata_to_inherit[child] = my_metadata.copy()
-                # WARNING: 'parent' is not part of inherited metadata, but
-                # we're piggybacking on this recursive traversal to grab
-                # and cache the child's parent, as a performance optimization.
-                # The 'parent' key will be popped out of the dictionary during
-                # CachingDescriptorSystem.load_item
-                metadata_to_inherit[child].setdefault('parent', {})[self.get_branch_setting()] = url
+        # it's ok to keep these as deprecated strings b/c the overall cache is indexed by course_key and this
+        # is a dictionary relative to that course
+        results_by_url = {}
+        self._find_inheritance_containers(course_id, {}, results_by_url)
+        root = next(
+            (url for url, result in results_by_url.iteritems() if result['_id']['category'] == 'course'),
+            None
+        )
 
+        # now traverse the tree and compute down the inherited metadata
+        metadata_to_inherit = {}
         if root is not None:
-            _compute_inherited_metadata(root)
+            self._inherit_metadata_down(root, results_by_url, metadata_to_inherit)
 
         return metadata_to_inherit
 
+    def _compute_metadata_inheritance_subtree(self, course_id, location, tree):
+        """
+        Recompute the metadata inherited within the subtree rooted at the container location,
+        reusing tree (a previously computed inheritance tree) for what location itself inherits.
+
+        Returns the updated copy of tree, or None if tree doesn't have what's needed to place location.
+        """
+        location_url = unicode(as_published(location))
+        branch = self.get_branch_setting()
+        if location.category == 'course':
+            inherited = {}
+        elif location_url not in tree:
+            # location is not reachable from the course root (e.g., it's newly created), so
+            # nothing inherits through it. Whoever adds it as a child will recompute their subtree.
+            return tree
+        else:
+            parent_url = tree[location_url].get('parent', {}).get(branch)
+            if parent_url is None:
+                return None
+            if parent_url in tree:
+                inherited = tree[parent_url]
+            else:
+                # the root has no entry of its own, so the parent must be the course itself
+                parent = UsageKey.from_string(parent_url).map_into_course(course_id)
+                if parent.category != 'course':
+                    return None
+                record = self.collection.find_one(
+                    {'_id': parent.to_deprecated_son()}, self._inheritance_record_filter()
+                )
+                if record is None:
+                    return None
+                inherited = record.get('metadata', {})
+            inherited = {key: value for key, value in inherited.iteritems() if key != 'parent'}
+
+        # fetch the subtree's containers, one query per level
+        results_by_url = {}
+        level = set([location_url])
+        while level:
+            names = list(set(UsageKey.from_string(url).name for url in level))
+            found = self._find_inheritance_containers(
+                course_id, {'_id.name': {'$in': names}}, results_by_url, wanted=level
+            )
+            level = set(
+                child
+                for url in found
+                for child in results_by_url[url].get('definition', {}).get('children', [])
+                if child not in results_by_url and
+                UsageKey.from_string(child).category in BLOCK_TYPES_WITH_CHILDREN
+            )
+        if location_url not in results_by_url:
+            return None
+
+        my_metadata = copy.deepcopy(inherited)
+        my_metadata.update(results_by_url[location_url].get('metadata', {}))
+        results_by_url[location_url]['metadata'] = my_metadata
+        subtree = {}
+        self._inherit_metadata_down(location_url, results_by_url, subtree)
+
+        # copy the tree rather than mutating it as it may be shared (e.g., by a runtime)
+        tree = dict(tree)
+        for url, metadata in tree.items():
+            # forget children which were removed from location
+            if url not in subtree and metadata.get('parent', {}).get(branch) == location_url:
+                del tree[url]
+        if location_url in tree:
+            entry = dict(my_metadata)
+            entry['parent'] = tree[location_url]['parent']
+            tree[location_url] = entry
+        for url, metadata in subtree.iteritems():
+            # keep the parents recorded for other branches
+            parents = dict(tree.get(url, {}).get('parent', {}))
+            parents.update(metadata['parent'])
+            metadata['parent'] = parents
+            tree[url] = metadata
+        return tree
+
+    def _get_metadata_inheritance_cache_entry(self, course_id):
+        """
+        Return the (version, tree) cached in the caching subsystem for the course, or (None, {})
+        """
+        cached = self.metadata_inheritance_cache_subsystem.get(_metadata_inheritance_cache_key(course_id), None)
+        if cached is None:
+            return None, {}
+        return cached
+
+    def _set_metadata_inheritance_cache_entry(self, course_id, tree):
+        """
+        Write tree to the caching subsystem under a new version stamp
+        """
+        self.metadata_inheritance_cache_subsystem.set(_metadata_inheritance_cache_key(course_id), (uuid4().hex, tree))
+
+    def _set_request_cached_metadata_inheritance_tree(self, course_id, tree):
+        """
+        Put tree into the request_cache, if available
+        """
+        if self.request_cache is not None:
+            # we can't assume the 'metadatat_inheritance' part of the request cache dict has been
+            # defined
+            if 'metadata_inheritance' not in self.request_cache.data:
+                self.request_cache.data['metadata_inheritance'] = {}
+            self.request_cache.data['metadata_inheritance'][unicode(course_id)] = tree
+
     def _get_cached_metadata_inheritance_tree(self, course_id, force_refresh=False):
         '''
         Compute the metadata inheritance for the course.
@@ -730,7 +865,7 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
 
             # then look in any caching subsystem (e.g. memcached)
             if self.metadata_inheritance_cache_subsystem is not None:
-                tree = self.metadata_inheritance_cache_subsystem.get(unicode(course_id), {})
+                __, tree = self._get_metadata_inheritance_cache_entry(course_id)
             else:
                 logging.warning(
                     'Running MongoModuleStore without a metadata_inheritance_cache_subsystem. This is \
@@ -743,32 +878,71 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
 
             # now write out computed tree to caching subsystem (e.g. memcached), if available
             if self.metadata_inheritance_cache_subsystem is not None:
-                self.metadata_inheritance_cache_subsystem.set(unicode(course_id), tree)
+                self._set_metadata_inheritance_cache_entry(course_id, tree)
 
         # now populate a request_cache, if available. NOTE, we are outside of the
         # scope of the above if: statement so that after a memcache hit, it'll get
         # put into the request_cache
-        if self.request_cache is not None:
-            # we can't assume the 'metadatat_inheritance' part of the request cache dict has been
-            # defined
-            if 'metadata_inheritance' not in self.request_cache.data:
-                self.request_cache.data['metadata_inheritance'] = {}
-            self.request_cache.data['metadata_inheritance'][unicode(course_id)] = tree
+        self._set_request_cached_metadata_inheritance_tree(course_id, tree)
+
+        return tree
+
+    def _update_cached_metadata_inheritance_tree(self, course_id, location):
+        """
+        Incrementally update the cached metadata inheritance tree after location changed.
 
+        Only the subtree rooted at location is recomputed. Returns the updated tree, or None if
+        there is no usable cached tree (or another process replaced it meanwhile), in which case
+        the caller should recompute the whole tree.
+        """
+        course_id = self.fill_in_run(course_id)
+        version = None
+        if self.metadata_inheritance_cache_subsystem is not None:
+            version, tree = self._get_metadata_inheritance_cache_entry(course_id)
+            if version is None:
+                return None
+        elif self.request_cache is not None:
+            tree = self.request_cache.data.get('metadata_inheritance', {}).get(unicode(course_id))
+        else:
+            tree = None
+        if not tree:
+            return None
+
+        # leaves' own metadata isn't inherited by anything, so only containers change the tree
+        if location.category in BLOCK_TYPES_WITH_CHILDREN:
+            updated = self._compute_metadata_inheritance_subtree(course_id, location, tree)
+            if updated is None:
+                return None
+            if updated is not tree and version is not None:
+                # if some other process rewrote the tree while we were computing, our update may be
+                # based on stale data, so leave it to the caller to recompute the whole tree
+                if self._get_metadata_inheritance_cache_entry(course_id)[0] != version:
+                    return None
+                self._set_metadata_inheritance_cache_entry(course_id, updated)
+            tree = updated
+
+        self._set_request_cached_metadata_inheritance_tree(course_id, tree)
         return tree
 
-    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None):
+    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None, location=None):
         """
         Refresh the cached metadata inheritance tree for the org/course combination
         for location
 
         If given a runtime, it replaces the cached_metadata in that runtime. NOTE: failure to provide
         a runtime may mean that some objects report old values for inherited data.
+
+        If given the location of the changed xblock, only the part of the tree below that xblock
+        is recomputed when a cached tree is available.
         """
         course_id = course_id.for_branch(None)
         if not self._is_in_bulk_operation(course_id):
-            # below is done for side effects when runtime is None
-            cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
+            cached_metadata = None
+            if location is not None:
+                cached_metadata = self._update_cached_metadata_inheritance_tree(course_id, location)
+            if cached_metadata is None:
+                # below is done for side effects when runtime is None
+                cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
             if runtime:
                 runtime.cached_metadata = cached_metadata
 
@@ -1351,7 +1525,9 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             xblock._edit_info = payload['edit_info']
 
             # recompute (and update) the metadata inheritance tree which is cached
-            self.refresh_cached_metadata_inheritance_tree(xblock.scope_ids.usage_id.course_key, xblock.runtime)
+            self.refresh_cached_metadata_inheritance_tree(
+                xblock.scope_ids.usage_id.course_key, xblock.runtime, location=xblock.scope_ids.usage_id
+            )
             # fire signal that we've written to DB
         except ItemNotFoundError:
             if not allow_not_found:
@@ -1817,6 +1993,9 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
     def has_changes(self, xblock):
         raise NotImplementedError()
 
+    def get_blocks_with_changes(self, course_key):
+        raise NotImplementedError()
+
     def has_published_version(self, xblock):
         raise NotImplementedError()
 
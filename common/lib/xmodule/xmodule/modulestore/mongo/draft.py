@@ -12,7 +12,6 @@ import logging
 from opaque_keys.edx.locations import Location
 from xmodule.exceptions import InvalidVersionError
 from xmodule.modulestore import ModuleStoreEnum
-from xmodule.modulestore.courseware_index import CoursewareSearchIndexer
 from xmodule.modulestore.exceptions import (
     ItemNotFoundError, DuplicateItemError, DuplicateCourseError, InvalidBranchSetting
 )
@@ -543,9 +542,9 @@ class DraftModuleStore(MongoModuleStore):
             )
         self._delete_subtree(location, as_functions)
 
-        # Remove this location from the courseware search index so that searches
-        # will refrain from showing it as a result
-        CoursewareSearchIndexer.add_to_search_index(self, location, delete=True)
+        # Deleting published content changes what the courseware search index should show
+        if as_published in as_functions:
+            self._flag_publish_event(location.course_key)
 
     def _delete_subtree(self, location, as_functions, draft_only=False):
         """
@@ -638,6 +637,41 @@ class DraftModuleStore(MongoModuleStore):
         else:
             return False
 
+    @MongoModuleStore.memoize_request_cache
+    def get_blocks_with_changes(self, course_key):
+        """
+        Returns the set of usage keys of the blocks in the course for which has_changes is True: those with
+        drafts, or with drafts or dangling child pointers anywhere in their subtrees. Finds them all with a
+        single query rather than loading the course.
+        """
+        course_key = self.fill_in_run(course_key)
+        drafts = set()
+        children = {}
+        for item in self.collection.find(self._course_key_to_son(course_key), {'definition.children': True}):
+            item_loc = unicode(as_published(Location._from_deprecated_son(item['_id'], course_key.run)))
+            if item['_id'].get('revision') == MongoRevisionKey.draft:
+                drafts.add(item_loc)
+            # a draft has changes whatever its children, so only the published children matter
+            children.setdefault(item_loc, item.get('definition', {}).get('children', []))
+
+        has_changes = {}
+
+        def has_changes_subtree(item_loc):
+            """
+            Returns whether the item, or anything in its subtree, has changes, memoizing the result.
+            """
+            if item_loc not in has_changes:
+                # a child which doesn't exist is a dangling pointer, which implies a change
+                has_changes[item_loc] = item_loc in drafts or item_loc not in children or any([
+                    has_changes_subtree(child_loc) for child_loc in children[item_loc]
+                ])
+            return has_changes[item_loc]
+
+        return set(
+            course_key.make_usage_key_from_deprecated_string(item_loc)
+            for item_loc in children if has_changes_subtree(item_loc)
+        )
+
     def publish(self, location, user_id, **kwargs):
         """
         Publish the subtree rooted at location to the live course and remove the drafts.
@@ -720,8 +754,7 @@ class DraftModuleStore(MongoModuleStore):
             bulk_record.dirty = True
             self.collection.remove({'_id': {'$in': to_be_deleted}})
 
-        # Now it's been published, add the object to the courseware search index so that it appears in search results
-        CoursewareSearchIndexer.add_to_search_index(self, location)
+        self._flag_publish_event(location.course_key)
 
         return self.get_item(as_published(location))
 
@@ -2,7 +2,8 @@
 General utilities
 """
 
-from collections import namedtuple
+import copy
+from collections import defaultdict, namedtuple
 from contracts import contract, check
 from opaque_keys.edx.locator import BlockUsageLocator
 
@@ -22,6 +23,128 @@ class BlockKey(namedtuple('BlockKey', 'type id')):
 
 CourseEnvelope = namedtuple('CourseEnvelope', 'course_key structure')
 
+# The key under which a structure keeps its in-memory child -> parents index (never persisted)
+PARENT_INDEX = 'parent_index'
+# The keys under which a structure keeps its in-memory indexes of BlockKeys by block_type and by
+# block_id (never persisted, and dropped whenever the structure is updated)
+BLOCK_TYPE_INDEX = 'block_type_index'
+BLOCK_ID_INDEX = 'block_id_index'
+
+
+def build_parent_index(blocks):
+    """
+    Return a map from each BlockKey to the set of BlockKeys of the blocks in ``blocks``
+    which list it among their children.
+    """
+    parent_index = defaultdict(set)
+    for block_key, block in blocks.iteritems():
+        for child in block['fields'].get('children', []):
+            parent_index[child].add(block_key)
+    return parent_index
+
+
+def build_block_key_indexes(blocks):
+    """
+    Return a pair of maps from each block_type and from each block_id to the set
+    of BlockKeys in ``blocks`` with that type or id.
+    """
+    block_type_index = defaultdict(set)
+    block_id_index = defaultdict(set)
+    for block_key in blocks:
+        block_type_index[block_key.type].add(block_key)
+        block_id_index[block_key.id].add(block_key)
+    return block_type_index, block_id_index
+
+
+def update_parent_index(parent_index, parent_key, old_children, new_children):
+    """
+    Record in ``parent_index`` (as built by `build_parent_index`) that the children of
+    ``parent_key`` changed from ``old_children`` to ``new_children``. Does nothing if
+    ``parent_index`` is None.
+    """
+    if parent_index is None:
+        return
+    new_children = set(new_children)
+    for child in old_children:
+        if child not in new_children:
+            parent_index[child].discard(parent_key)
+    for child in new_children:
+        parent_index[child].add(parent_key)
+
+
+def copy_parent_index(parent_index):
+    """
+    Return a copy of ``parent_index`` (as built by `build_parent_index`) which can be updated
+    without changing ``parent_index``, or None if ``parent_index`` is None.
+    """
+    if parent_index is None:
+        return None
+    return defaultdict(set, ((block_key, set(parents)) for block_key, parents in parent_index.iteritems()))
+
+
+class CopyOnWriteBlocks(dict):
+    """
+    The {BlockKey: BlockData} map of a structure, which may share its BlockData with other structures.
+
+    Versioning a structure shares its blocks between the old and the new version (see `share_blocks`)
+    rather than copying them all. Looking blocks up with ``blocks[block_key]``, ``get`` or by iterating
+    returns them as they are, so a block must be fetched with `get_block_for_update` to be changed: a
+    shared block is copied then, so changes only ever affect the structure they were made through.
+    """
+    def __init__(self, blocks=(), shared=()):
+        super(CopyOnWriteBlocks, self).__init__(blocks)
+        self._shared = set(shared)
+
+    def get_for_update(self, block_key, default=None):
+        """
+        Return the block stored under block_key, replacing it with a copy of its own first if it's
+        shared, or default if there's no such block.
+        """
+        if block_key in self._shared:
+            self._shared.discard(block_key)
+            dict.__setitem__(self, block_key, copy.deepcopy(dict.__getitem__(self, block_key)))
+        return self.get(block_key, default)
+
+    def __setitem__(self, block_key, block):
+        self._shared.discard(block_key)
+        super(CopyOnWriteBlocks, self).__setitem__(block_key, block)
+
+    def __delitem__(self, block_key):
+        self._shared.discard(block_key)
+        super(CopyOnWriteBlocks, self).__delitem__(block_key)
+
+    def pop(self, block_key, *args):
+        self._shared.discard(block_key)
+        return super(CopyOnWriteBlocks, self).pop(block_key, *args)
+
+    def update(self, *args, **kwargs):
+        for block_key, block in dict(*args, **kwargs).iteritems():
+            self[block_key] = block
+
+    def __reduce__(self):
+        # Pickled (and deep copied) blocks share nothing, so they're a plain dict.
+        return (dict, (dict(self),))
+
+
+def get_block_for_update(blocks, block_key, default=None):
+    """
+    Return the block stored under block_key in ``blocks`` (a plain dict or `CopyOnWriteBlocks`) in a
+    form which can be changed without changing any other structure, or default if there's no such block.
+    """
+    if isinstance(blocks, CopyOnWriteBlocks):
+        return blocks.get_for_update(block_key, default)
+    return blocks.get(block_key, default)
+
+
+def share_blocks(structure):
+    """
+    Return a copy of the blocks of ``structure`` which shares their BlockData, and make the blocks of
+    ``structure`` copy-on-write too, so that changes to either aren't seen by the other.
+    """
+    blocks = structure['blocks']
+    structure['blocks'] = CopyOnWriteBlocks(blocks, shared=blocks.iterkeys())
+    return CopyOnWriteBlocks(blocks, shared=blocks.iterkeys())
+
 
 class BlockData(object):
     """
@@ -1,22 +1,33 @@
 """
 Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
 """
+import cPickle as pickle
 import re
+import zlib
+from collections import OrderedDict
+from lru_cache import LRUCache
 from mongodb_proxy import autoretry_read, MongoProxy
 import pymongo
+from bson.objectid import ObjectId
 
 # Import this just to export it
 from pymongo.errors import DuplicateKeyError  # pylint: disable=unused-import
+from pymongo.errors import BulkWriteError
 
 from contracts import check, new_contract
 from xmodule.exceptions import HeartbeatFailure
-from xmodule.modulestore.split_mongo import BlockKey, BlockData
+from xmodule.modulestore.split_mongo import (
+    BlockKey, BlockData, PARENT_INDEX, BLOCK_TYPE_INDEX, BLOCK_ID_INDEX, build_parent_index, build_block_key_indexes
+)
 import datetime
 import pytz
 
 
 new_contract('BlockData', BlockData)
 
+# The error codes mongo reports for inserting a document whose _id is already in the collection
+DUPLICATE_KEY_ERROR_CODES = (11000, 11001)
+
 
 def structure_from_mongo(structure):
     """
@@ -24,6 +35,8 @@ def structure_from_mongo(structure):
         {BlockKey: block_data}.
     Converts 'root' from [block_type, block_id] to BlockKey.
     Converts 'blocks.*.fields.children' from [[block_type, block_id]] to [BlockKey].
+    Adds the child -> parents index of the blocks as PARENT_INDEX, and their
+        block_type and block_id indexes as BLOCK_TYPE_INDEX and BLOCK_ID_INDEX.
     N.B. Does not convert any other ReferenceFields (because we don't know which fields they are at this level).
     """
     check('seq[2]', structure['root'])
@@ -39,6 +52,8 @@ def structure_from_mongo(structure):
             block['fields']['children'] = [BlockKey(*child) for child in block['fields']['children']]
         new_blocks[BlockKey(block['block_type'], block.pop('block_id'))] = BlockData(block)
     structure['blocks'] = new_blocks
+    structure[PARENT_INDEX] = build_parent_index(new_blocks)
+    structure[BLOCK_TYPE_INDEX], structure[BLOCK_ID_INDEX] = build_block_key_indexes(new_blocks)
 
     return structure
 
@@ -50,6 +65,7 @@ def structure_to_mongo(structure):
         and BlockKey.id as 'block_id'.
     Doesn't convert 'root', since namedtuple's can be inserted
         directly into mongo.
+    Drops the in-memory indexes.
     """
     check('BlockKey', structure['root'])
     check('dict(BlockKey: BlockData)', structure['blocks'])
@@ -58,6 +74,8 @@ def structure_to_mongo(structure):
             check('list(BlockKey)', block['fields']['children'])
 
     new_structure = dict(structure)
+    for index_key in (PARENT_INDEX, BLOCK_TYPE_INDEX, BLOCK_ID_INDEX):
+        new_structure.pop(index_key, None)
     new_structure['blocks'] = []
 
     for block_key, block in structure['blocks'].iteritems():
@@ -69,16 +87,86 @@ def structure_to_mongo(structure):
     return new_structure
 
 
+class StructureCache(object):
+    """
+    A size-bounded, least-recently-used cache of structures keyed on their version guid.
+
+    Structures are never changed once they are written (every change makes a new version),
+    so a cached structure can't go stale. Callers do change the structures they load
+    in memory, though, so entries are kept pickled and every hit returns a fresh copy.
+
+    If a ``backing_cache`` (any object with django cache style ``get`` and ``set``, e.g. memcached)
+    is given, local misses fall through to it and structures are written to it in a
+    compressed pickled form, so that all processes can share loaded structures.
+    """
+    def __init__(self, max_size=100, backing_cache=None):
+        self.backing_cache = backing_cache
+        self.hits = 0
+        self.misses = 0
+        self._entries = LRUCache(max_size)
+
+    @property
+    def max_size(self):
+        """
+        The number of structures kept locally.
+        """
+        return self._entries.max_size
+
+    def get(self, key):
+        """
+        Return a copy of the structure cached under ``key``, or None if it isn't cached.
+        """
+        pickled = self._entries.get(key)
+
+        if pickled is None and self.backing_cache is not None:
+            compressed = self.backing_cache.get(key)
+            if compressed is not None:
+                pickled = zlib.decompress(compressed)
+                self._entries.set(key, pickled)
+
+        if pickled is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return pickle.loads(pickled)
+
+    def set(self, key, structure):
+        """
+        Cache a snapshot of ``structure`` under ``key``.
+        """
+        pickled = pickle.dumps(structure, pickle.HIGHEST_PROTOCOL)
+        self._entries.set(key, pickled)
+        if self.backing_cache is not None:
+            self.backing_cache.set(key, zlib.compress(pickled, 1))
+
+    def clear(self):
+        """
+        Drop all locally cached structures and reset the hit/miss counters.
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
 class MongoConnection(object):
     """
     Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
     """
+    # The maximum number of documents sent in each bulk insert
+    BULK_INSERT_BATCH_SIZE = 1000
+
     def __init__(
         self, db, collection, host, port=27017, tz_aware=True, user=None, password=None,
-        asset_collection=None, retry_wait_time=0.1, **kwargs
+        asset_collection=None, retry_wait_time=0.1, structure_cache=None, **kwargs
     ):
         """
         Create & open the connection, authenticate, and provide pointers to the collections
+
+        If a :class:`StructureCache` is given as ``structure_cache``, structures are read through it.
         """
         self.database = MongoProxy(
             pymongo.database.Database(
@@ -99,6 +187,12 @@ class MongoConnection(object):
         self.course_index = self.database[collection + '.active_versions']
         self.structures = self.database[collection + '.structures']
         self.definitions = self.database[collection + '.definitions']
+        self.asset_metadata = self.database[collection + '.asset_metadata']
+        self.asset_sets = self.database[collection + '.asset_sets']
+
+        self.structure_cache = structure_cache
+        # one cache may be shared by several connections, so qualify keys with the collection
+        self._structure_cache_prefix = u'{}.{}.structures'.format(db, collection)
 
         # every app has write access to the db (v having a flag to indicate r/o v write)
         # Force mongo to report errors, at the expense of performance
@@ -107,6 +201,8 @@ class MongoConnection(object):
         self.course_index.write_concern = {'w': 1}
         self.structures.write_concern = {'w': 1}
         self.definitions.write_concern = {'w': 1}
+        self.asset_metadata.write_concern = {'w': 1}
+        self.asset_sets.write_concern = {'w': 1}
 
     def heartbeat(self):
         """
@@ -117,11 +213,36 @@ class MongoConnection(object):
         else:
             raise HeartbeatFailure("Can't connect to {}".format(self.database.name))
 
+    def _structure_cache_key(self, key):
+        """
+        Return the key under which the structure with id ``key`` is cached.
+        """
+        return u'{}.{}'.format(self._structure_cache_prefix, key)
+
+    def _get_cached_structure(self, key):
+        """
+        Return the cached structure whose id is the given key, or None if it isn't cached.
+        """
+        if self.structure_cache is None:
+            return None
+        return self.structure_cache.get(self._structure_cache_key(key))
+
+    def _cache_structure(self, structure):
+        """
+        Add the given structure to the structure cache (if there is one).
+        """
+        if self.structure_cache is not None:
+            self.structure_cache.set(self._structure_cache_key(structure['_id']), structure)
+
     def get_structure(self, key):
         """
         Get the structure from the persistence mechanism whose id is the given key
         """
-        return structure_from_mongo(self.structures.find_one({'_id': key}))
+        structure = self._get_cached_structure(key)
+        if structure is None:
+            structure = structure_from_mongo(self.structures.find_one({'_id': key}))
+            self._cache_structure(structure)
+        return structure
 
     @autoretry_read()
     def find_structures_by_id(self, ids):
@@ -131,7 +252,21 @@ class MongoConnection(object):
         Arguments:
             ids (list): A list of structure ids
         """
-        return [structure_from_mongo(structure) for structure in self.structures.find({'_id': {'$in': ids}})]
+        structures = []
+        missing_ids = []
+        for structure_id in ids:
+            structure = self._get_cached_structure(structure_id)
+            if structure is None:
+                missing_ids.append(structure_id)
+            else:
+                structures.append(structure)
+
+        if missing_ids:
+            for structure in self.structures.find({'_id': {'$in': missing_ids}}):
+                structure = structure_from_mongo(structure)
+                self._cache_structure(structure)
+                structures.append(structure)
+        return structures
 
     @autoretry_read()
     def find_structures_derived_from(self, ids):
@@ -173,6 +308,43 @@ class MongoConnection(object):
         Insert a new structure into the database.
         """
         self.structures.insert(structure_to_mongo(structure))
+        self._cache_structure(structure)
+
+    def insert_structures(self, structures):
+        """
+        Insert new structures into the database with unordered bulk inserts, skipping any already there.
+
+        Returns the number of structures inserted.
+        """
+        inserted = self._insert_many(self.structures, [structure_to_mongo(structure) for structure in structures])
+        for structure in structures:
+            self._cache_structure(structure)
+        return inserted
+
+    def _insert_many(self, collection, documents):
+        """
+        Insert documents into collection with unordered bulk inserts of up to BULK_INSERT_BATCH_SIZE documents.
+
+        Documents whose _id is already in the collection are skipped rather than failing the insert:
+        the store is append only, so they can only be the same documents. Any other error is raised.
+
+        Returns the number of documents inserted.
+        """
+        inserted = 0
+        for start in xrange(0, len(documents), self.BULK_INSERT_BATCH_SIZE):
+            bulk = collection.initialize_unordered_bulk_op()
+            for document in documents[start:start + self.BULK_INSERT_BATCH_SIZE]:
+                bulk.insert(document)
+            try:
+                result = bulk.execute()
+            except BulkWriteError as error:
+                result = error.details
+                if result.get('writeConcernErrors') or any(
+                    write_error['code'] not in DUPLICATE_KEY_ERROR_CODES for write_error in result['writeErrors']
+                ):
+                    raise
+            inserted += result['nInserted']
+        return inserted
 
     def get_course_index(self, key, ignore_case=False):
         """
@@ -266,6 +438,143 @@ class MongoConnection(object):
         """
         self.definitions.insert(definition)
 
+    def insert_definitions(self, definitions):
+        """
+        Create the definitions in the db with unordered bulk inserts, skipping any already there.
+
+        Returns the number of definitions inserted.
+        """
+        return self._insert_many(self.definitions, definitions)
+
+    def get_or_create_asset_set(self, course_index_id, branch):
+        """
+        Get the id of the asset set of the given branch of the course with the given index entry _id,
+        creating the asset set if the branch doesn't have one yet. Concurrent calls all get the same one.
+
+        Returns a tuple of the asset set's id, and whether this call created it.
+        """
+        query = {'course_index': course_index_id, 'branch': branch}
+        try:
+            # a None result is the pre-image of a document this call inserted
+            existing = self.asset_sets.find_and_modify(query, {'$setOnInsert': query}, upsert=True, new=False)
+        except DuplicateKeyError:
+            # a concurrent call inserted it first
+            existing = self.asset_sets.find_one(query)
+        if existing is not None:
+            return existing['_id'], False
+        return self.asset_sets.find_one(query)['_id'], True
+
+    def find_asset_metadata(self, asset_set, asset_type, filename):
+        """
+        Get the current version of the metadata for the asset of the given type and filename in the asset set.
+        """
+        return self.asset_metadata.find_one({
+            'asset_set': asset_set,
+            'asset_type': asset_type,
+            'filename': filename,
+            'current': True,
+        })
+
+    def find_asset_metadata_list(self, asset_set, asset_type=None, sort=None, skip=0, limit=0):
+        """
+        Get the current versions of the metadata for the assets in the asset set, sorted and paged by mongo.
+
+        Arguments:
+            asset_type: If specified, only return assets of this type
+            sort: a list of (key, direction) pairs to sort the assets on
+            skip: the number of (sorted) assets to skip
+            limit: the maximum number of assets to return, 0 meaning no limit
+        """
+        query = {'asset_set': asset_set, 'current': True}
+        if asset_type is not None:
+            query['asset_type'] = asset_type
+        cursor = self.asset_metadata.find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        return list(cursor.skip(skip).limit(limit))
+
+    def insert_asset_metadata(self, asset_set, asset_docs):
+        """
+        Save new versions of the metadata of the given assets in the asset set.
+
+        Each version is a new document pointing at the one it replaces as its 'previous_version'; the
+        replaced versions are kept, but are no longer 'current'. If an asset is given more than once,
+        the last one given is saved.
+        """
+        # last one wins for any asset given more than once
+        unique_docs = OrderedDict(
+            ((asset_doc['asset_type'], asset_doc['filename']), asset_doc) for asset_doc in asset_docs
+        )
+        docs_by_type = {}
+        for (asset_type, __), asset_doc in unique_docs.iteritems():
+            docs_by_type.setdefault(asset_type, []).append(asset_doc)
+
+        for asset_type, type_docs in docs_by_type.iteritems():
+            filenames = [asset_doc['filename'] for asset_doc in type_docs]
+            previous_versions = {
+                previous['filename']: previous['_id']
+                for previous in self.asset_metadata.find(
+                    {'asset_set': asset_set, 'asset_type': asset_type, 'filename': {'$in': filenames}, 'current': True},
+                    fields=['filename'],
+                )
+            }
+            new_docs = []
+            for asset_doc in type_docs:
+                new_doc = dict(asset_doc)
+                new_doc.update({
+                    '_id': ObjectId(),
+                    'asset_set': asset_set,
+                    'current': True,
+                    'previous_version': previous_versions.get(asset_doc['filename']),
+                })
+                new_docs.append(new_doc)
+            self._insert_many(self.asset_metadata, new_docs)
+            # only now retire the replaced versions, so that the assets are never missing
+            for new_doc in new_docs:
+                self._retire_replaced_asset_metadata(new_doc)
+
+    def _retire_replaced_asset_metadata(self, new_doc):
+        """
+        Retire the version of the asset metadata which `new_doc` replaces, now that `new_doc` is saved.
+
+        Only the version read as its previous_version is retired, and only if it is still current. If it
+        isn't, a concurrent save replaced it first, and that save wins, so `new_doc` is retired instead.
+        When there was no previous version, concurrent first saves are settled by keeping the greatest _id.
+        """
+        if new_doc['previous_version'] is not None:
+            result = self.asset_metadata.update(
+                {'_id': new_doc['previous_version'], 'current': True},
+                {'$set': {'current': False}},
+            )
+            if result['n'] == 0:
+                self.asset_metadata.update({'_id': new_doc['_id']}, {'$set': {'current': False}})
+        else:
+            query = {
+                'asset_set': new_doc['asset_set'],
+                'asset_type': new_doc['asset_type'],
+                'filename': new_doc['filename'],
+                'previous_version': None,
+                'current': True,
+            }
+            self.asset_metadata.update(
+                dict(query, _id={'$lt': new_doc['_id']}), {'$set': {'current': False}}, multi=True
+            )
+            if self.asset_metadata.find_one(dict(query, _id={'$gt': new_doc['_id']}), fields=['_id']):
+                self.asset_metadata.update({'_id': new_doc['_id']}, {'$set': {'current': False}})
+
+    def delete_asset_metadata(self, asset_set, asset_type, filename):
+        """
+        Retire the current version of the metadata of the asset of the given type and filename in the asset set.
+
+        Returns the number of versions retired.
+        """
+        result = self.asset_metadata.update(
+            {'asset_set': asset_set, 'asset_type': asset_type, 'filename': filename, 'current': True},
+            {'$set': {'current': False}},
+            multi=True,
+        )
+        return result['n']
+
     def ensure_indexes(self):
         """
         Ensure that all appropriate indexes are created that are needed by this modulestore, or raise
@@ -282,3 +591,17 @@ class MongoConnection(object):
             ],
             unique=True
         )
+        self.asset_sets.create_index(
+            [
+                ('course_index', pymongo.ASCENDING),
+                ('branch', pymongo.ASCENDING),
+            ],
+            unique=True
+        )
+        for sort_key in ('filename', 'edit_info.edited_on'):
+            self.asset_metadata.create_index([
+                ('asset_set', pymongo.ASCENDING),
+                ('current', pymongo.ASCENDING),
+                ('asset_type', pymongo.ASCENDING),
+                (sort_key, pymongo.ASCENDING),
+            ])
@@ -41,6 +41,18 @@ Representation:
                 (will be the previous value of update_version; so, may point to a structure not in this
                 structure's history.)
                 ***** 'source_version': the guid for the structure was copied/published into this block
+    ** 'asset_set': the id of the set of asset_metadata documents holding the metadata of the course's assets.
+    Shared by all the versions of the structure, so that changing asset metadata doesn't version the structure.
+    This means an old structure version shows the course's current asset metadata, not the metadata as it
+    was at that version; the replaced versions of the metadata are kept in the set instead. Older structures
+    instead have an 'assets' dictionary of asset_type: [asset metadata] which is moved into a new asset set
+    when its assets are next changed.
+    ** 'parent_index': in memory only (never persisted), a map from each BlockKey to the set of BlockKeys of
+        the blocks whose children include it. Built when the structure is loaded and kept up to date as the
+        structure's children change.
+    ** 'block_type_index', 'block_id_index': in memory only, maps from each block_type and block_id to the
+        set of BlockKeys with that type or id. Built when the structure is loaded, dropped whenever the
+        structure is updated and rebuilt when next needed.
 * definition: shared content with revision history for xblock content fields
     ** '_id': definition_id (guid),
     ** 'block_type': xblock type id
@@ -51,15 +63,27 @@ Representation:
         *** 'previous_version': the definition_id of the previous version of this definition
         *** 'original_version': definition_id of the root of the previous version relation on this
         definition. Acts as a pseudo-object identifier.
+* asset_metadata: a version of the metadata of an asset (see AssetMetadata.to_storable for the other fields)
+    ** '_id': an ObjectId (guid),
+    ** 'asset_set': the id of the asset set of the structures this is an asset of
+    ** 'asset_type', 'filename': which asset in the set this is a version of
+    ** 'current': whether this is the asset's current version. Replaced and deleted versions are kept.
+    ** 'previous_version': the id of the version this one replaced, if any
+* asset_sets: which asset set a course branch's structures use, so that it is created only once
+    ** '_id': the asset set's id
+    ** 'course_index', 'branch': the _id of the course's index entry, and the branch
 """
 import copy
 import datetime
 import hashlib
 import logging
+import time
 from contracts import contract, new_contract
+import dogstats_wrapper as dog_stats_api
 from importlib import import_module
 from mongodb_proxy import autoretry_read
 from path import path
+import pymongo
 from pytz import UTC
 from bson.objectid import ObjectId
 
@@ -72,13 +96,17 @@ from opaque_keys.edx.locator import (
 from xmodule.modulestore.exceptions import InsufficientSpecificationError, VersionConflictError, DuplicateItemError, \
     DuplicateCourseError
 from xmodule.modulestore import (
-    inheritance, ModuleStoreWriteBase, ModuleStoreEnum, BulkOpsRecord, BulkOperationsMixin, SortedAssetList
+    inheritance, ModuleStoreWriteBase, ModuleStoreEnum, BulkOpsRecord, BulkOperationsMixin
 )
 
 from ..exceptions import ItemNotFoundError
 from .caching_descriptor_system import CachingDescriptorSystem
-from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection, DuplicateKeyError
-from xmodule.modulestore.split_mongo import BlockKey, CourseEnvelope, BlockData
+from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection
+from xmodule.modulestore.split_mongo import (
+    BlockKey, CourseEnvelope, BlockData, PARENT_INDEX, BLOCK_TYPE_INDEX, BLOCK_ID_INDEX,
+    build_parent_index, build_block_key_indexes, update_parent_index, copy_parent_index, share_blocks,
+    get_block_for_update,
+)
 from xmodule.error_module import ErrorDescriptor
 from collections import defaultdict
 from types import NoneType
@@ -230,24 +258,32 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
         """
         End the active bulk write operation on course_key.
         """
-        # If the content is dirty, then update the database
-        for _id in bulk_write_record.structures.viewkeys() - bulk_write_record.structures_in_db:
-            try:
-                self.db_connection.insert_structure(bulk_write_record.structures[_id])
-            except DuplicateKeyError:
-                # We may not have looked up this structure inside this bulk operation, and thus
-                # didn't realize that it was already in the database. That's OK, the store is
-                # append only, so if it's already been written, we can just keep going.
-                log.debug("Attempted to insert duplicate structure %s", _id)
-
-        for _id in bulk_write_record.definitions.viewkeys() - bulk_write_record.definitions_in_db:
-            try:
-                self.db_connection.insert_definition(bulk_write_record.definitions[_id])
-            except DuplicateKeyError:
-                # We may not have looked up this definition inside this bulk operation, and thus
-                # didn't realize that it was already in the database. That's OK, the store is
-                # append only, so if it's already been written, we can just keep going.
-                log.debug("Attempted to insert duplicate definition %s", _id)
+        # If the content is dirty, then update the database. Structures and definitions which were
+        # already in the database are skipped: we may not have looked them up inside this bulk
+        # operation, and thus didn't realize that they were already there. That's OK, the store is
+        # append only, so they can only be the same documents.
+        start_time = time.time()
+        structures = [
+            bulk_write_record.structures[_id]
+            for _id in bulk_write_record.structures.viewkeys() - bulk_write_record.structures_in_db
+        ]
+        definitions = [
+            bulk_write_record.definitions[_id]
+            for _id in bulk_write_record.definitions.viewkeys() - bulk_write_record.definitions_in_db
+        ]
+        structures_inserted = self.db_connection.insert_structures(structures) if structures else 0
+        definitions_inserted = self.db_connection.insert_definitions(definitions) if definitions else 0
+
+        if structures or definitions:
+            duration = time.time() - start_time
+            tags = [u'course_id:{}'.format(course_key.for_branch(None).version_agnostic())]
+            dog_stats_api.histogram('split_modulestore.bulk_write.duration', duration, tags=tags)
+            dog_stats_api.histogram('split_modulestore.bulk_write.structures', len(structures), tags=tags)
+            dog_stats_api.histogram('split_modulestore.bulk_write.definitions', len(definitions), tags=tags)
+            log.debug(
+                "Bulk write to %s: inserted %d of %d structures and %d of %d definitions in %.3fs",
+                course_key, structures_inserted, len(structures), definitions_inserted, len(definitions), duration
+            )
 
         if bulk_write_record.index is not None and bulk_write_record.index != bulk_write_record.initial_index:
             if bulk_write_record.initial_index is None:
@@ -318,6 +354,9 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
         (no data will be written to the database if a bulk operation is active.)
         """
         self._clear_cache(structure['_id'])
+        # blocks may have been added or removed; rebuild the block key indexes when next needed
+        structure.pop(BLOCK_TYPE_INDEX, None)
+        structure.pop(BLOCK_ID_INDEX, None)
         bulk_write_record = self._get_bulk_ops_record(course_key)
         if bulk_write_record.active:
             bulk_write_record.structures[structure['_id']] = structure
@@ -432,8 +471,21 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
         if bulk_write_record.active and course_key.branch in bulk_write_record.dirty_branches:
             return bulk_write_record.structure_for_branch(course_key.branch)
 
-        # Otherwise, make a new structure
-        new_structure = copy.deepcopy(structure)
+        # Otherwise, make a new structure. Rather than copying every block, the new structure shares
+        # them with the old one, and each is copied only when it's fetched from either with
+        # get_block_for_update to be changed.
+        new_structure = copy.deepcopy({
+            key: value for key, value in structure.iteritems()
+            if key not in ('blocks', PARENT_INDEX, BLOCK_TYPE_INDEX, BLOCK_ID_INDEX)
+        })
+        if 'blocks' in structure:
+            new_structure['blocks'] = share_blocks(structure)
+        if PARENT_INDEX in structure:
+            new_structure[PARENT_INDEX] = copy_parent_index(structure[PARENT_INDEX])
+        # the block key indexes are only ever replaced, never updated, so they can be shared
+        for index_key in (BLOCK_TYPE_INDEX, BLOCK_ID_INDEX):
+            if index_key in structure:
+                new_structure[index_key] = structure[index_key]
         new_structure['_id'] = ObjectId()
         new_structure['previous_version'] = structure['_id']
         new_structure['edited_by'] = user_id
@@ -607,14 +659,15 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                  default_class=None,
                  error_tracker=null_error_tracker,
                  i18n_service=None, fs_service=None, user_service=None,
-                 services=None, **kwargs):
+                 services=None, structure_cache=None, **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param structure_cache: an optional StructureCache (usually shared by the process) to read structures through
         """
 
         super(SplitMongoModuleStore, self).__init__(contentstore, **kwargs)
 
-        self.db_connection = MongoConnection(**doc_store_config)
+        self.db_connection = MongoConnection(structure_cache=structure_cache, **doc_store_config)
         self.db = self.db_connection.database
 
         if default_class is not None:
@@ -1021,34 +1074,41 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             return []
 
         course = self._lookup_course(course_locator)
-        items = []
+        blocks = course.structure['blocks']
         qualifiers = qualifiers.copy() if qualifiers else {}  # copy the qualifiers (destructively manipulated here)
 
-        def _block_matches_all(block_json):
+        def _matching_block_keys(block_keys):
             """
-            Check that the block matches all the criteria
+            Return those of block_keys whose blocks match all the criteria
             """
             # do the checks which don't require loading any additional data
-            if (
-                self._block_matches(block_json, qualifiers) and
-                self._block_matches(block_json.get('fields', {}), settings)
-            ):
-                if content:
-                    definition_block = self.get_definition(course_locator, block_json['definition'])
-                    return self._block_matches(definition_block.get('fields', {}), content)
-                else:
-                    return True
+            matches = [
+                block_key for block_key in block_keys
+                if block_key in blocks and
+                self._block_matches(blocks[block_key], qualifiers) and
+                self._block_matches(blocks[block_key].get('fields', {}), settings)
+            ]
+            if content and matches:
+                definitions = {
+                    definition['_id']: definition
+                    for definition in self.get_definitions(
+                        course_locator, [blocks[block_key]['definition'] for block_key in matches]
+                    )
+                }
+                matches = [
+                    block_key for block_key in matches
+                    if self._block_matches(
+                        definitions.get(blocks[block_key]['definition'], {}).get('fields', {}), content
+                    )
+                ]
+            return matches
 
         if settings is None:
             settings = {}
         if 'name' in qualifiers:
             # odd case where we don't search just confirm
             block_name = qualifiers.pop('name')
-            block_ids = []
-            for block_id, block in course.structure['blocks'].iteritems():
-                if block_name == block_id.id and _block_matches_all(block):
-                    block_ids.append(block_id)
-
+            block_ids = _matching_block_keys(self._get_block_id_index(course.structure).get(block_name, ()))
             return self._load_items(course, block_ids, lazy=True, **kwargs)
 
         if 'category' in qualifiers:
@@ -1057,10 +1117,22 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         # don't expect caller to know that children are in fields
         if 'children' in qualifiers:
             settings['children'] = qualifiers.pop('children')
-        for block_id, value in course.structure['blocks'].iteritems():
-            if _block_matches_all(value):
-                items.append(block_id)
 
+        # only look at the blocks of the requested type(s) if the query permits
+        block_type_criteria = qualifiers.get('block_type')
+        if isinstance(block_type_criteria, basestring):
+            block_types = [block_type_criteria]
+        elif isinstance(block_type_criteria, dict) and block_type_criteria.keys() == ['$in']:
+            block_types = block_type_criteria['$in']
+        else:
+            block_types = None
+        if block_types is not None and all(isinstance(block_type, basestring) for block_type in block_types):
+            block_type_index = self._get_block_type_index(course.structure)
+            candidates = set().union(*[block_type_index.get(block_type, ()) for block_type in block_types])
+        else:
+            candidates = blocks.iterkeys()
+
+        items = _matching_block_keys(candidates)
         if len(items) > 0:
             return self._load_items(course, items, 0, lazy=True, **kwargs)
         else:
@@ -1525,7 +1597,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             if block_id not in new_structure['blocks']:
                 raise ItemNotFoundError(parent_usage_key)
 
-            parent = new_structure['blocks'][block_id]
+            parent = get_block_for_update(new_structure['blocks'], block_id)
 
             # Originally added to support entrance exams (settings.FEATURES.get('ENTRANCE_EXAMS'))
             if kwargs.get('position') is None:
@@ -1535,6 +1607,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                     kwargs.get('position'),
                     BlockKey.from_usage_key(xblock.location)
                 )
+            self._update_parent_index(new_structure, block_id, [], [BlockKey.from_usage_key(xblock.location)])
 
             if parent['edit_info']['update_version'] != new_structure['_id']:
                 # if the parent hadn't been previously changed in this bulk transaction, indicate that it's
@@ -1567,6 +1640,12 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             skip_auto_publish=True,
             **kwargs
         )
+        # the new course shares the source's structures, so give it its own copies of their asset sets
+        with self.bulk_operations(dest_course_id):
+            for branch in self.get_course_index_info(dest_course_id)['versions']:
+                dest_branch_key = dest_course_id.for_branch(branch)
+                if 'asset_set' in self._lookup_course(dest_branch_key).structure:
+                    self._copy_asset_metadata(dest_branch_key, dest_branch_key, user_id)
         # don't copy assets until we create the course in case something's awry
         super(SplitMongoModuleStore, self).clone_course(source_course_id, dest_course_id, user_id, fields, **kwargs)
         return new_course
@@ -1675,9 +1754,13 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             draft_structure = self._lookup_course(draft_version).structure
             draft_structure = self.version_structure(locator, draft_structure, user_id)
             new_id = draft_structure['_id']
-            root_block = draft_structure['blocks'][draft_structure['root']]
+            root_block = get_block_for_update(draft_structure['blocks'], draft_structure['root'])
             if block_fields is not None:
+                old_children = root_block['fields'].get('children', [])
                 root_block['fields'].update(self._serialize_fields(root_category, block_fields))
+                self._update_parent_index(
+                    draft_structure, draft_structure['root'], old_children, root_block['fields'].get('children', [])
+                )
             if definition_fields is not None:
                 old_def = self.get_definition(locator, root_block['definition'])
                 new_fields = old_def['fields']
@@ -1810,7 +1893,10 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             # if updated, rev the structure
             if is_updated:
                 new_structure = self.version_structure(course_key, original_structure, user_id)
-                block_data = self._get_block_from_structure(new_structure, block_key)
+                block_data = get_block_for_update(new_structure['blocks'], block_key)
+                self._update_parent_index(
+                    new_structure, block_key, block_data['fields'].get('children', []), settings.get('children', [])
+                )
 
                 block_data["definition"] = definition_locator.definition_id
                 block_data["fields"] = settings
@@ -1928,6 +2014,8 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             is_updated = self._persist_subdag(course_key, xblock, user_id, new_structure['blocks'], new_id)
 
             if is_updated:
+                # _persist_subdag may have changed the children of any block in the dag
+                self._invalidate_parent_index(new_structure)
                 self.update_structure(course_key, new_structure)
 
                 # update the index entry if appropriate
@@ -1998,7 +2086,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                     raw=True
                 )
             else:
-                block_info = structure_blocks[block_key]
+                block_info = get_block_for_update(structure_blocks, block_key)
                 block_info['fields'] = block_fields
                 block_info['definition'] = xblock.definition_locator.definition_id
                 self.version_block(block_info, user_id, new_id)
@@ -2093,13 +2181,18 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                     for parent in parents:
                         if parent not in destination_blocks:
                             raise ItemNotFoundError(parent)
+                        old_children = destination_blocks[parent]['fields']['children']
                         orphans.update(
                             self._sync_children(
                                 source_structure['blocks'][parent],
-                                destination_blocks[parent],
+                                get_block_for_update(destination_blocks, parent),
                                 BlockKey.from_usage_key(subtree_root)
                             )
                         )
+                        self._update_parent_index(
+                            destination_structure, parent, old_children,
+                            destination_blocks[parent]['fields']['children']
+                        )
                 # update/create the subtree and its children in destination (skipping blacklist)
                 orphans.update(
                     self._copy_subdag(
@@ -2107,7 +2200,8 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                         BlockKey.from_usage_key(subtree_root),
                         source_structure['blocks'],
                         destination_blocks,
-                        blacklist
+                        blacklist,
+                        parent_index=destination_structure.get(PARENT_INDEX),
                     )
                 )
             # remove any remaining orphans
@@ -2180,7 +2274,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             )
 
             # Update the edit info:
-            dest_info = dest_structure['blocks'][block_key]
+            dest_info = get_block_for_update(dest_structure['blocks'], block_key)
 
             # Update the edit_info:
             dest_info['edit_info']['previous_version'] = dest_info['edit_info']['update_version']
@@ -2191,6 +2285,8 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             orphans = orig_descendants - new_descendants
             for orphan in orphans:
                 del dest_structure['blocks'][orphan]
+            # the children of the whole copied subtree may have changed
+            self._invalidate_parent_index(dest_structure)
 
             self.update_structure(destination_course, dest_structure)
             self._update_head(destination_course, index_entry, destination_course.branch, dest_structure['_id'])
@@ -2233,7 +2329,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             # Now clone block_key to new_block_key:
             new_block_info = copy.deepcopy(source_block_info)
             # Note that new_block_info now points to the same definition ID entry as source_block_info did
-            existing_block_info = dest_structure['blocks'].get(new_block_key, {})
+            existing_block_info = get_block_for_update(dest_structure['blocks'], new_block_key, {})
             # Inherit the Scope.settings values from 'fields' to 'defaults'
             new_block_info['defaults'] = new_block_info['fields']
 
@@ -2277,7 +2373,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             new_children.append(new_block_key)
 
         # Update the children of new_parent_block_key
-        dest_structure['blocks'][new_parent_block_key]['fields']['children'] = new_children
+        get_block_for_update(dest_structure['blocks'], new_parent_block_key)['fields']['children'] = new_children
 
         return new_blocks
 
@@ -2313,15 +2409,18 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             new_id = new_structure['_id']
             parent_block_keys = self._get_parents_from_structure(block_key, original_structure)
             for parent_block_key in parent_block_keys:
-                parent_block = new_blocks[parent_block_key]
+                parent_block = get_block_for_update(new_blocks, parent_block_key)
                 parent_block['fields']['children'].remove(block_key)
+                self._update_parent_index(
+                    new_structure, parent_block_key, [block_key], parent_block['fields']['children']
+                )
                 parent_block['edit_info']['edited_on'] = datetime.datetime.now(UTC)
                 parent_block['edit_info']['edited_by'] = user_id
                 parent_block['edit_info']['previous_version'] = parent_block['edit_info']['update_version']
                 parent_block['edit_info']['update_version'] = new_id
                 self.decache_block(usage_locator.course_key, new_id, parent_block_key)
 
-            self._remove_subtree(BlockKey.from_usage_key(usage_locator), new_blocks)
+            self._remove_subtree(BlockKey.from_usage_key(usage_locator), new_blocks, new_structure.get(PARENT_INDEX))
 
             # update index if appropriate and structures
             self.update_structure(usage_locator.course_key, new_structure)
@@ -2336,12 +2435,16 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             return result
 
     @contract(block_key=BlockKey, blocks='dict(BlockKey: BlockData)')
-    def _remove_subtree(self, block_key, blocks):
+    def _remove_subtree(self, block_key, blocks, parent_index=None):
         """
         Remove the subtree rooted at block_key
+
+        If given, parent_index (the PARENT_INDEX of the structure owning blocks) is kept up to date.
         """
         for child in blocks[block_key]['fields'].get('children', []):
-            self._remove_subtree(BlockKey(*child), blocks)
+            self._remove_subtree(BlockKey(*child), blocks, parent_index)
+            if parent_index is not None:
+                parent_index[child].discard(block_key)
         del blocks[block_key]
 
     def delete_course(self, course_key, user_id):
@@ -2439,70 +2542,157 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         """
         Split specific lookup
         """
-        return self._lookup_course(course_key).structure.get('assets', {})
+        structure = self._lookup_course(course_key).structure
+        if 'asset_set' not in structure:
+            return structure.get('assets', {})
 
-    def _update_course_assets(self, user_id, asset_key, update_function):
+        course_assets = {}
+        for asset_doc in self.db_connection.find_asset_metadata_list(
+            structure['asset_set'], sort=[('filename', pymongo.ASCENDING)]
+        ):
+            course_assets.setdefault(asset_doc['asset_type'], []).append(asset_doc)
+        return course_assets
+
+    @contract(asset_key='AssetKey')
+    def find_asset_metadata(self, asset_key, **kwargs):
         """
-        A wrapper for functions wanting to manipulate assets. Gets and versions the structure,
-        passes the mutable array for either 'assets' or 'thumbnails' as well as the idx to the function for it to
-        update, then persists the changed data back into the course.
+        Find the metadata for a particular course asset.
 
-        The update function can raise an exception if it doesn't want to actually do the commit. The
-        surrounding method probably should catch that exception.
+        Arguments:
+            asset_key (AssetKey): key containing original asset filename
+
+        Returns:
+            asset metadata (AssetMetadata) -or- None if not found
         """
-        with self.bulk_operations(asset_key.course_key):
-            original_structure = self._lookup_course(asset_key.course_key).structure
-            index_entry = self._get_index_if_valid(asset_key.course_key)
-            new_structure = self.version_structure(asset_key.course_key, original_structure, user_id)
-            course_assets = new_structure.setdefault('assets', {})
+        structure = self._lookup_course(asset_key.course_key).structure
+        if 'asset_set' not in structure:
+            return super(SplitMongoModuleStore, self).find_asset_metadata(asset_key, **kwargs)
+
+        asset_doc = self.db_connection.find_asset_metadata(
+            structure['asset_set'], asset_key.asset_type, asset_key.path
+        )
+        if asset_doc is None:
+            return None
+        mdata = AssetMetadata(asset_key, asset_key.path, **kwargs)
+        mdata.from_storable(asset_doc)
+        return mdata
 
-            asset_type = asset_key.asset_type
-            all_assets = SortedAssetList(iterable=[])
-            # Assets should be pre-sorted, so add them efficiently without sorting.
-            # extend() will raise a ValueError if the passed-in list is not sorted.
-            all_assets.extend(course_assets.setdefault(asset_type, []))
-            asset_idx = all_assets.find(asset_key)
+    @contract(
+        course_key='CourseKey', asset_type='None | basestring',
+        start='int | None', maxresults='int | None', sort='tuple(str,(int,>=1,<=2))|None'
+    )
+    def get_all_asset_metadata(self, course_key, asset_type, start=0, maxresults=-1, sort=None, **kwargs):
+        """
+        Returns a list of asset metadata for all assets of the given asset_type in the course.
 
-            all_assets_updated = update_function(all_assets, asset_idx)
-            new_structure['assets'][asset_type] = all_assets_updated.as_list()
+        See :meth: `.ModuleStoreAssetBase.get_all_asset_metadata` for documentation. Split sorts and pages
+        the assets in mongo rather than loading them all.
+        """
+        structure = self._lookup_course(course_key).structure
+        if 'asset_set' not in structure:
+            return super(SplitMongoModuleStore, self).get_all_asset_metadata(
+                course_key, asset_type, start, maxresults, sort, **kwargs
+            )
+        if maxresults == 0:
+            return []
 
-            # update index if appropriate and structures
-            self.update_structure(asset_key.course_key, new_structure)
+        sort_key = 'filename'
+        direction = pymongo.ASCENDING
+        if sort:
+            if sort[0] == 'uploadDate':
+                sort_key = 'edit_info.edited_on'
+            if sort[1] == ModuleStoreEnum.SortOrder.descending:
+                direction = pymongo.DESCENDING
+
+        ret_assets = []
+        for asset_doc in self.db_connection.find_asset_metadata_list(
+            structure['asset_set'], asset_type, sort=[(sort_key, direction)], skip=start, limit=max(maxresults, 0)
+        ):
+            asset_key = course_key.make_asset_key(asset_doc['asset_type'], asset_doc['filename'])
+            new_asset = AssetMetadata(asset_key)
+            new_asset.from_storable(asset_doc)
+            ret_assets.append(new_asset)
+        return ret_assets
+
+    def _get_structure_asset_docs(self, structure):
+        """
+        Returns the metadata documents of all the assets of the given structure.
+        """
+        if 'asset_set' in structure:
+            return self.db_connection.find_asset_metadata_list(structure['asset_set'])
+        return [asset_doc for type_assets in structure.get('assets', {}).itervalues() for asset_doc in type_assets]
+
+    def _get_asset_set_for_update(self, course_key, user_id):
+        """
+        Returns the id of the course's asset set, which holds the course's asset metadata in the asset
+        metadata collection. Must be called within a bulk operation on the course.
+
+        Courses which don't have an asset set yet (because they never had any assets, or have their
+        asset metadata in the structure as courses used to) get a new structure version referencing a new
+        asset set holding any assets the structure had. The asset set is created atomically, so concurrent
+        first saves all use the same one.
+        """
+        structure = self._lookup_course(course_key).structure
+        if 'asset_set' in structure:
+            return structure['asset_set']
+
+        index_entry = self._get_index_if_valid(course_key)
+        if index_entry is None:
+            # no course (e.g. a version-only locator) to create the asset set for, so it can't be shared
+            asset_set, created = ObjectId(), True
+        else:
+            asset_set, created = self.db_connection.get_or_create_asset_set(index_entry['_id'], course_key.branch)
+        if created:
+            legacy_assets = self._get_structure_asset_docs(structure)
+            if legacy_assets:
+                self.db_connection.insert_asset_metadata(asset_set, legacy_assets)
+
+        new_structure = self.version_structure(course_key, structure, user_id)
+        new_structure.pop('assets', None)
+        new_structure['asset_set'] = asset_set
+        self.update_structure(course_key, new_structure)
+        if index_entry is not None:
+            # update the index entry if appropriate
+            self._update_head(course_key, index_entry, course_key.branch, new_structure['_id'])
+        return asset_set
 
-            if index_entry is not None:
-                # update the index entry if appropriate
-                self._update_head(asset_key.course_key, index_entry, asset_key.branch, new_structure['_id'])
+    def _update_course_assets(self, user_id, asset_key, update_function):
+        """
+        A wrapper for functions wanting to manipulate an asset's metadata. Passes the asset's current
+        metadata document (or None if it has none) to the function and saves the document the function
+        returns as the asset's new version. If the function returns None, the asset's metadata is deleted.
+
+        The update function can raise an exception if it doesn't want to actually do the commit. The
+        surrounding method probably should catch that exception.
+        """
+        with self.bulk_operations(asset_key.course_key):
+            asset_set = self._get_asset_set_for_update(asset_key.course_key, user_id)
+            asset_doc = self.db_connection.find_asset_metadata(asset_set, asset_key.asset_type, asset_key.path)
+            new_asset_doc = update_function(asset_doc)
+            if new_asset_doc is None:
+                self.db_connection.delete_asset_metadata(asset_set, asset_key.asset_type, asset_key.path)
+            else:
+                self.db_connection.insert_asset_metadata(asset_set, [new_asset_doc])
 
     def save_asset_metadata_list(self, asset_metadata_list, user_id, import_only=False):
         """
         Saves a list of AssetMetadata to the modulestore. The list can be composed of multiple
-        asset types. This method is optimized for multiple inserts at once - it only re-saves the structure
-        at the end of all saves/updates.
+        asset types. This method is optimized for multiple inserts at once - it saves all the
+        assets' new versions in bulk.
         """
         # Determine course key to use in bulk operation. Use the first asset assuming that
         # all assets will be for the same course.
         asset_key = asset_metadata_list[0].asset_id
         course_key = asset_key.course_key
 
-        with self.bulk_operations(course_key):
-            original_structure = self._lookup_course(course_key).structure
-            index_entry = self._get_index_if_valid(course_key)
-            new_structure = self.version_structure(course_key, original_structure, user_id)
-            course_assets = new_structure.setdefault('assets', {})
-
-            assets_by_type = self._save_assets_by_type(
-                course_key, asset_metadata_list, course_assets, user_id, import_only
-            )
-
-            for asset_type, assets in assets_by_type.iteritems():
-                new_structure['assets'][asset_type] = assets.as_list()
-
-            # update index if appropriate and structures
-            self.update_structure(course_key, new_structure)
+        asset_docs = [
+            asset_md.to_storable()
+            for asset_md in self._assets_to_save(course_key, asset_metadata_list, user_id, import_only)
+        ]
 
-            if index_entry is not None:
-                # update the index entry if appropriate
-                self._update_head(course_key, index_entry, asset_key.branch, new_structure['_id'])
+        with self.bulk_operations(course_key):
+            asset_set = self._get_asset_set_for_update(course_key, user_id)
+            self.db_connection.insert_asset_metadata(asset_set, asset_docs)
 
     def save_asset_metadata(self, asset_metadata, user_id, import_only=False):
         """
@@ -2523,21 +2713,20 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             ItemNotFoundError if no such item exists
             AttributeError is attr is one of the build in attrs.
         """
-        def _internal_method(all_assets, asset_idx):
+        def _internal_method(asset_doc):
             """
             Update the found item
             """
-            if asset_idx is None:
+            if asset_doc is None:
                 raise ItemNotFoundError(asset_key)
 
             # Form an AssetMetadata.
             mdata = AssetMetadata(asset_key, asset_key.path)
-            mdata.from_storable(all_assets[asset_idx])
+            mdata.from_storable(asset_doc)
             mdata.update(attr_dict)
 
-            # Generate a Mongo doc from the metadata and update the course asset info.
-            all_assets[asset_idx] = mdata.to_storable()
-            return all_assets
+            # Generate a Mongo doc from the metadata to save as the asset's new version.
+            return mdata.to_storable()
 
         self._update_course_assets(user_id, asset_key, _internal_method)
 
@@ -2552,15 +2741,13 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         Returns:
             Number of asset metadata entries deleted (0 or 1)
         """
-        def _internal_method(all_asset_info, asset_idx):
+        def _internal_method(asset_doc):
             """
             Remove the item if it was found
             """
-            if asset_idx is None:
+            if asset_doc is None:
                 raise ItemNotFoundError(asset_key)
-
-            all_asset_info.pop(asset_idx)
-            return all_asset_info
+            return None
 
         try:
             self._update_course_assets(user_id, asset_key, _internal_method)
@@ -2577,13 +2764,26 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             source_course_key (CourseKey): identifier of course to copy from
             dest_course_key (CourseKey): identifier of course to copy to
         """
+        self._copy_asset_metadata(source_course_key, dest_course_key, user_id)
+
+    def _copy_asset_metadata(self, source_course_key, dest_course_key, user_id):
+        """
+        Replace the assets of the dest_course_key branch with copies of the source_course_key branch's
+        assets in a new asset set.
+        """
         source_structure = self._lookup_course(source_course_key).structure
+        source_assets = self._get_structure_asset_docs(source_structure)
+
         with self.bulk_operations(dest_course_key):
             original_structure = self._lookup_course(dest_course_key).structure
             index_entry = self._get_index_if_valid(dest_course_key)
             new_structure = self.version_structure(dest_course_key, original_structure, user_id)
 
-            new_structure['assets'] = source_structure.get('assets', {})
+            asset_set = ObjectId()
+            if source_assets:
+                self.db_connection.insert_asset_metadata(asset_set, source_assets)
+            new_structure.pop('assets', None)
+            new_structure['asset_set'] = asset_set
             new_structure['thumbnails'] = source_structure.get('thumbnails', [])
 
             # update index if appropriate and structures
@@ -2603,12 +2803,13 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         original_structure = self._lookup_course(course_locator).structure
         index_entry = self._get_index_if_valid(course_locator)
         new_structure = self.version_structure(course_locator, original_structure, user_id)
-        for block in new_structure['blocks'].itervalues():
+        new_blocks = new_structure['blocks']
+        for block_key, block in new_blocks.items():
             if 'fields' in block and 'children' in block['fields']:
-                block['fields']["children"] = [
-                    block_id for block_id in block['fields']["children"]
-                    if block_id in new_structure['blocks']
-                ]
+                children = [block_id for block_id in block['fields']["children"] if block_id in new_blocks]
+                if children != block['fields']["children"]:
+                    get_block_for_update(new_blocks, block_key)['fields']["children"] = children
+        self._invalidate_parent_index(new_structure)
         self.update_structure(course_locator, new_structure)
         if index_entry is not None:
             # update the index entry if appropriate
@@ -2806,11 +3007,46 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         Given a structure, find block_key's parent in that structure. Note returns
         the encoded format for parent
         """
-        return [
-            parent_block_key
-            for parent_block_key, value in structure['blocks'].iteritems()
-            if block_key in value['fields'].get('children', [])
-        ]
+        return list(self._get_parent_index(structure).get(block_key, ()))
+
+    def _get_parent_index(self, structure):
+        """
+        Return the structure's child -> parents index, building it if the structure doesn't have one.
+        """
+        parent_index = structure.get(PARENT_INDEX)
+        if parent_index is None:
+            parent_index = structure[PARENT_INDEX] = build_parent_index(structure['blocks'])
+        return parent_index
+
+    def _get_block_type_index(self, structure):
+        """
+        Return the structure's block_type -> BlockKeys index, building it if the structure doesn't have one.
+        """
+        if BLOCK_TYPE_INDEX not in structure:
+            structure[BLOCK_TYPE_INDEX], structure[BLOCK_ID_INDEX] = build_block_key_indexes(structure['blocks'])
+        return structure[BLOCK_TYPE_INDEX]
+
+    def _get_block_id_index(self, structure):
+        """
+        Return the structure's block_id -> BlockKeys index, building it if the structure doesn't have one.
+        """
+        if BLOCK_ID_INDEX not in structure:
+            structure[BLOCK_TYPE_INDEX], structure[BLOCK_ID_INDEX] = build_block_key_indexes(structure['blocks'])
+        return structure[BLOCK_ID_INDEX]
+
+    def _update_parent_index(self, structure, parent_key, old_children, new_children):
+        """
+        Record in the structure's parent index that the children of parent_key changed
+        from old_children to new_children. Does nothing if the index hasn't been built.
+        """
+        update_parent_index(structure.get(PARENT_INDEX), parent_key, old_children, new_children)
+
+    def _invalidate_parent_index(self, structure):
+        """
+        Drop the structure's parent index (to be rebuilt when next needed) after changes
+        to its blocks' children which weren't tracked.
+        """
+        structure.pop(PARENT_INDEX, None)
 
     def _sync_children(self, source_parent, destination_parent, new_child):
         """
@@ -2833,11 +3069,15 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         destination_blocks="dict(BlockKey: *)",
         blacklist="list(BlockKey) | str",
     )
-    def _copy_subdag(self, user_id, destination_version, block_key, source_blocks, destination_blocks, blacklist):
+    def _copy_subdag(
+        self, user_id, destination_version, block_key, source_blocks, destination_blocks, blacklist, parent_index=None
+    ):
         """
         Update destination_blocks for the sub-dag rooted at block_key to be like the one in
         source_blocks excluding blacklist.
 
+        If given, parent_index (the PARENT_INDEX of the destination structure) is kept up to date.
+
         Return any newly discovered orphans (as a set)
         """
         orphans = set()
@@ -2887,9 +3127,17 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                 if child not in blacklist:
                     orphans.update(
                         self._copy_subdag(
-                            user_id, destination_version, BlockKey(*child), source_blocks, destination_blocks, blacklist
+                            user_id, destination_version, BlockKey(*child), source_blocks, destination_blocks,
+                            blacklist, parent_index
                         )
                     )
+        old_block = destination_blocks.get(block_key)
+        update_parent_index(
+            parent_index,
+            block_key,
+            old_block['fields'].get('children', []) if old_block else [],
+            destination_block['fields'].get('children', []),
+        )
         destination_blocks[block_key] = destination_block
         return orphans
 
@@ -2911,9 +3159,11 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         Delete the orphan and any of its descendants which no longer have parents.
         """
         if len(self._get_parents_from_structure(orphan, structure)) == 0:
-            for child in structure['blocks'][orphan]['fields'].get('children', []):
+            children = structure['blocks'][orphan]['fields'].get('children', [])
+            for child in children:
                 self._delete_if_true_orphan(BlockKey(*child), structure)
             del structure['blocks'][orphan]
+            self._update_parent_index(structure, orphan, children, [])
 
     @contract(returns=BlockData)
     def _new_block(self, user_id, category, block_fields, definition_id, new_id, raw=False, block_defaults=None):
@@ -2956,6 +3206,13 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         Encodes the block key before accessing it in the structure to ensure it can
         be a json dict key.
         """
+        old_block = structure['blocks'].get(block_key)
+        self._update_parent_index(
+            structure,
+            block_key,
+            old_block['fields'].get('children', []) if old_block else [],
+            content['fields'].get('children', []),
+        )
         structure['blocks'][block_key] = content
 
     @autoretry_read()
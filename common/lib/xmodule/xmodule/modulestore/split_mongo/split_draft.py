@@ -5,13 +5,12 @@ Module for the dual-branch fall-back Draft->Published Versioning ModuleStore
 from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore, EXCLUDE_ALL
 from xmodule.exceptions import InvalidVersionError
 from xmodule.modulestore import ModuleStoreEnum
-from xmodule.modulestore.courseware_index import CoursewareSearchIndexer
 from xmodule.modulestore.exceptions import InsufficientSpecificationError, ItemNotFoundError
 from xmodule.modulestore.draft_and_published import (
     ModuleStoreDraftAndPublished, DIRECT_ONLY_CATEGORIES, UnsupportedRevisionError
 )
 from opaque_keys.edx.locator import CourseLocator, LibraryLocator, LibraryUsageLocator
-from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo import BlockKey, PARENT_INDEX
 from contracts import contract
 
 
@@ -204,9 +203,9 @@ class DraftVersioningModuleStore(SplitMongoModuleStore, ModuleStoreDraftAndPubli
                 if branch == ModuleStoreEnum.BranchName.draft and branched_location.block_type in DIRECT_ONLY_CATEGORIES:
                     self.publish(parent_loc.version_agnostic(), user_id, blacklist=EXCLUDE_ALL, **kwargs)
 
-        # Remove this location from the courseware search index so that searches
-        # will refrain from showing it as a result
-        CoursewareSearchIndexer.add_to_search_index(self, location, delete=True)
+            # Deleting published content changes what the courseware search index should show
+            if ModuleStoreEnum.BranchName.published in branches_to_delete:
+                self._flag_publish_event(location.course_key)
 
     def _map_revision_to_branch(self, key, revision=None):
         """
@@ -333,6 +332,67 @@ class DraftVersioningModuleStore(SplitMongoModuleStore, ModuleStoreDraftAndPubli
 
         return has_changes_subtree(BlockKey.from_usage_key(xblock.location))
 
+    def get_blocks_with_changes(self, course_key):
+        """
+        Returns the set of usage keys (without branch or version) of the blocks in the course's draft branch for
+        which has_changes is True.
+        """
+        course_key = course_key.version_agnostic().for_branch(None)
+        return set(
+            course_key.make_usage_key(block_key.type, block_key.id)
+            for block_key in self._get_block_keys_with_changes(course_key)
+        )
+
+    def _get_block_keys_with_changes(self, course_key):
+        """
+        Returns the set of BlockKeys of the blocks in the course's draft branch which differ from their published
+        versions, or have descendants which do, comparing the draft and published structures in a single pass.
+
+        The result is kept in the request cache (if there is one) for the pair of structure versions.
+        """
+        draft_structure = self._lookup_course(course_key.for_branch(ModuleStoreEnum.BranchName.draft)).structure
+        published_structure = self._lookup_course(
+            course_key.for_branch(ModuleStoreEnum.BranchName.published)
+        ).structure
+
+        cache = None
+        bulk_write_record = self._get_bulk_ops_record(course_key)
+        # a bulk operation changes its structures in place, without new versions, so don't cache those
+        if self.request_cache is not None and not (bulk_write_record.active and bulk_write_record.dirty_branches):
+            cache = self.request_cache.data.setdefault('block_keys_with_changes', {})
+            versions = (draft_structure['_id'], published_structure['_id'])
+            if versions in cache:
+                return cache[versions]
+
+        draft_blocks = draft_structure['blocks']
+        published_blocks = published_structure['blocks']
+        block_has_changes = {}
+
+        def has_changes_subtree(block_key):
+            """
+            Returns whether the block or any of its descendants has changes, memoizing the result.
+            """
+            if block_key not in block_has_changes:
+                draft_block = draft_blocks.get(block_key)
+                published_block = published_blocks.get(block_key)
+                if draft_block is None or published_block is None:  # draft_block is None for bad pointers TNL-1141
+                    changed = True
+                elif self._get_version(draft_block) != self._get_version(published_block):
+                    changed = True
+                else:
+                    changed = any([
+                        has_changes_subtree(child_key) for child_key in draft_block.fields.get('children', [])
+                    ])
+                block_has_changes[block_key] = changed
+            return block_has_changes[block_key]
+
+        block_keys_with_changes = set(
+            block_key for block_key in draft_blocks if has_changes_subtree(block_key)
+        )
+        if cache is not None:
+            cache[versions] = block_keys_with_changes
+        return block_keys_with_changes
+
     def publish(self, location, user_id, blacklist=None, **kwargs):
         """
         Publishes the subtree under location from the draft branch to the published branch
@@ -351,8 +411,7 @@ class DraftVersioningModuleStore(SplitMongoModuleStore, ModuleStoreDraftAndPubli
             blacklist=blacklist
         )
 
-        # Now it's been published, add the object to the courseware search index so that it appears in search results
-        CoursewareSearchIndexer.add_to_search_index(self, location)
+        self._flag_publish_event(location.course_key)
 
         return self.get_item(location.for_branch(ModuleStoreEnum.BranchName.published), **kwargs)
 
@@ -397,7 +456,9 @@ class DraftVersioningModuleStore(SplitMongoModuleStore, ModuleStoreDraftAndPubli
             new_structure = self.version_structure(draft_course_key, draft_course_structure, user_id)
 
             # remove the block and its descendants from the new structure
-            self._remove_subtree(BlockKey.from_usage_key(location), new_structure['blocks'])
+            self._remove_subtree(
+                BlockKey.from_usage_key(location), new_structure['blocks'], new_structure.get(PARENT_INDEX)
+            )
 
             # copy over the block and its descendants from the published branch
             def copy_from_published(root_block_id):
@@ -2,6 +2,7 @@
 Tests for assetstore using any of the modulestores for metadata. May extend to testing the storage options
 too.
 """
+from bson.objectid import ObjectId
 from datetime import datetime, timedelta
 import ddt
 from nose.plugins.attrib import attr
@@ -16,10 +17,13 @@ from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.modulestore.tests.factories import CourseFactory
 from xmodule.modulestore.tests.test_cross_modulestore_import_export import (
     MIXED_MODULESTORE_BOTH_SETUP, MODULESTORE_SETUPS, MongoContentstoreBuilder,
-    XmlModulestoreBuilder, MixedModulestoreBuilder
+    XmlModulestoreBuilder, MixedModulestoreBuilder, VersioningModulestoreBuilder
 )
 
 
+MIXED_SPLIT_SETUP = MixedModulestoreBuilder([('split', VersioningModulestoreBuilder())])
+
+
 class AssetStoreTestData(object):
     """
     Shared data for constructing test assets.
@@ -729,3 +733,120 @@ class TestMongoAssetMetadataStorage(unittest.TestCase):
                 self.assertEquals(len(all_assets), 2)
                 self.assertEquals(all_assets[0].asset_id.path, 'pic1.jpg')
                 self.assertEquals(all_assets[1].asset_id.path, 'shout.ogg')
+
+    def test_split_asset_changes_dont_version_structure(self):
+        """
+        Once a split course has an asset set, changing its assets' metadata leaves its structures alone,
+        and keeps the replaced versions of the metadata.
+        """
+        # pylint: disable=protected-access
+        with MongoContentstoreBuilder().build() as contentstore:
+            with MIXED_SPLIT_SETUP.build(contentstore) as mixed_store:
+                course = CourseFactory.create(modulestore=mixed_store)
+                store = mixed_store._get_modulestore_by_type(ModuleStoreEnum.Type.split)
+                asset_key = course.id.make_asset_key('asset', 'burnside.jpg')
+                store.save_asset_metadata(self._make_asset_metadata(asset_key), ModuleStoreEnum.UserID.test)
+                versions = store.get_course_index_info(course.id)['versions']
+
+                store.save_asset_metadata(self._make_asset_metadata(asset_key), ModuleStoreEnum.UserID.test)
+                store.set_asset_metadata_attr(asset_key, 'locked', True, ModuleStoreEnum.UserID.test)
+                self.assertTrue(store.find_asset_metadata(asset_key).locked)
+                self.assertEquals(store.get_course_index_info(course.id)['versions'], versions)
+
+                asset_versions = store.db_connection.asset_metadata.find({'filename': 'burnside.jpg'})
+                # three versions on each of the draft and published branches
+                self.assertEquals(asset_versions.count(), 6)
+                self.assertEquals(len([version for version in asset_versions if version['current']]), 2)
+
+                self.assertEquals(store.delete_asset_metadata(asset_key, ModuleStoreEnum.UserID.test), 1)
+                self.assertIsNone(store.find_asset_metadata(asset_key))
+                self.assertEquals(store.get_course_index_info(course.id)['versions'], versions)
+
+    def test_split_asset_saves_keep_one_current_version(self):
+        """
+        Saving the same split asset twice in one list, or in two saves which race, leaves one current version.
+        """
+        # pylint: disable=protected-access
+        with MongoContentstoreBuilder().build() as contentstore:
+            with MIXED_SPLIT_SETUP.build(contentstore) as mixed_store:
+                course = CourseFactory.create(modulestore=mixed_store)
+                store = mixed_store._get_modulestore_by_type(ModuleStoreEnum.Type.split)
+                asset_key = course.id.make_asset_key('asset', 'burnside.jpg')
+                unlocked_md = self._make_asset_metadata(asset_key)
+                locked_md = self._make_asset_metadata(asset_key)
+                locked_md.locked = True
+                store.save_asset_metadata_list([unlocked_md, locked_md], ModuleStoreEnum.UserID.test)
+                self.assertTrue(store.find_asset_metadata(asset_key).locked)
+
+                connection = store.db_connection
+                current = connection.asset_metadata.find_one({'filename': 'burnside.jpg', 'current': True})
+                racing_docs = []
+                for __ in range(2):
+                    racing_doc = dict(current, _id=ObjectId(), previous_version=current['_id'])
+                    connection.asset_metadata.insert(racing_doc)
+                    racing_docs.append(racing_doc)
+                for racing_doc in racing_docs:
+                    connection._retire_replaced_asset_metadata(racing_doc)
+                current_ids = [
+                    version['_id'] for version in connection.asset_metadata.find(
+                        {'asset_set': current['asset_set'], 'filename': 'burnside.jpg', 'current': True}
+                    )
+                ]
+                self.assertEquals(current_ids, [racing_docs[0]['_id']])
+
+    def test_split_asset_set_created_once(self):
+        """
+        A split course branch gets one asset set, however many first saves create it.
+        """
+        # pylint: disable=protected-access
+        with MongoContentstoreBuilder().build() as contentstore:
+            with MIXED_SPLIT_SETUP.build(contentstore) as mixed_store:
+                course = CourseFactory.create(modulestore=mixed_store)
+                store = mixed_store._get_modulestore_by_type(ModuleStoreEnum.Type.split)
+                course_index_id = store.get_course_index_info(course.id)['_id']
+                asset_set, created = store.db_connection.get_or_create_asset_set(course_index_id, 'draft')
+                self.assertTrue(created)
+                self.assertEquals(
+                    store.db_connection.get_or_create_asset_set(course_index_id, 'draft'), (asset_set, False)
+                )
+                self.assertNotEqual(
+                    store.db_connection.get_or_create_asset_set(course_index_id, 'published')[0], asset_set
+                )
+
+                # a save which creates the draft branch's asset set uses the one already created
+                asset_key = course.id.make_asset_key('asset', 'burnside.jpg')
+                store.save_asset_metadata(self._make_asset_metadata(asset_key), ModuleStoreEnum.UserID.test)
+                structure = store._lookup_course(course.id.for_branch(ModuleStoreEnum.BranchName.draft)).structure
+                self.assertEquals(structure['asset_set'], asset_set)
+
+    def test_split_assets_in_structure(self):
+        """
+        Split courses whose assets are in their structures find them there, and move them into an asset set
+        when they change.
+        """
+        # pylint: disable=protected-access
+        with MongoContentstoreBuilder().build() as contentstore:
+            with MIXED_SPLIT_SETUP.build(contentstore) as mixed_store:
+                course = CourseFactory.create(modulestore=mixed_store)
+                store = mixed_store._get_modulestore_by_type(ModuleStoreEnum.Type.split)
+                asset_key = course.id.make_asset_key('asset', 'burnside.jpg')
+                asset_md = self._make_asset_metadata(asset_key)
+                for branch in (ModuleStoreEnum.BranchName.draft, ModuleStoreEnum.BranchName.published):
+                    branch_key = course.id.for_branch(branch)
+                    with store.bulk_operations(branch_key):
+                        index_entry = store._get_index_if_valid(branch_key)
+                        structure = store._lookup_course(branch_key).structure
+                        new_structure = store.version_structure(branch_key, structure, ModuleStoreEnum.UserID.test)
+                        new_structure['assets'] = {'asset': [asset_md.to_storable()]}
+                        store.update_structure(branch_key, new_structure)
+                        store._update_head(branch_key, index_entry, branch, new_structure['_id'])
+
+                self.assertEquals(store.find_asset_metadata(asset_key), asset_md)
+                self.assertEquals(len(store.get_all_asset_metadata(course.id, 'asset')), 1)
+
+                store.set_asset_metadata_attr(asset_key, 'locked', True, ModuleStoreEnum.UserID.test)
+                structure = store._lookup_course(course.id.for_branch(ModuleStoreEnum.BranchName.draft)).structure
+                self.assertNotIn('assets', structure)
+                self.assertIn('asset_set', structure)
+                self.assertTrue(store.find_asset_metadata(asset_key).locked)
+                self.assertEquals(len(store.get_all_asset_metadata(course.id, 'asset')), 1)
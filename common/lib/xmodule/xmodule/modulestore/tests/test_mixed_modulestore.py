@@ -7,6 +7,7 @@ import datetime
 import ddt
 import itertools
 import mimetypes
+from mock import Mock
 from uuid import uuid4
 
 # Mixed modulestore depends on django, so we'll manually configure some django settings
@@ -594,6 +595,63 @@ class TestMixedModuleStore(CourseComparisonTest):
         self.assertFalse(self._has_changes(locations['grandparent']))
         self.assertFalse(self._has_changes(locations['parent']))
 
+    @ddt.data('draft', 'split')
+    def test_get_blocks_with_changes(self, default_ms):
+        """
+        Tests that get_blocks_with_changes() returns the blocks for which has_changes() is true
+        """
+        locations = self.setup_has_changes(default_ms)
+
+        def keys_with_changes():
+            """
+            Returns the keys of the locations in get_blocks_with_changes(), checking has_changes() agrees
+            """
+            blocks_with_changes = self.store.get_blocks_with_changes(locations['parent'].course_key)
+            keys = set(
+                key for key, location in locations.iteritems()
+                if location.version_agnostic().for_branch(None) in blocks_with_changes
+            )
+            self.assertEqual(keys, set(key for key in locations if self._has_changes(locations[key])))
+            return keys
+
+        self.assertEqual(keys_with_changes(), set())
+
+        # Change the child
+        child = self.store.get_item(locations['child'])
+        child.display_name = 'Changed Display Name'
+        self.store.update_item(child, self.user_id)
+        self.assertEqual(keys_with_changes(), set(['grandparent', 'parent', 'child']))
+
+        # Publish the unit with changes
+        self.store.publish(locations['parent'], self.user_id)
+        self.assertEqual(keys_with_changes(), set())
+
+    @ddt.data('draft', 'split')
+    def test_course_published_signal(self, default_ms):
+        """
+        Tests that publishing sends the course_published signal, once for a whole bulk operation
+        """
+        locations = self.setup_has_changes(default_ms)
+        course_key = locations['parent'].course_key
+        signal_handler = Mock()
+        store = self.store._get_modulestore_for_courselike(course_key)  # pylint: disable=protected-access
+        store.signal_handler = signal_handler
+
+        self.store.publish(locations['parent'], self.user_id)
+        signal_handler.send.assert_called_once_with("course_published", course_key=course_key.for_branch(None))
+
+        signal_handler.reset_mock()
+        with self.store.bulk_operations(course_key):
+            self.store.publish(locations['parent'], self.user_id)
+            self.store.publish(locations['parent_sibling'], self.user_id)
+            self.assertFalse(signal_handler.send.called)
+        signal_handler.send.assert_called_once_with("course_published", course_key=course_key.for_branch(None))
+
+        # deleting published content changes the course's published content too
+        signal_handler.reset_mock()
+        self.store.delete_item(locations['child'], self.user_id, revision=ModuleStoreEnum.RevisionOption.all)
+        signal_handler.send.assert_called_once_with("course_published", course_key=course_key.for_branch(None))
+
     @ddt.data('draft', 'split')
     def test_has_changes_add_remove_child(self, default_ms):
         """
@@ -692,8 +750,8 @@ class TestMixedModuleStore(CourseComparisonTest):
     #   Sends: delete item, update parent
     # Split
     #   Find: active_versions, 2 structures (published & draft), definition (unnecessary)
-    #   Sends: updated draft and published structures and active_versions
-    @ddt.data(('draft', 7, 2), ('split', 4, 3))
+    #   Sends: updated draft and published structures (in one bulk insert) and active_versions
+    @ddt.data(('draft', 7, 2), ('split', 4, 2))
     @ddt.unpack
     def test_delete_item(self, default_ms, max_find, max_send):
         """
@@ -16,6 +16,7 @@ from uuid import uuid4
 from datetime import datetime
 from pytz import UTC
 import unittest
+from mock import patch
 from xblock.core import XBlock
 
 from xblock.fields import Scope, Reference, ReferenceList, ReferenceValueDict
@@ -41,6 +42,7 @@ from git.test.lib.asserts import assert_not_none
 from xmodule.x_module import XModuleMixin
 from xmodule.modulestore.mongo.base import as_draft
 from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
+from xmodule.modulestore.tests.test_cross_modulestore_import_export import MemoryCache
 from xmodule.modulestore.edit_info import EditInfoMixin
 from xmodule.modulestore.exceptions import ItemNotFoundError
 
@@ -705,6 +707,39 @@ class TestMongoModuleStore(TestMongoModuleStoreBase):
         # Clean up the data so we don't break other tests which apparently expect a particular state
         self.draft_store.delete_course(course.id, self.dummy_user)
 
+    def test_incremental_metadata_inheritance_update(self):
+        """
+        Test that updating a container recomputes only its part of the cached inheritance tree
+        and that the result matches a full recomputation
+        """
+        self.draft_store.metadata_inheritance_cache_subsystem = MemoryCache()
+        self.addCleanup(setattr, self.draft_store, 'metadata_inheritance_cache_subsystem', None)
+
+        course = self.draft_store.create_course("TestX", "Inherit", "1234_A1", self.dummy_user)
+        chapter = self.draft_store.create_child(self.dummy_user, course.location, 'chapter', 'chapter')
+        sequential = self.draft_store.create_child(self.dummy_user, chapter.location, 'sequential', 'sequential')
+        problem = self.draft_store.create_child(self.dummy_user, sequential.location, 'problem', 'problem')
+        self.addCleanup(self.draft_store.delete_course, course.id, self.dummy_user)
+
+        chapter = self.draft_store.get_item(chapter.location)
+        chapter.showanswer = 'never'
+        with patch.object(
+            self.draft_store, '_compute_metadata_inheritance_tree',
+            wraps=self.draft_store._compute_metadata_inheritance_tree  # pylint: disable=protected-access
+        ) as compute_tree:
+            self.draft_store.update_item(chapter, self.dummy_user)
+            self.assertFalse(compute_tree.called)
+
+        tree = self.draft_store._get_cached_metadata_inheritance_tree(course.id)  # pylint: disable=protected-access
+        self.assertEqual(tree[unicode(problem.location)]['showanswer'], 'never')
+        self.assertEqual(
+            tree,
+            self.draft_store._compute_metadata_inheritance_tree(course.id)  # pylint: disable=protected-access
+        )
+        # servers that cache bare trees under the course id must not see versioned entries
+        cached = self.draft_store.metadata_inheritance_cache_subsystem._data  # pylint: disable=protected-access
+        self.assertNotIn(unicode(course.id), cached)
+
 
 class TestMongoModuleStoreWithNoAssetCollection(TestMongoModuleStore):
     '''
@@ -0,0 +1,87 @@
+"""
+Tests of the copy-on-write sharing of blocks between versions of split modulestore structures.
+"""
+import copy
+import cPickle as pickle
+import unittest
+
+from xmodule.modulestore.split_mongo import (
+    BlockKey, BlockData, CopyOnWriteBlocks, share_blocks, get_block_for_update
+)
+
+
+class TestCopyOnWriteBlocks(unittest.TestCase):
+    """
+    Tests of CopyOnWriteBlocks and share_blocks.
+    """
+    def setUp(self):
+        super(TestCopyOnWriteBlocks, self).setUp()
+        self.root = BlockKey('course', 'course')
+        self.chapter = BlockKey('chapter', 'chapter')
+        self.structure = {
+            'blocks': {
+                self.root: BlockData({'block_type': 'course', 'fields': {'children': [self.chapter]}}),
+                self.chapter: BlockData({'block_type': 'chapter', 'fields': {'display_name': 'Chapter'}}),
+            },
+        }
+        self.original_blocks = dict(self.structure['blocks'])
+
+    def test_unchanged_blocks_are_shared(self):
+        new_blocks = share_blocks(self.structure)
+        for block_key, block in self.original_blocks.iteritems():
+            self.assertIs(dict.get(new_blocks, block_key), block)
+            self.assertIs(dict.get(self.structure['blocks'], block_key), block)
+
+    def test_read_blocks_are_shared(self):
+        new_blocks = share_blocks(self.structure)
+        self.assertIs(new_blocks[self.chapter], self.original_blocks[self.chapter])
+        self.assertIs(new_blocks.get(self.chapter), self.original_blocks[self.chapter])
+        self.assertIs(self.structure['blocks'][self.chapter], self.original_blocks[self.chapter])
+
+    def test_blocks_for_update_are_copied(self):
+        new_blocks = share_blocks(self.structure)
+        get_block_for_update(new_blocks, self.chapter)['fields']['display_name'] = 'Changed'
+        self.assertIsNot(new_blocks[self.chapter], self.original_blocks[self.chapter])
+        self.assertEqual(self.structure['blocks'][self.chapter]['fields']['display_name'], 'Chapter')
+        # the untouched block is still shared
+        self.assertIs(dict.get(new_blocks, self.root), self.original_blocks[self.root])
+
+    def test_old_version_changes_are_not_seen(self):
+        new_blocks = share_blocks(self.structure)
+        get_block_for_update(self.structure['blocks'], self.chapter)['fields']['display_name'] = 'Changed'
+        self.assertEqual(new_blocks[self.chapter]['fields']['display_name'], 'Chapter')
+
+    def test_blocks_are_copied_once(self):
+        new_blocks = share_blocks(self.structure)
+        block = get_block_for_update(new_blocks, self.chapter)
+        self.assertIs(get_block_for_update(new_blocks, self.chapter), block)
+        self.assertIs(new_blocks[self.chapter], block)
+
+    def test_set_and_delete(self):
+        new_blocks = share_blocks(self.structure)
+        new_chapter = BlockData({'block_type': 'chapter', 'fields': {}})
+        new_blocks[self.chapter] = new_chapter
+        self.assertIs(new_blocks[self.chapter], new_chapter)
+        del new_blocks[self.root]
+        self.assertNotIn(self.root, new_blocks)
+        self.assertIn(self.root, self.structure['blocks'])
+
+    def test_plain_dict_blocks_for_update(self):
+        self.assertIs(get_block_for_update(self.original_blocks, self.chapter), self.original_blocks[self.chapter])
+        self.assertIsNone(get_block_for_update(self.original_blocks, BlockKey('html', 'missing')))
+
+    def test_pickles_as_dict(self):
+        new_blocks = share_blocks(self.structure)
+        for unpickled in (pickle.loads(pickle.dumps(new_blocks, pickle.HIGHEST_PROTOCOL)), copy.deepcopy(new_blocks)):
+            self.assertIs(type(unpickled), dict)
+            self.assertEqual(sorted(unpickled.keys()), sorted(new_blocks.keys()))
+            self.assertIsNot(unpickled[self.chapter], self.original_blocks[self.chapter])
+            self.assertEqual(unpickled[self.chapter]['fields'], {'display_name': 'Chapter'})
+
+    def test_sharing_shared_blocks(self):
+        new_blocks = share_blocks(self.structure)
+        newer_blocks = share_blocks({'blocks': new_blocks})
+        get_block_for_update(newer_blocks, self.chapter)['fields']['display_name'] = 'Changed'
+        self.assertIsInstance(newer_blocks, CopyOnWriteBlocks)
+        self.assertEqual(new_blocks[self.chapter]['fields']['display_name'], 'Chapter')
+        self.assertEqual(self.structure['blocks'][self.chapter]['fields']['display_name'], 'Chapter')
@@ -10,6 +10,7 @@ import unittest
 import uuid
 
 from contracts import contract
+from mock import patch
 from nose.plugins.attrib import attr
 
 from xblock.fields import Reference, ReferenceList, ReferenceValueDict
@@ -924,6 +925,12 @@ class SplitModuleItemTests(SplitModuleTest):
             settings={'display_name': re.compile(r'Hera')},
         )
         self.assertEqual(len(matches), 2)
+        matches = modulestore().get_items(locator, qualifiers={'category': {'$in': ['chapter', 'problem']}})
+        self.assertEqual(len(matches), 5)
+        matches = modulestore().get_items(locator, qualifiers={'category': re.compile(r'^prob')})
+        self.assertEqual(len(matches), 2)
+        matches = modulestore().get_items(locator, qualifiers={'name': 'chapter2'})
+        self.assertEqual([match.location.block_id for match in matches], ['chapter2'])
 
     def test_get_parents(self):
         '''
@@ -1241,6 +1248,41 @@ class TestItemCrud(SplitModuleTest):
         self.assertEqual(history_info['previous_version'], pre_version_guid)
         self.assertEqual(history_info['edited_by'], self.user_id)
 
+    def test_update_shares_unchanged_blocks(self):
+        """
+        test that only the updated block is copied into the new version of the structure
+        """
+        locator = BlockUsageLocator(
+            CourseLocator(org="testx", course="GreekHero", run="run", branch=BRANCH_NAME_DRAFT),
+            'problem', block_id="problem3_2"
+        )
+        store = modulestore()
+        problem = store.get_item(locator)
+        problem.max_attempts = 4
+        problem.save()
+
+        versions = []
+        version_structure = store.version_structure
+
+        def record_version(*args, **kwargs):
+            """Record the structure versioned and its new version"""
+            new_structure = version_structure(*args, **kwargs)
+            versions.append((args[1], new_structure))
+            return new_structure
+
+        with patch.object(store, 'version_structure', side_effect=record_version):
+            store.update_item(problem, self.user_id)
+
+        self.assertEqual(len(versions), 1)
+        old_blocks, new_blocks = versions[0][0]['blocks'], versions[0][1]['blocks']
+        problem_key = BlockKey.from_usage_key(locator)
+        self.assertEqual(new_blocks[problem_key]['fields']['max_attempts'], 4)
+        self.assertNotEqual(old_blocks[problem_key]['fields'].get('max_attempts'), 4)
+        self.assertIsNot(dict.get(new_blocks, problem_key), dict.get(old_blocks, problem_key))
+        for block_key in old_blocks:
+            if block_key != problem_key:
+                self.assertIs(dict.get(new_blocks, block_key), dict.get(old_blocks, block_key))
+
     def test_update_children(self):
         """
         test updating an item's children ensuring the definition doesn't version but the course does if it should
@@ -1432,6 +1474,35 @@ class TestItemCrud(SplitModuleTest):
             # Clean up the data so we don't break other tests which apparently expect a particular state
             store.delete_course(refetch_course.id, user)
 
+    def test_parents_in_bulk_operation(self):
+        """
+        Test that parent lookups see the edits made earlier in the same bulk operation
+        """
+        store = modulestore()
+        course_key = CourseLocator('test_org', 'test_parents', 'test_run', branch=BRANCH_NAME_DRAFT)
+        with store.bulk_operations(course_key):
+            course = store.create_course('test_org', 'test_parents', 'test_run', self.user_id, BRANCH_NAME_DRAFT)
+            course_loc = course.location.version_agnostic()
+            chapter_loc = store.create_child(self.user_id, course_loc, 'chapter').location.version_agnostic()
+            vertical_loc = store.create_child(self.user_id, chapter_loc, 'vertical').location.version_agnostic()
+            self.assertEqual(store.get_parent_location(chapter_loc), course_loc)
+            self.assertEqual(store.get_parent_location(vertical_loc), chapter_loc)
+
+            # moving the vertical under another chapter reparents it
+            other_chapter_loc = store.create_child(self.user_id, course_loc, 'chapter').location.version_agnostic()
+            chapter = store.get_item(chapter_loc)
+            chapter.children = []
+            store.update_item(chapter, self.user_id)
+            other_chapter = store.get_item(other_chapter_loc)
+            other_chapter.children = [vertical_loc]
+            store.update_item(other_chapter, self.user_id)
+            self.assertEqual(store.get_parent_location(vertical_loc), other_chapter_loc)
+
+            store.delete_item(other_chapter_loc, self.user_id)
+            self.assertIsNone(store.get_parent_location(other_chapter_loc))
+            self.assertIsNone(store.get_parent_location(vertical_loc))
+            store.delete_course(course_key, self.user_id)
+
 
 class TestCourseCreation(SplitModuleTest):
     """
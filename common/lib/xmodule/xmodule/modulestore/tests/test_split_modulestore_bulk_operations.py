@@ -3,6 +3,7 @@ import ddt
 import unittest
 from bson.objectid import ObjectId
 from mock import MagicMock, Mock, call
+from pymongo.errors import BulkWriteError
 from xmodule.modulestore.split_mongo.split import SplitBulkWriteMixin
 from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection
 
@@ -128,7 +129,7 @@ class TestBulkWriteMixinClosed(TestBulkWriteMixin):
         self.bulk.update_structure(self.course_key, self.structure)
         self.assertConnCalls()
         self.bulk._end_bulk_operation(self.course_key)
-        self.assertConnCalls(call.insert_structure(self.structure))
+        self.assertConnCalls(call.insert_structures([self.structure]))
 
     def test_write_multiple_structures_on_close(self):
         self.conn.get_course_index.return_value = None
@@ -139,10 +140,8 @@ class TestBulkWriteMixinClosed(TestBulkWriteMixin):
         self.bulk.update_structure(self.course_key.replace(branch='b'), other_structure)
         self.assertConnCalls()
         self.bulk._end_bulk_operation(self.course_key)
-        self.assertItemsEqual(
-            [call.insert_structure(self.structure), call.insert_structure(other_structure)],
-            self.conn.mock_calls
-        )
+        self.assertEqual(len(self.conn.mock_calls), 1)
+        self.assertItemsEqual(self.conn.insert_structures.call_args[0][0], [self.structure, other_structure])
 
     def test_write_index_and_definition_on_close(self):
         original_index = {'versions': {}}
@@ -154,7 +153,7 @@ class TestBulkWriteMixinClosed(TestBulkWriteMixin):
         self.assertConnCalls()
         self.bulk._end_bulk_operation(self.course_key)
         self.assertConnCalls(
-            call.insert_definition(self.definition),
+            call.insert_definitions([self.definition]),
             call.update_course_index(
                 {'versions': {self.course_key.branch: self.definition['_id']}},
                 from_index=original_index
@@ -171,16 +170,11 @@ class TestBulkWriteMixinClosed(TestBulkWriteMixin):
         self.bulk.update_definition(self.course_key.replace(branch='b'), other_definition)
         self.bulk.insert_course_index(self.course_key, {'versions': {'a': self.definition['_id'], 'b': other_definition['_id']}})
         self.bulk._end_bulk_operation(self.course_key)
-        self.assertItemsEqual(
-            [
-                call.insert_definition(self.definition),
-                call.insert_definition(other_definition),
-                call.update_course_index(
-                    {'versions': {'a': self.definition['_id'], 'b': other_definition['_id']}},
-                    from_index=original_index
-                )
-            ],
-            self.conn.mock_calls
+        self.assertEqual(len(self.conn.mock_calls), 2)
+        self.assertItemsEqual(self.conn.insert_definitions.call_args[0][0], [self.definition, other_definition])
+        self.conn.update_course_index.assert_called_once_with(
+            {'versions': {'a': self.definition['_id'], 'b': other_definition['_id']}},
+            from_index=original_index
         )
 
     def test_write_definition_on_close(self):
@@ -190,7 +184,7 @@ class TestBulkWriteMixinClosed(TestBulkWriteMixin):
         self.bulk.update_definition(self.course_key, self.definition)
         self.assertConnCalls()
         self.bulk._end_bulk_operation(self.course_key)
-        self.assertConnCalls(call.insert_definition(self.definition))
+        self.assertConnCalls(call.insert_definitions([self.definition]))
 
     def test_write_multiple_definitions_on_close(self):
         self.conn.get_course_index.return_value = None
@@ -201,10 +195,8 @@ class TestBulkWriteMixinClosed(TestBulkWriteMixin):
         self.bulk.update_definition(self.course_key.replace(branch='b'), other_definition)
         self.assertConnCalls()
         self.bulk._end_bulk_operation(self.course_key)
-        self.assertItemsEqual(
-            [call.insert_definition(self.definition), call.insert_definition(other_definition)],
-            self.conn.mock_calls
-        )
+        self.assertEqual(len(self.conn.mock_calls), 1)
+        self.assertItemsEqual(self.conn.insert_definitions.call_args[0][0], [self.definition, other_definition])
 
     def test_write_index_and_structure_on_close(self):
         original_index = {'versions': {}}
@@ -216,7 +208,7 @@ class TestBulkWriteMixinClosed(TestBulkWriteMixin):
         self.assertConnCalls()
         self.bulk._end_bulk_operation(self.course_key)
         self.assertConnCalls(
-            call.insert_structure(self.structure),
+            call.insert_structures([self.structure]),
             call.update_course_index(
                 {'versions': {self.course_key.branch: self.structure['_id']}},
                 from_index=original_index
@@ -233,16 +225,11 @@ class TestBulkWriteMixinClosed(TestBulkWriteMixin):
         self.bulk.update_structure(self.course_key.replace(branch='b'), other_structure)
         self.bulk.insert_course_index(self.course_key, {'versions': {'a': self.structure['_id'], 'b': other_structure['_id']}})
         self.bulk._end_bulk_operation(self.course_key)
-        self.assertItemsEqual(
-            [
-                call.insert_structure(self.structure),
-                call.insert_structure(other_structure),
-                call.update_course_index(
-                    {'versions': {'a': self.structure['_id'], 'b': other_structure['_id']}},
-                    from_index=original_index
-                )
-            ],
-            self.conn.mock_calls
+        self.assertEqual(len(self.conn.mock_calls), 2)
+        self.assertItemsEqual(self.conn.insert_structures.call_args[0][0], [self.structure, other_structure])
+        self.conn.update_course_index.assert_called_once_with(
+            {'versions': {'a': self.structure['_id'], 'b': other_structure['_id']}},
+            from_index=original_index
         )
 
     def test_version_structure_creates_new_version(self):
@@ -671,7 +658,7 @@ class TestBulkWriteMixinOpen(TestBulkWriteMixin):
         index_copy['versions']['draft'] = index['versions']['published']
         self.bulk.update_course_index(self.course_key, index_copy)
         self.bulk._end_bulk_operation(self.course_key)
-        self.conn.insert_structure.assert_called_once_with(published_structure)
+        self.conn.insert_structures.assert_called_once_with([published_structure])
         self.conn.update_course_index.assert_called_once_with(index_copy, from_index=self.conn.get_course_index.return_value)
         self.conn.get_course_index.assert_called_once_with(self.course_key)
 
@@ -681,3 +668,41 @@ class TestBulkWriteMixinOpenAfterPrevTransaction(TestBulkWriteMixinOpen, TestBul
     Test that operations on with an open transaction aren't affected by a previously executed transaction
     """
     pass
+
+
+class TestBulkInserts(unittest.TestCase):
+    """
+    Tests of MongoConnection's unordered bulk inserts.
+    """
+    def setUp(self):
+        super(TestBulkInserts, self).setUp()
+        # don't connect to a db: only the collection is used
+        self.conn = MongoConnection.__new__(MongoConnection)
+        self.conn.BULK_INSERT_BATCH_SIZE = 2
+        self.collection = MagicMock(name='collection')
+        self.bulk_op = self.collection.initialize_unordered_bulk_op.return_value
+        self.documents = [{'_id': ObjectId()} for __ in range(3)]
+
+    def test_batches(self):
+        self.bulk_op.execute.side_effect = [{'nInserted': 2}, {'nInserted': 1}]
+        self.assertEqual(self.conn._insert_many(self.collection, self.documents), 3)
+        self.assertEqual(self.collection.initialize_unordered_bulk_op.call_count, 2)
+        self.assertEqual(self.bulk_op.insert.call_args_list, [call(document) for document in self.documents])
+
+    def test_duplicates_are_skipped(self):
+        self.bulk_op.execute.side_effect = [
+            BulkWriteError({'nInserted': 1, 'writeErrors': [{'code': 11000, 'index': 0}], 'writeConcernErrors': []}),
+            {'nInserted': 1},
+        ]
+        self.assertEqual(self.conn._insert_many(self.collection, self.documents), 2)
+
+    def test_other_errors_are_raised(self):
+        self.bulk_op.execute.side_effect = BulkWriteError(
+            {
+                'nInserted': 0,
+                'writeErrors': [{'code': 11000, 'index': 0}, {'code': 2, 'index': 1}],
+                'writeConcernErrors': [],
+            }
+        )
+        with self.assertRaises(BulkWriteError):
+            self.conn._insert_many(self.collection, self.documents)
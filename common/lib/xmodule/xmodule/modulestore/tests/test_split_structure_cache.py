@@ -0,0 +1,113 @@
+"""
+Tests of the cache of split modulestore structures.
+"""
+import unittest
+import uuid
+
+from bson.objectid import ObjectId
+from nose.plugins.attrib import attr
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.inheritance import InheritanceMixin
+from xmodule.modulestore.split_mongo import BlockKey, BlockData
+from xmodule.modulestore.split_mongo.mongo_connection import StructureCache
+from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
+from xmodule.modulestore.tests.factories import check_mongo_calls
+from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
+from xmodule.modulestore.tests.test_cross_modulestore_import_export import MemoryCache
+
+
+def _structure():
+    """
+    Return a minimal structure in the form produced by `structure_from_mongo`.
+    """
+    root = BlockKey('course', 'course')
+    return {
+        '_id': ObjectId(),
+        'root': root,
+        'blocks': {
+            root: BlockData({'block_type': 'course', 'fields': {'children': []}, 'edit_info': {}}),
+        },
+    }
+
+
+class TestStructureCache(unittest.TestCase):
+    """
+    Tests of the in-process LRU cache and its optional backing cache.
+    """
+    def test_miss_then_hit(self):
+        cache = StructureCache()
+        structure = _structure()
+        self.assertIsNone(cache.get('key'))
+        cache.set('key', structure)
+        cached = cache.get('key')
+        self.assertEqual(cached['_id'], structure['_id'])
+        self.assertEqual(cached['blocks'].keys(), structure['blocks'].keys())
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_hits_are_copies(self):
+        cache = StructureCache()
+        structure = _structure()
+        cache.set('key', structure)
+        cache.get('key')['blocks'][structure['root']]['fields']['display_name'] = 'changed'
+        self.assertNotIn('display_name', cache.get('key')['blocks'][structure['root']]['fields'])
+
+    def test_least_recently_used_are_evicted(self):
+        cache = StructureCache(max_size=2)
+        for key in ('a', 'b'):
+            cache.set(key, _structure())
+        # reading 'a' makes 'b' the least recently used entry
+        cache.get('a')
+        cache.set('c', _structure())
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_backing_cache(self):
+        backing_cache = MemoryCache()
+        structure = _structure()
+        StructureCache(backing_cache=backing_cache).set('key', structure)
+
+        # another process (with an empty local cache) finds the structure in the backing cache
+        cache = StructureCache(backing_cache=backing_cache)
+        self.assertEqual(cache.get('key')['_id'], structure['_id'])
+        self.assertEqual(len(cache), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+
+@attr('mongo')
+class TestSplitStructureCache(unittest.TestCase):
+    """
+    Tests that a split modulestore reads structures through its structure cache.
+    """
+    def setUp(self):
+        super(TestSplitStructureCache, self).setUp()
+        self.cache = StructureCache()
+        self.store = SplitMongoModuleStore(
+            None,
+            {
+                'host': MONGO_HOST,
+                'port': MONGO_PORT_NUM,
+                'db': 'test_xmodule',
+                'collection': 'modulestore{0}'.format(uuid.uuid4().hex[:5]),
+            },
+            default_class='xmodule.raw_module.RawDescriptor',
+            fs_root='',
+            xblock_mixins=(InheritanceMixin,),
+            structure_cache=self.cache,
+        )
+        self.addCleanup(self.store._drop_database)  # pylint: disable=protected-access
+        self.course = self.store.create_course('org', 'course', 'run', ModuleStoreEnum.UserID.test)
+
+    def test_get_course(self):
+        # the structure was cached when it was written
+        self.cache.hits = self.cache.misses = 0
+        self.store.get_course(self.course.id)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 0))
+
+    def test_find_structures_by_id(self):
+        version_guid = self.course.id.version_guid
+        with check_mongo_calls(0):
+            structures = self.store.find_structures_by_id([version_guid])
+        self.assertEqual([structure['_id'] for structure in structures], [version_guid])
@@ -31,8 +31,8 @@ from django.core.management import call_command
 from bulk_email.models import CourseEmail, Optout, SEND_TO_ALL
 
 from instructor_task.tasks import send_bulk_course_email
-from instructor_task.subtasks import update_subtask_status, SubtaskStatus
-from instructor_task.models import InstructorTask
+from instructor_task.subtasks import update_subtask_status, get_subtask_status
+from instructor_task.models import InstructorTask, InstructorSubtask
 from instructor_task.tests.test_base import InstructorTaskCourseTestCase
 from instructor_task.tests.factories import InstructorTaskFactory
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
@@ -61,10 +61,7 @@ def my_update_subtask_status(entry_id, current_task_id, new_subtask_status):
     This should not be an issue in production, where status is updated before
     a task is retried, and is then updated afterwards if the retry fails.
     """
-    entry = InstructorTask.objects.get(pk=entry_id)
-    subtask_dict = json.loads(entry.subtasks)
-    subtask_status_info = subtask_dict['status']
-    current_subtask_status = SubtaskStatus.from_dict(subtask_status_info[current_task_id])
+    current_subtask_status = get_subtask_status(entry_id, current_task_id)
     current_retry_count = current_subtask_status.get_retry_count()
     new_retry_count = new_subtask_status.get_retry_count()
     if current_retry_count <= new_retry_count:
@@ -149,11 +146,10 @@ class TestBulkEmailInstructorTask(InstructorTaskCourseTestCase):
         self.assertEquals(subtask_info.get('succeeded'), 1 if succeeded > 0 else 0)
         self.assertEquals(subtask_info.get('failed'), 0 if succeeded > 0 else 1)
         # verify individual subtask status:
-        subtask_status_info = subtask_info.get('status')
-        task_id_list = subtask_status_info.keys()
+        task_id_list = InstructorSubtask.objects.filter(instructor_task=entry).values_list('task_id', flat=True)
         self.assertEquals(len(task_id_list), 1)
         task_id = task_id_list[0]
-        subtask_status = subtask_status_info.get(task_id)
+        subtask_status = get_subtask_status(entry.id, task_id).to_dict()
         print("Testing subtask status: {}".format(subtask_status))
         self.assertEquals(subtask_status.get('task_id'), task_id)
         self.assertEquals(subtask_status.get('attempted'), succeeded + failed)
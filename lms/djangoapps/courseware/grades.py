@@ -1,19 +1,22 @@
 # Compute grades using real division, with no integer truncation
 from __future__ import division
 from collections import defaultdict
+import hashlib
 import json
 import random
 import logging
 
 from contextlib import contextmanager
 from django.conf import settings
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.test.client import RequestFactory
 
 import dogstats_wrapper as dog_stats_api
 
 from courseware import courses
 from courseware.model_data import FieldDataCache
+from openedx.core.djangoapps.course_groups.models import CourseUserGroup, CourseUserGroupPartitionGroup
+from openedx.core.djangoapps.user_api.models import UserCourseTag
 from student.models import anonymous_id_for_user
 from util.module_utils import yield_dynamic_descriptor_descendents
 from xmodule import graders
@@ -21,7 +24,7 @@ from xmodule.graders import Score
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.util.duedate import get_extended_due_date
-from .models import StudentModule
+from .models import PersistentSubsectionGrade, StudentModule
 from .module_render import get_module_for_descriptor
 from submissions import api as sub_api  # installed from the edx-submissions repository
 from opaque_keys import InvalidKeyError
@@ -29,6 +32,115 @@ from opaque_keys import InvalidKeyError
 
 log = logging.getLogger("edx.courseware")
 
+# Number of students whose StudentModule score rows are loaded with a single
+# query when grading a whole course through iterate_grades_for.
+GRADING_BATCH_SIZE = 200
+
+
+class StudentModuleScores(object):
+    """
+    In-memory view of the StudentModule score rows of one student in one
+    course, so that grading can check for existing state and look up raw
+    scores without querying StudentModule once per section and problem.
+    """
+    def __init__(self, student_modules=(), subsection_grades=None, partition_state=None):
+        # dict: { usage_key : (grade, max_grade) }
+        self._scores = {}
+        # dict: { subsection usage_key : PersistentSubsectionGrade }
+        self.subsection_grades = subsection_grades or {}
+        # sorted list of the course tags and cohorts that decide the student's
+        # user partition groups, and so which blocks they see
+        self.partition_state = partition_state or []
+        for student_module in student_modules:
+            self.add(student_module)
+
+    def add(self, student_module):
+        """Record the score columns of `student_module`."""
+        self._scores[student_module.module_state_key.map_into_course(student_module.course_id)] = (
+            student_module.grade, student_module.max_grade
+        )
+
+    def has_state_for_any(self, locations):
+        """Return True if there is a StudentModule row for any of `locations`."""
+        return any(location in self._scores for location in locations)
+
+    def get(self, location):
+        """
+        Return the (grade, max_grade) tuple stored for `location`, or None if
+        the student has no StudentModule row for it.
+        """
+        return self._scores.get(location)
+
+    @classmethod
+    def bulk_load(cls, course_id, student_ids):
+        """
+        Return a dict of student id -> StudentModuleScores for every id in
+        `student_ids`.
+
+        All rows are fetched with one query for the whole batch of students;
+        callers are expected to bound the size of `student_ids`. Only the
+        score columns are loaded, not the (potentially large) module state.
+        The students' persisted subsection grades, and the partition state
+        they depend on, are loaded as well when ENABLE_PERSISTENT_GRADES is on.
+        """
+        scores_by_student = {student_id: cls() for student_id in student_ids}
+        student_modules = StudentModule.objects.filter(
+            course_id=course_id,
+            student__in=student_ids,
+        ).only('student', 'course_id', 'module_state_key', 'grade', 'max_grade')
+        for student_module in student_modules:
+            scores_by_student[student_module.student_id].add(student_module)
+
+        if settings.FEATURES.get('ENABLE_PERSISTENT_GRADES'):
+            persisted_grades = PersistentSubsectionGrade.objects.filter(
+                course_id=course_id,
+                user__in=student_ids,
+            )
+            for persisted in persisted_grades:
+                scores_by_student[persisted.user_id].subsection_grades[
+                    persisted.usage_key.map_into_course(course_id)
+                ] = persisted
+
+            for student_id, partition_state in _bulk_load_partition_state(course_id, student_ids).iteritems():
+                scores_by_student[student_id].partition_state = partition_state
+        return scores_by_student
+
+
+def _bulk_load_partition_state(course_id, student_ids):
+    """
+    Return a dict of student id -> sorted list of what decides the student's
+    groups in the course's user partitions: their course tags, where random
+    assignments are stored, and their cohorts with the partition group each
+    cohort is linked to.
+
+    This is read as stored; nobody is assigned to a group or a cohort here.
+    """
+    partition_state = defaultdict(list)
+    course_tags = UserCourseTag.objects.filter(
+        course_id=course_id,
+        user__in=student_ids,
+    ).values_list('user', 'key', 'value')
+    for student_id, key, value in course_tags:
+        partition_state[student_id].append(['tag', key, value])
+
+    cohort_groups = dict(
+        (cohort_id, [partition_id, group_id])
+        for cohort_id, partition_id, group_id in CourseUserGroupPartitionGroup.objects.filter(
+            course_user_group__course_id=course_id,
+        ).values_list('course_user_group', 'partition_id', 'group_id')
+    )
+    memberships = CourseUserGroup.users.through.objects.filter(
+        courseusergroup__course_id=course_id,
+        courseusergroup__group_type=CourseUserGroup.COHORT,
+        user__in=student_ids,
+    ).values_list('user', 'courseusergroup')
+    for student_id, cohort_id in memberships:
+        partition_state[student_id].append(['cohort', cohort_id] + cohort_groups.get(cohort_id, [None, None]))
+
+    for state in partition_state.itervalues():
+        state.sort()
+    return partition_state
+
 
 def answer_distributions(course_key):
     """
@@ -122,16 +234,16 @@ def answer_distributions(course_key):
 
 
 @transaction.commit_manually
-def grade(student, request, course, keep_raw_scores=False):
+def grade(student, request, course, keep_raw_scores=False, student_module_scores=None):
     """
     Wraps "_grade" with the manual_transaction context manager just in case
     there are unanticipated errors.
     """
     with manual_transaction():
-        return _grade(student, request, course, keep_raw_scores)
+        return _grade(student, request, course, keep_raw_scores, student_module_scores)
 
 
-def _grade(student, request, course, keep_raw_scores):
+def _grade(student, request, course, keep_raw_scores, student_module_scores=None):
     """
     Unwrapped version of "grade"
 
@@ -149,6 +261,9 @@ def _grade(student, request, course, keep_raw_scores):
       make up the final grade. (For display)
     - keep_raw_scores : if True, then value for key 'raw_scores' contains scores
       for every graded module
+    - student_module_scores : an optional StudentModuleScores preloaded for
+      this student; it's loaded here if not given. Either way StudentModule
+      isn't queried for each section and problem
 
     More information on the format is in the docstring for CourseGrader.
     """
@@ -162,6 +277,20 @@ def _grade(student, request, course, keep_raw_scores):
         course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id)
     )
 
+    if student_module_scores is None:
+        # one query for all of the student's scores, rather than one per section and problem
+        with manual_transaction():
+            student_module_scores = StudentModuleScores.bulk_load(course.id, [student.id])[student.id]
+
+    persist_grades = settings.FEATURES.get('ENABLE_PERSISTENT_GRADES') and not settings.GENERATE_PROFILE_SCORES
+    if persist_grades:
+        course_version = _course_content_version(course, student_module_scores.partition_state)
+        persisted_grades = student_module_scores.subsection_grades
+
+    # All modules are created with one FieldDataCache, which loads all of the
+    # student's data in the course, if any module needs creating at all
+    get_field_data_cache = _lazy_course_field_data_cache(student, course)
+
     totaled_scores = {}
     # This next complicated loop is just to collect the totaled_scores, which is
     # passed to the grader
@@ -171,65 +300,30 @@ def _grade(student, request, course, keep_raw_scores):
             section_descriptor = section['section_descriptor']
             section_name = section_descriptor.display_name_with_default
 
-            # some problems have state that is updated independently of interaction
-            # with the LMS, so they need to always be scored. (E.g. foldit.,
-            # combinedopenended)
-            should_grade_section = any(
-                descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']
-            )
-
-            # If there are no problems that always have to be regraded, check to
-            # see if any of our locations are in the scores from the submissions
-            # API. If scores exist, we have to calculate grades for this section.
-            if not should_grade_section:
-                should_grade_section = any(
-                    descriptor.location.to_deprecated_string() in submissions_scores
-                    for descriptor in section['xmoduledescriptors']
+            should_grade_section = _must_grade_section(section, submissions_scores)
+
+            # Sections whose scores come from outside of StudentModule can't be
+            # invalidated reliably, so they're never persisted.
+            if persist_grades and not should_grade_section:
+                content_version = _subsection_content_version(course_version, section)
+                persisted = persisted_grades.get(section_descriptor.location)
+                if persisted is not None and persisted.content_version == content_version:
+                    scores = persisted.get_scores()
+                else:
+                    scores = _section_scores(
+                        student, request, course, section, submissions_scores, student_module_scores,
+                        get_field_data_cache
+                    )
+                    _persist_section_scores(student, course, section, content_version, scores, persisted)
+            else:
+                scores = _section_scores(
+                    student, request, course, section, submissions_scores, student_module_scores,
+                    get_field_data_cache, should_grade_section=should_grade_section
                 )
 
-            if not should_grade_section:
-                with manual_transaction():
-                    should_grade_section = StudentModule.objects.filter(
-                        student=student,
-                        module_state_key__in=[
-                            descriptor.location for descriptor in section['xmoduledescriptors']
-                        ]
-                    ).exists()
-
             # If we haven't seen a single problem in the section, we don't have
             # to grade it at all! We can assume 0%
-            if should_grade_section:
-                scores = []
-
-                def create_module(descriptor):
-                    '''creates an XModule instance given a descriptor'''
-                    # TODO: We need the request to pass into here. If we could forego that, our arguments
-                    # would be simpler
-                    with manual_transaction():
-                        field_data_cache = FieldDataCache([descriptor], course.id, student)
-                    return get_module_for_descriptor(student, request, descriptor, field_data_cache, course.id)
-
-                for module_descriptor in yield_dynamic_descriptor_descendents(section_descriptor, create_module):
-
-                    (correct, total) = get_score(
-                        course.id, student, module_descriptor, create_module, scores_cache=submissions_scores
-                    )
-                    if correct is None and total is None:
-                        continue
-
-                    if settings.GENERATE_PROFILE_SCORES:  	# for debugging!
-                        if total > 1:
-                            correct = random.randrange(max(total - 2, 1), total + 1)
-                        else:
-                            correct = total
-
-                    graded = module_descriptor.graded
-                    if not total > 0:
-                        #We simply cannot grade a problem that is 12/0, because we might need it as a percentage
-                        graded = False
-
-                    scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
-
+            if scores is not None:
                 _, graded_total = graders.aggregate_scores(scores, section_name)
                 if keep_raw_scores:
                     raw_scores += scores
@@ -263,6 +357,158 @@ def _grade(student, request, course, keep_raw_scores):
     return grade_summary
 
 
+def _lazy_course_field_data_cache(student, course):
+    """
+    Return a function which returns a course scoped FieldDataCache for
+    `student`, which it creates the first time it's called. It starts out
+    with the graded descriptors of the course, which the course has already
+    collected, rather than walking the whole course for them; others are
+    added as they're needed.
+    """
+    field_data_caches = []
+
+    def get_field_data_cache():
+        """
+        Return the FieldDataCache, creating it if need be
+        """
+        if not field_data_caches:
+            with manual_transaction():
+                field_data_cache = FieldDataCache([], course.id, student, course_scoped=True)
+                field_data_cache.add_descriptors(course.grading_context['all_descriptors'])
+                field_data_caches.append(field_data_cache)
+        return field_data_caches[0]
+
+    return get_field_data_cache
+
+
+def _must_grade_section(section, submissions_scores):
+    """
+    Return True if `section` (an entry of the course's grading context) has
+    to be graded regardless of the student's StudentModule state.
+    """
+    # some problems have state that is updated independently of interaction
+    # with the LMS, so they need to always be scored. (E.g. foldit.,
+    # combinedopenended)
+    if any(descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']):
+        return True
+
+    # If there are no problems that always have to be regraded, check to
+    # see if any of our locations are in the scores from the submissions
+    # API. If scores exist, we have to calculate grades for this section.
+    return any(
+        descriptor.location.to_deprecated_string() in submissions_scores
+        for descriptor in section['xmoduledescriptors']
+    )
+
+
+def _section_scores(student, request, course, section, submissions_scores, student_module_scores,
+                    get_field_data_cache, should_grade_section=False):
+    """
+    Return the list of Scores of the blocks in `section` (an entry of the
+    course's grading context) for `student`, or None if the student has no
+    state for any of them and the section doesn't have to be graded anyway.
+    `get_field_data_cache` returns the FieldDataCache to create modules with.
+    """
+    section_descriptor = section['section_descriptor']
+
+    if not should_grade_section:
+        should_grade_section = student_module_scores.has_state_for_any(
+            descriptor.location for descriptor in section['xmoduledescriptors']
+        )
+
+    if not should_grade_section:
+        return None
+
+    scores = []
+
+    def create_module(descriptor):
+        '''creates an XModule instance given a descriptor'''
+        # TODO: We need the request to pass into here. If we could forego that, our arguments
+        # would be simpler
+        with manual_transaction():
+            field_data_cache = get_field_data_cache()
+            # dynamic descendants may not have been anticipated by the cache
+            field_data_cache.add_descriptors([descriptor])
+        return get_module_for_descriptor(student, request, descriptor, field_data_cache, course.id)
+
+    for module_descriptor in yield_dynamic_descriptor_descendents(section_descriptor, create_module):
+
+        (correct, total) = get_score(
+            course.id, student, module_descriptor, create_module, scores_cache=submissions_scores,
+            student_module_scores=student_module_scores
+        )
+        if correct is None and total is None:
+            continue
+
+        if settings.GENERATE_PROFILE_SCORES:  	# for debugging!
+            if total > 1:
+                correct = random.randrange(max(total - 2, 1), total + 1)
+            else:
+                correct = total
+
+        graded = module_descriptor.graded
+        if not total > 0:
+            #We simply cannot grade a problem that is 12/0, because we might need it as a percentage
+            graded = False
+
+        scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+
+    return scores
+
+
+def _course_content_version(course, partition_state=()):
+    """
+    Return a stamp of the course content as last published and of the
+    student's `partition_state` (see StudentModuleScores), used to detect
+    persisted subsection grades that were computed against older content or
+    while the student was in other cohorts or groups, seeing other blocks.
+    """
+    try:
+        edited_on = course.subtree_edited_on
+    except (AttributeError, NotImplementedError):
+        # Not every runtime tracks edit info (e.g. XML courses, which only
+        # change when they're reloaded)
+        edited_on = None
+    return json.dumps([unicode(edited_on), list(partition_state)])
+
+
+def _subsection_content_version(course_version, section):
+    """
+    Return the content stamp of `section` (an entry of the course's grading
+    context), combining the course stamp with the section's scored blocks.
+    """
+    stamp = json.dumps([
+        course_version,
+        unicode(section['section_descriptor'].location),
+        [unicode(descriptor.location) for descriptor in section['xmoduledescriptors']],
+    ])
+    return hashlib.sha1(stamp).hexdigest()
+
+
+def _persist_section_scores(student, course, section, content_version, scores, persisted=None):
+    """
+    Store `scores` as the PersistentSubsectionGrade of `student` for `section`,
+    updating the stale row `persisted` if there is one.
+    """
+    if persisted is None:
+        persisted = PersistentSubsectionGrade(
+            user=student,
+            course_id=course.id,
+            usage_key=section['section_descriptor'].location,
+        )
+    persisted.content_version = content_version
+    persisted.set_scores(scores)
+    try:
+        persisted.save()
+        persisted.set_block_keys([descriptor.location for descriptor in section['xmoduledescriptors']])
+    except IntegrityError:
+        # Another process persisted this subsection at the same time; its row
+        # is as good as ours.
+        transaction.rollback()
+    else:
+        transaction.commit()
+
+
 def grade_for_percentage(grade_cutoffs, percentage):
     """
     Returns a letter grade as defined in grading_policy (e.g. 'A' 'B' 'C' for 6.002x) or None.
@@ -321,7 +567,7 @@ def _progress_summary(student, request, course):
     """
     with manual_transaction():
         field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
-            course.id, student, course, depth=None
+            course.id, student, course, depth=None, course_scoped=True
         )
         # TODO: We need the request to pass into here. If we could
         # forego that, our arguments would be simpler
@@ -331,6 +577,18 @@ def _progress_summary(student, request, course):
             return None
 
     submissions_scores = sub_api.get_scores(course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id))
+    with manual_transaction():
+        student_module_scores = StudentModuleScores.bulk_load(course.id, [student.id])[student.id]
+
+    persist_grades = settings.FEATURES.get('ENABLE_PERSISTENT_GRADES')
+    if persist_grades:
+        course_version = _course_content_version(course, student_module_scores.partition_state)
+        grading_sections = {
+            section['section_descriptor'].location: section
+            for sections in course.grading_context['graded_sections'].itervalues()
+            for section in sections
+        }
+        persisted_grades = student_module_scores.subsection_grades
 
     chapters = []
     # Don't include chapters that aren't displayable (e.g. due to error)
@@ -348,19 +606,38 @@ def _progress_summary(student, request, course):
                     continue
 
                 graded = section_module.graded
-                scores = []
-
-                module_creator = section_module.xmodule_runtime.get_module
-
-                for module_descriptor in yield_dynamic_descriptor_descendents(section_module, module_creator):
-                    course_id = course.id
-                    (correct, total) = get_score(
-                        course_id, student, module_descriptor, module_creator, scores_cache=submissions_scores
-                    )
-                    if correct is None and total is None:
-                        continue
-
-                    scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+                scores = None
+
+                # Reuse the scores persisted by grade() for this section, if
+                # there are any and they're still current
+                grading_section = grading_sections.get(section_module.location) if persist_grades else None
+                if grading_section is not None and not _must_grade_section(grading_section, submissions_scores):
+                    persisted = persisted_grades.get(section_module.location)
+                    if persisted is not None and persisted.content_version == _subsection_content_version(
+                            course_version, grading_section
+                    ):
+                        persisted_scores = persisted.get_scores()
+                        if persisted_scores is not None:
+                            scores = [
+                                Score(score.earned, score.possible, graded, score.section)
+                                for score in persisted_scores
+                            ]
+
+                if scores is None:
+                    scores = []
+
+                    module_creator = section_module.xmodule_runtime.get_module
+
+                    for module_descriptor in yield_dynamic_descriptor_descendents(section_module, module_creator):
+                        course_id = course.id
+                        (correct, total) = get_score(
+                            course_id, student, module_descriptor, module_creator, scores_cache=submissions_scores,
+                            student_module_scores=student_module_scores
+                        )
+                        if correct is None and total is None:
+                            continue
+
+                        scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
 
                 scores.reverse()
                 section_total, _ = graders.aggregate_scores(
@@ -387,7 +664,7 @@ def _progress_summary(student, request, course):
     return chapters
 
 
-def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=None):
+def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=None, student_module_scores=None):
     """
     Return the score for a user on a problem, as a tuple (correct, total).
     e.g. (5,7) if you got 5 out of 7 points.
@@ -401,6 +678,8 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
            Can return None if user doesn't have access, or if something else went wrong.
     scores_cache: A dict of location names to (earned, possible) point tuples.
            If an entry is found in this cache, it takes precedence.
+    student_module_scores: An optional StudentModuleScores for this user. If
+           given, it is used instead of querying the StudentModule table.
     """
     scores_cache = scores_cache or {}
 
@@ -427,18 +706,23 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
         # These are not problems, and do not have a score
         return (None, None)
 
-    try:
-        student_module = StudentModule.objects.get(
-            student=user,
-            course_id=course_id,
-            module_state_key=problem_descriptor.location
-        )
-    except StudentModule.DoesNotExist:
+    if student_module_scores is not None:
         student_module = None
+        stored_score = student_module_scores.get(problem_descriptor.location)
+    else:
+        try:
+            student_module = StudentModule.objects.get(
+                student=user,
+                course_id=course_id,
+                module_state_key=problem_descriptor.location
+            )
+        except StudentModule.DoesNotExist:
+            student_module = None
+        stored_score = (student_module.grade, student_module.max_grade) if student_module is not None else None
 
-    if student_module is not None and student_module.max_grade is not None:
-        correct = student_module.grade if student_module.grade is not None else 0
-        total = student_module.max_grade
+    if stored_score is not None and stored_score[1] is not None:
+        correct = stored_score[0] if stored_score[0] is not None else 0
+        total = stored_score[1]
     else:
         # If the problem was not in the cache, or hasn't been graded yet,
         # we need to instantiate the problem.
@@ -459,7 +743,10 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
     weight = problem_descriptor.weight
     if weight is not None:
         if total == 0:
-            log.exception("Cannot reweight a problem with zero total points. Problem: " + str(student_module))
+            log.exception(
+                "Cannot reweight a problem with zero total points. Problem: " +
+                str(student_module or problem_descriptor.location)
+            )
             return (correct, total)
         correct = correct * weight / total
         total = weight
@@ -480,7 +767,7 @@ def manual_transaction():
         transaction.commit()
 
 
-def iterate_grades_for(course_id, students):
+def iterate_grades_for(course_id, students, batch_size=GRADING_BATCH_SIZE):
     """Given a course_id and an iterable of students (User), yield a tuple of:
 
     (student, gradeset, err_msg) for every student enrolled in the course.
@@ -497,6 +784,13 @@ def iterate_grades_for(course_id, students):
     - grade_breakdown : A breakdown of the major components that
         make up the final grade. (For display)
     - raw_scores: contains scores for every graded module
+
+    Students are graded in batches of `batch_size`: the course's grading
+    context is computed once, and the StudentModule score rows of each batch
+    are loaded with a single query and joined against the graded descriptors
+    in memory by grade(). The resulting gradesets are the same as calling grade() for
+    each student. If a batch's query fails, its students' scores are loaded one
+    by one instead.
     """
     course = courses.get_course_by_id(course_id)
 
@@ -505,25 +799,55 @@ def iterate_grades_for(course_id, students):
     # grading that student.
     request = RequestFactory().get('/')
 
-    for student in students:
-        with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course_id)]):
-            try:
-                request.user = student
-                # Grading calls problem rendering, which calls masquerading,
-                # which checks session vars -- thus the empty session dict below.
-                # It's not pretty, but untangling that is currently beyond the
-                # scope of this feature.
-                request.session = {}
-                gradeset = grade(student, request, course)
-                yield student, gradeset, ""
-            except Exception as exc:  # pylint: disable=broad-except
-                # Keep marching on even if this student couldn't be graded for
-                # some reason, but log it for future reference.
-                log.exception(
-                    'Cannot grade student %s (%s) in course %s because of exception: %s',
-                    student.username,
-                    student.id,
-                    course_id,
-                    exc.message
+    for batch in _batches(students, batch_size):
+        try:
+            with manual_transaction():
+                scores_by_student = StudentModuleScores.bulk_load(
+                    course_id, [student.id for student in batch]
                 )
-                yield student, {}, exc.message
+        except Exception:  # pylint: disable=broad-except
+            # Don't give up on the whole batch: grade() loads the scores of
+            # each student on its own when it isn't handed them.
+            log.exception(
+                'Cannot load the scores of %d students in course %s, loading them one by one',
+                len(batch),
+                course_id
+            )
+            scores_by_student = {}
+
+        for student in batch:
+            with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course_id)]):
+                try:
+                    request.user = student
+                    # Grading calls problem rendering, which calls masquerading,
+                    # which checks session vars -- thus the empty session dict below.
+                    # It's not pretty, but untangling that is currently beyond the
+                    # scope of this feature.
+                    request.session = {}
+                    gradeset = grade(
+                        student, request, course, student_module_scores=scores_by_student.get(student.id)
+                    )
+                    yield student, gradeset, ""
+                except Exception as exc:  # pylint: disable=broad-except
+                    # Keep marching on even if this student couldn't be graded for
+                    # some reason, but log it for future reference.
+                    log.exception(
+                        'Cannot grade student %s (%s) in course %s because of exception: %s',
+                        student.username,
+                        student.id,
+                        course_id,
+                        exc.message
+                    )
+                    yield student, {}, exc.message
+
+
+def _batches(iterable, batch_size):
+    """Yield successive lists of at most `batch_size` items from `iterable`."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
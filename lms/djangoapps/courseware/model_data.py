@@ -47,7 +47,7 @@ class FieldDataCache(object):
     A cache of django model objects needed to supply the data
     for a module and its decendants
     """
-    def __init__(self, descriptors, course_id, user, select_for_update=False, asides=None):
+    def __init__(self, descriptors, course_id, user, select_for_update=False, asides=None, course_scoped=False):
         '''
         Find any courseware.models objects that are needed by any descriptor
         in descriptors. Attempts to minimize the number of queries to the database.
@@ -60,29 +60,33 @@ class FieldDataCache(object):
         user: The user for which to cache data
         select_for_update: True if rows should be locked until end of transaction
         asides: The list of aside types to load, or None to prefetch no asides.
+        course_scoped: True to load all of the user's state in the course, and all of their
+            preferences and info, rather than only those needed by descriptors. Blocks added
+            later then need no further queries for those scopes.
         '''
         self.cache = {}
-        self.descriptors = descriptors
+        self.descriptors = []
         self.select_for_update = select_for_update
-
-        if asides is None:
-            self.asides = []
-        else:
-            self.asides = asides
+        self.asides = []
 
         assert isinstance(course_id, CourseKey)
         self.course_id = course_id
         self.user = user
 
-        if user.is_authenticated():
-            for scope, fields in self._fields_to_cache().items():
-                for field_object in self._retrieve_fields(scope, fields):
-                    self.cache[self._cache_key_from_field_object(scope, field_object)] = field_object
+        # scopes for which everything this cache could need has been loaded
+        self._complete_scopes = set()
+        # the usage ids, block types or field names already queried for, by scope
+        self._queried = defaultdict(set)
+
+        if course_scoped and user.is_authenticated():
+            self._retrieve_all_user_fields()
+
+        self.add_descriptors(descriptors, asides)
 
     @classmethod
     def cache_for_descriptor_descendents(cls, course_id, user, descriptor, depth=None,
                                          descriptor_filter=lambda descriptor: True,
-                                         select_for_update=False, asides=None):
+                                         select_for_update=False, asides=None, course_scoped=False):
         """
         course_id: the course in the context of which we want StudentModules.
         user: the django user for whom to load modules.
@@ -92,35 +96,155 @@ class FieldDataCache(object):
         descriptor_filter is a function that accepts a descriptor and return wether the StudentModule
             should be cached
         select_for_update: Flag indicating whether the rows should be locked until end of transaction
+        course_scoped: Flag indicating whether to load all of the user's data in the course up front
+            (see __init__)
+        """
+        with modulestore().bulk_operations(descriptor.location.course_key):
+            descriptors = cls._get_child_descriptors(descriptor, depth, descriptor_filter)
+
+        return FieldDataCache(
+            descriptors, course_id, user, select_for_update, asides=asides, course_scoped=course_scoped
+        )
+
+    @classmethod
+    def cache_for_users(cls, course_id, users, descriptor, depth=None, select_for_update=False, asides=None,
+                        load_user_state=True):
         """
+        Return a dict mapping the id of each of users to a FieldDataCache for them for descriptor
+        and its descendents down to depth, loading the data of all users together in a few
+        (chunked) queries rather than a few queries per user.
+
+        If load_user_state is False, the users' StudentModules aren't loaded: call
+        `reload_user_state` on each cache just before using it, so that its state is current.
 
-        def get_child_descriptors(descriptor, depth, descriptor_filter):
-            """
-            Return a list of all child descriptors down to the specified depth
-            that match the descriptor filter. Includes `descriptor`
+        The other arguments are as for `cache_for_descriptor_descendents`.
+        """
+        with modulestore().bulk_operations(descriptor.location.course_key):
+            descriptors = cls._get_child_descriptors(descriptor, depth, lambda descriptor: True)
 
-            descriptor: The parent to search inside
-            depth: The number of levels to descend, or None for infinite depth
-            descriptor_filter(descriptor): A function that returns True
-                if descriptor should be included in the results
-            """
-            if descriptor_filter(descriptor):
-                descriptors = [descriptor]
+        caches = dict(
+            (user.id, FieldDataCache([], course_id, user, select_for_update, asides=asides))
+            for user in users if user.is_authenticated()
+        )
+        if not caches:
+            return caches
+
+        # the cache used to make the queries; they don't depend on the user except for filtering
+        prototype = caches.itervalues().next()
+        user_ids = caches.keys()
+        usage_ids = prototype._all_usage_ids(descriptors)
+        block_types = prototype._all_block_types(descriptors)
+        for scope, fields in prototype._fields_to_cache(descriptors).items():
+            field_names = set(field.name for field in fields)
+            if scope == Scope.user_state and not load_user_state:
+                queried = usage_ids
+                field_objects = []
+            elif scope == Scope.user_state:
+                queried = usage_ids
+                field_objects = prototype._chunked_query(
+                    StudentModule, 'student__in', user_ids,
+                    course_id=course_id, module_state_key__in=usage_ids,
+                )
+            elif scope == Scope.user_state_summary:
+                queried = usage_ids
+                field_objects = prototype._chunked_query(
+                    XModuleUserStateSummaryField, 'usage_id__in', usage_ids, field_name__in=field_names,
+                )
+            elif scope == Scope.preferences:
+                queried = block_types
+                field_objects = prototype._chunked_query(
+                    XModuleStudentPrefsField, 'student__in', user_ids,
+                    module_type__in=block_types, field_name__in=field_names,
+                )
+            elif scope == Scope.user_info:
+                queried = field_names
+                field_objects = prototype._chunked_query(
+                    XModuleStudentInfoField, 'student__in', user_ids, field_name__in=field_names,
+                )
             else:
-                descriptors = []
+                continue
+
+            for field_object in field_objects:
+                if scope == Scope.user_state_summary:
+                    # shared by all users
+                    owners = caches.values()
+                else:
+                    owners = [caches[field_object.student_id]]
+                for cache in owners:
+                    cache.cache[cache._cache_key_from_field_object(scope, field_object)] = field_object
+            for cache in caches.itervalues():
+                cache._queried[scope].update(queried)
+
+        for cache in caches.itervalues():
+            # everything they need is loaded, so this doesn't query
+            cache.add_descriptors(descriptors)
+        return caches
 
-            if depth is None or depth > 0:
-                new_depth = depth - 1 if depth is not None else depth
+    @classmethod
+    def _get_child_descriptors(cls, descriptor, depth, descriptor_filter):
+        """
+        Return a list of all child descriptors down to the specified depth
+        that match the descriptor filter. Includes `descriptor`
 
-                for child in descriptor.get_children() + descriptor.get_required_module_descriptors():
-                    descriptors.extend(get_child_descriptors(child, new_depth, descriptor_filter))
+        descriptor: The parent to search inside
+        depth: The number of levels to descend, or None for infinite depth
+        descriptor_filter(descriptor): A function that returns True
+            if descriptor should be included in the results
+        """
+        if descriptor_filter(descriptor):
+            descriptors = [descriptor]
+        else:
+            descriptors = []
+
+        if depth is None or depth > 0:
+            new_depth = depth - 1 if depth is not None else depth
+
+            for child in descriptor.get_children() + descriptor.get_required_module_descriptors():
+                descriptors.extend(cls._get_child_descriptors(child, new_depth, descriptor_filter))
 
-            return descriptors
+        return descriptors
 
+    def add_descriptors(self, descriptors, asides=None):
+        """
+        Add descriptors (and asides, a list of aside types) to the set this cache supplies
+        data for, querying only for data that isn't already cached.
+        """
+        descriptors = list(descriptors)
+        self.descriptors.extend(descriptors)
+        if asides:
+            self.asides.extend(aside for aside in asides if aside not in self.asides)
+
+        if self.user.is_authenticated():
+            for scope, fields in self._fields_to_cache(descriptors).items():
+                for field_object in self._retrieve_fields(scope, fields, descriptors):
+                    self.cache[self._cache_key_from_field_object(scope, field_object)] = field_object
+
+    def reload_user_state(self):
+        """
+        Read the user's StudentModules for the descriptors this cache supplies data for again,
+        replacing those already cached.
+        """
+        if not self.user.is_authenticated():
+            return
+        usage_ids = self._all_usage_ids(self.descriptors)
+        for usage_id in usage_ids:
+            self.cache.pop((Scope.user_state, usage_id.map_into_course(self.course_id)), None)
+        self._queried[Scope.user_state].update(usage_ids)
+        for field_object in self._chunked_query(
+                StudentModule, 'module_state_key__in', usage_ids, course_id=self.course_id, student=self.user.pk,
+        ):
+            self.cache[self._cache_key_from_field_object(Scope.user_state, field_object)] = field_object
+
+    def add_descriptor_descendents(self, descriptor, depth=None, descriptor_filter=lambda descriptor: True,
+                                   asides=None):
+        """
+        Add descriptor and its descendents to the set this cache supplies data for.
+        The arguments are as for `cache_for_descriptor_descendents`.
+        """
         with modulestore().bulk_operations(descriptor.location.course_key):
-            descriptors = get_child_descriptors(descriptor, depth, descriptor_filter)
+            descriptors = self._get_child_descriptors(descriptor, depth, descriptor_filter)
 
-        return FieldDataCache(descriptors, course_id, user, select_for_update, asides=asides)
+        self.add_descriptors(descriptors, asides)
 
     def _query(self, model_class, **kwargs):
         """
@@ -147,14 +271,13 @@ class FieldDataCache(object):
         )
         return res
 
-    @property
-    def _all_usage_ids(self):
+    def _all_usage_ids(self, descriptors):
         """
-        Return a set of all usage_ids for the descriptors that this FieldDataCache is caching
-        against, and well as all asides for those descriptors.
+        Return a set of all usage_ids for descriptors, and well as all asides for those
+        descriptors.
         """
         usage_ids = set()
-        for descriptor in self.descriptors:
+        for descriptor in descriptors:
             usage_ids.add(descriptor.scope_ids.usage_id)
 
             for aside_type in self.asides:
@@ -162,13 +285,12 @@ class FieldDataCache(object):
 
         return usage_ids
 
-    @property
-    def _all_block_types(self):
+    def _all_block_types(self, descriptors):
         """
-        Return a set of all block_types that are cached by this FieldDataCache.
+        Return a set of all block_types of descriptors and the asides cached by this FieldDataCache.
         """
         block_types = set()
-        for descriptor in self.descriptors:
+        for descriptor in descriptors:
             block_types.add(BlockTypeKeyV1(descriptor.entry_point, descriptor.scope_ids.block_type))
 
         for aside_type in self.asides:
@@ -176,48 +298,85 @@ class FieldDataCache(object):
 
         return block_types
 
-    def _retrieve_fields(self, scope, fields):
+    def _not_yet_queried(self, scope, items):
+        """
+        Return which of items (usage ids, block types or field names) haven't been queried for
+        in scope, and record that they now have been.
+        """
+        if scope in self._complete_scopes:
+            return set()
+        items = set(items) - self._queried[scope]
+        self._queried[scope].update(items)
+        return items
+
+    def _retrieve_all_user_fields(self):
+        """
+        Load all of the user's state in the course, and all of their preferences and info
         """
-        Queries the database for all of the fields in the specified scope
+        for scope, field_objects in (
+                (Scope.user_state, self._query(StudentModule, course_id=self.course_id, student=self.user.pk)),
+                (Scope.preferences, self._query(XModuleStudentPrefsField, student=self.user.pk)),
+                (Scope.user_info, self._query(XModuleStudentInfoField, student=self.user.pk)),
+        ):
+            for field_object in field_objects:
+                self.cache[self._cache_key_from_field_object(scope, field_object)] = field_object
+            self._complete_scopes.add(scope)
+
+    def _retrieve_fields(self, scope, fields, descriptors):
+        """
+        Queries the database for the fields in the specified scope needed by descriptors,
+        which haven't already been queried for
         """
         if scope == Scope.user_state:
+            usage_ids = self._not_yet_queried(scope, self._all_usage_ids(descriptors))
+            if not usage_ids:
+                return []
             return self._chunked_query(
                 StudentModule,
                 'module_state_key__in',
-                self._all_usage_ids,
+                usage_ids,
                 course_id=self.course_id,
                 student=self.user.pk,
             )
         elif scope == Scope.user_state_summary:
+            usage_ids = self._not_yet_queried(scope, self._all_usage_ids(descriptors))
+            if not usage_ids:
+                return []
             return self._chunked_query(
                 XModuleUserStateSummaryField,
                 'usage_id__in',
-                self._all_usage_ids,
+                usage_ids,
                 field_name__in=set(field.name for field in fields),
             )
         elif scope == Scope.preferences:
+            block_types = self._not_yet_queried(scope, self._all_block_types(descriptors))
+            if not block_types:
+                return []
             return self._chunked_query(
                 XModuleStudentPrefsField,
                 'module_type__in',
-                self._all_block_types,
+                block_types,
                 student=self.user.pk,
                 field_name__in=set(field.name for field in fields),
             )
         elif scope == Scope.user_info:
+            field_names = self._not_yet_queried(scope, set(field.name for field in fields))
+            if not field_names:
+                return []
             return self._query(
                 XModuleStudentInfoField,
                 student=self.user.pk,
-                field_name__in=set(field.name for field in fields),
+                field_name__in=field_names,
             )
         else:
             return []
 
-    def _fields_to_cache(self):
+    def _fields_to_cache(self, descriptors):
         """
-        Returns a map of scopes to fields in that scope that should be cached
+        Returns a map of scopes to fields in that scope that should be cached for descriptors
         """
         scope_map = defaultdict(set)
-        for descriptor in self.descriptors:
+        for descriptor in descriptors:
             for field in descriptor.fields.values():
                 scope_map[field.scope].add(field)
         return scope_map
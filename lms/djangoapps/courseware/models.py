@@ -12,12 +12,15 @@ file and check it in at the same time as your model changes. To do that,
 ASSUMPTIONS: modules have unique IDs, even across different module_types
 
 """
+import json
+
 from django.contrib.auth.models import User
 from django.conf import settings
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
+from xmodule.graders import Score
 from xmodule_django.models import CourseKeyField, LocationKeyField, BlockTypeKeyField
 
 
@@ -131,6 +134,100 @@ class StudentModuleHistory(models.Model):
             history_entry.save()
 
 
+class PersistentSubsectionGrade(models.Model):
+    """
+    Scores of one student on the scored blocks of one graded subsection, as
+    computed by courseware.grades. Rows are reused by grade() and
+    progress_summary() instead of walking the subsection again, until a
+    StudentModule of one of the subsection's blocks changes (the row is
+    deleted), or the course content or the student's cohorts and partition
+    groups change (the stored `content_version` no longer matches).
+
+    StudentModule changes don't delete rows while ENABLE_PERSISTENT_GRADES is
+    off, so the table should be emptied before turning it back on.
+    """
+    class Meta:  # pylint: disable=missing-docstring
+        unique_together = (('user', 'course_id', 'usage_key'),)
+
+    user = models.ForeignKey(User, db_index=True)
+    course_id = CourseKeyField(max_length=255, db_index=True)
+
+    # The subsection this grade is for
+    usage_key = LocationKeyField(max_length=255)
+
+    # Stamp of the course content the grade was computed against
+    content_version = models.CharField(max_length=255)
+
+    # JSON list of [earned, possible, graded, display_name] for each scored block
+    scores = models.TextField(default='[]')
+
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    modified = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __unicode__(self):
+        return u'PersistentSubsectionGrade<%r>' % ({
+            'user': self.user_id,
+            'course_id': self.course_id,
+            'usage_key': self.usage_key,
+            'content_version': self.content_version,
+        },)
+
+    def get_scores(self):
+        """
+        Return the stored list of Scores, or None if the student had no state
+        in the subsection when it was graded.
+        """
+        scores = json.loads(self.scores)
+        if scores is None:
+            return None
+        return [Score(*score) for score in scores]
+
+    def set_scores(self, scores):
+        """
+        Store `scores`, a list of Scores, or None.
+        """
+        self.scores = json.dumps(scores)
+
+    def set_block_keys(self, block_keys):
+        """
+        Invalidate this (saved) row when the StudentModule of any of the usage
+        keys in `block_keys` changes, instead of those it was set to before.
+        """
+        self.blocks.all().delete()
+        PersistentSubsectionGradeBlock.objects.bulk_create([
+            PersistentSubsectionGradeBlock(grade=self, usage_key=block_key) for block_key in block_keys
+        ])
+
+    @receiver(post_save, sender=StudentModule)
+    @receiver(post_delete, sender=StudentModule)
+    def invalidate_for_student_module(sender, instance, **kwargs):  # pylint: disable=no-self-argument, unused-argument
+        """
+        Deletes the persisted grades of the subsections containing the block
+        of a StudentModule whose existence or score has changed.
+        """
+        if not settings.FEATURES.get('ENABLE_PERSISTENT_GRADES'):
+            return
+        if kwargs.get('signal') is post_save and not (
+                kwargs.get('created') or instance.grade is not None or instance.max_grade is not None
+        ):
+            return
+
+        PersistentSubsectionGrade.objects.filter(
+            user__id=instance.student_id,
+            course_id=instance.course_id,
+            blocks__usage_key=instance.module_state_key.map_into_course(instance.course_id),
+        ).delete()
+
+
+class PersistentSubsectionGradeBlock(models.Model):
+    """
+    A block whose StudentModule changes invalidate a PersistentSubsectionGrade,
+    so that the grades to invalidate can be found by an indexed query.
+    """
+    grade = models.ForeignKey(PersistentSubsectionGrade, related_name='blocks')
+    usage_key = LocationKeyField(max_length=255, db_index=True)
+
+
 class XBlockFieldBase(models.Model):
     """
     Base class for all XBlock field storage.
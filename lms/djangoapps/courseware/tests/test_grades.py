@@ -1,19 +1,27 @@
 """
 Test grade calculation.
 """
+import json
+
 from django.http import Http404
+from django.test.client import RequestFactory
 from django.test.utils import override_settings
 from mock import patch
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
-from courseware.grades import grade, iterate_grades_for
+from courseware.grades import grade, iterate_grades_for, StudentModuleScores
+from courseware.models import PersistentSubsectionGrade
+from courseware.tests.factories import StudentModuleFactory
+from openedx.core.djangoapps.course_groups.models import CourseUserGroupPartitionGroup
+from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory
+from openedx.core.djangoapps.user_api.api.course_tag import set_course_tag
 from xmodule.modulestore.tests.django_utils import TEST_DATA_MOCK_MODULESTORE
 from student.tests.factories import UserFactory
-from xmodule.modulestore.tests.factories import CourseFactory
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 
 
-def _grade_with_errors(student, request, course, keep_raw_scores=False):
+def _grade_with_errors(student, request, course, keep_raw_scores=False, student_module_scores=None):
     """This fake grade method will throw exceptions for student3 and
     student4, but allow any other students to go through normal grading.
 
@@ -24,7 +32,9 @@ def _grade_with_errors(student, request, course, keep_raw_scores=False):
     if student.username in ['student3', 'student4']:
         raise Exception("I don't like {}".format(student.username))
 
-    return grade(student, request, course, keep_raw_scores=keep_raw_scores)
+    return grade(
+        student, request, course, keep_raw_scores=keep_raw_scores, student_module_scores=student_module_scores
+    )
 
 
 class TestGradeIteration(ModuleStoreTestCase):
@@ -106,8 +116,54 @@ class TestGradeIteration(ModuleStoreTestCase):
         self.assertTrue(all_gradesets[student2])
         self.assertTrue(all_gradesets[student5])
 
+    def test_batched_grades_match_grade(self):
+        """Grading in batches gives the same gradesets as grading each student on its own"""
+        chapter = ItemFactory.create(parent=self.course, category='chapter')
+        section = ItemFactory.create(
+            parent=chapter, category='sequential', metadata={'graded': True, 'format': 'Homework'}
+        )
+        problem = ItemFactory.create(parent=section, category='problem')
+        self.course = self.store.get_course(self.course.id)
+        for student, earned in zip(self.students, [0, 1, 2, 3, None]):
+            StudentModuleFactory.create(
+                student=student,
+                course_id=self.course.id,
+                module_state_key=problem.location,
+                grade=earned,
+                max_grade=3,
+            )
+
+        all_gradesets, all_errors = self._gradesets_and_errors_for(self.course.id, self.students, batch_size=2)
+        self.assertEqual(len(all_errors), 0)
+        for student in self.students:
+            request = RequestFactory().get('/')
+            request.user = student
+            request.session = {}
+            expected = grade(student, request, self.course)
+            self.assertEqual(all_gradesets[student]['percent'], expected['percent'])
+            self.assertEqual(all_gradesets[student]['grade'], expected['grade'])
+            self.assertEqual(all_gradesets[student]['section_breakdown'], expected['section_breakdown'])
+
+    def test_bulk_load_failure(self):
+        """If a batch's scores can't be loaded, its students are still graded one by one"""
+        real_bulk_load = StudentModuleScores.bulk_load
+
+        def fail_for_batches(course_id, student_ids):
+            """Fail when loading more than one student at a time"""
+            if len(student_ids) > 1:
+                raise Exception("Batch too large")
+            return real_bulk_load(course_id, student_ids)
+
+        with patch('courseware.grades.StudentModuleScores.bulk_load', side_effect=fail_for_batches):
+            all_gradesets, all_errors = self._gradesets_and_errors_for(self.course.id, self.students, batch_size=2)
+
+        self.assertEqual(len(all_errors), 0)
+        self.assertEqual(len(all_gradesets), 5)
+        for gradeset in all_gradesets.values():
+            self.assertEqual(gradeset['percent'], 0.0)
+
     ################################# Helpers #################################
-    def _gradesets_and_errors_for(self, course_id, students):
+    def _gradesets_and_errors_for(self, course_id, students, **kwargs):
         """Simple helper method to iterate through student grades and give us
         two dictionaries -- one that has all students and their respective
         gradesets, and one that has only students that could not be graded and
@@ -115,9 +171,139 @@ class TestGradeIteration(ModuleStoreTestCase):
         students_to_gradesets = {}
         students_to_errors = {}
 
-        for student, gradeset, err_msg in iterate_grades_for(course_id, students):
+        for student, gradeset, err_msg in iterate_grades_for(course_id, students, **kwargs):
             students_to_gradesets[student] = gradeset
             if err_msg:
                 students_to_errors[student] = err_msg
 
         return students_to_gradesets, students_to_errors
+
+
+class TestStudentModuleScores(ModuleStoreTestCase):
+    """
+    Test bulk loading of StudentModule score rows.
+    """
+    def setUp(self):
+        super(TestStudentModuleScores, self).setUp()
+        self.course = CourseFactory.create()
+        chapter = ItemFactory.create(parent=self.course, category='chapter')
+        self.problems = [ItemFactory.create(parent=chapter, category='problem') for __ in range(2)]
+        self.students = [UserFactory.create() for __ in range(2)]
+
+    def test_bulk_load(self):
+        StudentModuleFactory.create(
+            student=self.students[0],
+            course_id=self.course.id,
+            module_state_key=self.problems[0].location,
+            grade=1,
+            max_grade=2,
+        )
+        with self.assertNumQueries(1):
+            scores = StudentModuleScores.bulk_load(
+                self.course.id,
+                [student.id for student in self.students],
+            )
+
+        self.assertEqual(scores[self.students[0].id].get(self.problems[0].location), (1, 2))
+        self.assertIsNone(scores[self.students[0].id].get(self.problems[1].location))
+        self.assertTrue(scores[self.students[0].id].has_state_for_any([p.location for p in self.problems]))
+        self.assertFalse(scores[self.students[1].id].has_state_for_any([p.location for p in self.problems]))
+
+
+@patch.dict('django.conf.settings.FEATURES', {'ENABLE_PERSISTENT_GRADES': True})
+class TestPersistentSubsectionGrades(ModuleStoreTestCase):
+    """
+    Test that subsection grades are persisted and invalidated.
+    """
+    def setUp(self):
+        super(TestPersistentSubsectionGrades, self).setUp()
+        self.course = CourseFactory.create()
+        chapter = ItemFactory.create(parent=self.course, category='chapter')
+        self.section = ItemFactory.create(
+            parent=chapter, category='sequential', metadata={'graded': True, 'format': 'Homework'}
+        )
+        self.problem = ItemFactory.create(parent=self.section, category='problem')
+        self.course = self.store.get_course(self.course.id)
+        self.student = UserFactory.create()
+        self.request = RequestFactory().get('/')
+        self.request.user = self.student
+        self.request.session = {}
+
+    def _grade(self):
+        """Grade the student."""
+        return grade(self.student, self.request, self.course)
+
+    def _persisted(self):
+        """Return the persisted grades of the student."""
+        return PersistentSubsectionGrade.objects.filter(user=self.student, course_id=self.course.id)
+
+    def test_grade_is_persisted(self):
+        self._grade()
+        self.assertEqual(self._persisted().count(), 1)
+        self.assertIsNone(self._persisted()[0].get_scores())
+
+    def test_persisted_grade_is_reused(self):
+        StudentModuleFactory.create(
+            student=self.student,
+            course_id=self.course.id,
+            module_state_key=self.problem.location,
+            grade=1,
+            max_grade=2,
+        )
+        first = self._grade()
+        self._persisted().update(
+            scores=json.dumps([[2, 2, True, self.problem.display_name_with_default]])
+        )
+        second = self._grade()
+        self.assertLess(first['percent'], second['percent'])
+
+    def test_student_module_change_invalidates(self):
+        self._grade()
+        self.assertEqual(self._persisted().count(), 1)
+        StudentModuleFactory.create(
+            student=self.student,
+            course_id=self.course.id,
+            module_state_key=self.problem.location,
+            grade=2,
+            max_grade=2,
+        )
+        self.assertEqual(self._persisted().count(), 0)
+        self.assertEqual(self._grade()['percent'], 1.0)
+
+    def test_student_module_change_ignored_when_disabled(self):
+        self._grade()
+        with patch.dict('django.conf.settings.FEATURES', {'ENABLE_PERSISTENT_GRADES': False}):
+            StudentModuleFactory.create(
+                student=self.student,
+                course_id=self.course.id,
+                module_state_key=self.problem.location,
+                grade=2,
+                max_grade=2,
+            )
+        self.assertEqual(self._persisted().count(), 1)
+
+    def test_content_change_invalidates(self):
+        self._grade()
+        self._persisted().update(content_version='stale')
+        self._grade()
+        self.assertNotEqual(self._persisted()[0].content_version, 'stale')
+
+    def test_cohort_change_invalidates(self):
+        self._grade()
+        version = self._persisted()[0].content_version
+        cohort = CohortFactory.create(course_id=self.course.id, users=[self.student])
+        self._grade()
+        self.assertNotEqual(self._persisted()[0].content_version, version)
+
+        # so does linking the student's cohort to a content group
+        version = self._persisted()[0].content_version
+        CourseUserGroupPartitionGroup.objects.create(course_user_group=cohort, partition_id=0, group_id=1)
+        self._grade()
+        self.assertNotEqual(self._persisted()[0].content_version, version)
+
+    def test_partition_assignment_invalidates(self):
+        self._grade()
+        version = self._persisted()[0].content_version
+        set_course_tag(self.student, self.course.id, 'xblock.partition_service.partition_0', 1)
+        self._grade()
+        self.assertNotEqual(self._persisted()[0].content_version, version)
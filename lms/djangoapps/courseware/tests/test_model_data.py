@@ -217,6 +217,36 @@ class TestMissingStudentModule(TestCase):
         self.assertFalse(self.kvs.has(user_state_key('a_field')))
 
 
+class TestFieldDataCacheGrowth(TestCase):
+    """Tests of adding descriptors to a FieldDataCache after creating it"""
+    def setUp(self):
+        super(TestFieldDataCacheGrowth, self).setUp()
+
+        self.user = UserFactory.create(username='user')
+        self.assertEqual(self.user.id, 1)   # check our assumption hard-coded in the key functions above.
+        StudentModuleFactory.create(student=self.user, state=json.dumps({'a_field': 'a_value'}))
+        self.descriptor = mock_descriptor([
+            mock_field(Scope.user_state, 'a_field'),
+            mock_field(Scope.preferences, 'a_pref'),
+            mock_field(Scope.user_info, 'an_info'),
+        ])
+
+    def test_add_descriptors_only_queries_once(self):
+        field_data_cache = FieldDataCache([], course_id, self.user)
+        with self.assertNumQueries(3):
+            field_data_cache.add_descriptors([self.descriptor])
+        with self.assertNumQueries(0):
+            field_data_cache.add_descriptors([self.descriptor])
+        self.assertEquals('a_value', DjangoKeyValueStore(field_data_cache).get(user_state_key('a_field')))
+
+    def test_course_scoped(self):
+        with self.assertNumQueries(3):
+            field_data_cache = FieldDataCache([], course_id, self.user, course_scoped=True)
+        with self.assertNumQueries(0):
+            field_data_cache.add_descriptors([self.descriptor])
+        self.assertEquals('a_value', DjangoKeyValueStore(field_data_cache).get(user_state_key('a_field')))
+
+
 class StorageTestBase(object):
     """
     A base class for that gets subclassed when testing each of the scopes.
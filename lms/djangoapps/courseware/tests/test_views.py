@@ -11,6 +11,7 @@ import ddt
 from django.conf import settings
 from django.contrib.auth.models import User, AnonymousUser
 from django.core.urlresolvers import reverse
+from django.db import connection
 from django.http import Http404
 from django.test import TestCase
 from django.test.client import RequestFactory
@@ -21,6 +22,7 @@ from mock import MagicMock, patch, create_autospec
 from opaque_keys.edx.locations import Location, SlashSeparatedCourseKey
 
 import courseware.views as views
+from courseware.tests.factories import StudentModuleFactory
 from xmodule.modulestore.tests.django_utils import (
     TEST_DATA_MOCK_MODULESTORE, TEST_DATA_MIXED_TOY_MODULESTORE
 )
@@ -671,6 +673,39 @@ class ProgressPageTests(ModuleStoreTestCase):
         resp = views.progress(self.request, course_id=self.course.id.to_deprecated_string())
         self.assertEqual(resp.status_code, 200)
 
+    def _add_graded_sections(self, num_sections):
+        """
+        Add graded sections, each with a problem the user has a score for.
+        """
+        for __ in range(num_sections):
+            section = ItemFactory.create(
+                category='sequential', parent_location=self.chapter.location, graded=True, format='Homework'
+            )
+            problem = ItemFactory.create(category='problem', parent_location=section.location)
+            StudentModuleFactory.create(
+                student=self.user, course_id=self.course.id, module_state_key=problem.location, grade=1, max_grade=1
+            )
+
+    def _count_progress_queries(self):
+        """
+        Return the number of queries the progress page makes once any caches are warm.
+        """
+        views.progress(self.request, course_id=self.course.id.to_deprecated_string())
+        connection.use_debug_cursor = True
+        try:
+            queries_before = len(connection.queries)
+            resp = views.progress(self.request, course_id=self.course.id.to_deprecated_string())
+            self.assertEqual(resp.status_code, 200)
+            return len(connection.queries) - queries_before
+        finally:
+            connection.use_debug_cursor = False
+
+    def test_queries_independent_of_sections(self):
+        self._add_graded_sections(1)
+        queries_for_one_section = self._count_progress_queries()
+        self._add_graded_sections(3)
+        self.assertEqual(self._count_progress_queries(), queries_for_one_section)
+
 
 class VerifyCourseKeyDecoratorTests(TestCase):
     """
@@ -464,9 +464,11 @@ def _index_bulk_op(request, course_key, chapter, section, position):
 
             # Load all descendants of the section, because we're going to display its
             # html, which in general will need all of its children
-            section_field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
-                course_key, user, section_descriptor, depth=None, asides=XBlockAsidesConfig.possible_asides()
+            # Grow the course's cache rather than querying again for what it already has
+            field_data_cache.add_descriptor_descendents(
+                section_descriptor, depth=None, asides=XBlockAsidesConfig.possible_asides()
             )
+            section_field_data_cache = field_data_cache
 
             # Verify that position a string is in fact an int
             if position is not None:
@@ -25,7 +25,7 @@ from openedx.core.djangoapps.course_groups.cohorts import (
 from courseware.access import has_access
 from xmodule.modulestore.django import modulestore
 
-from django_comment_client.permissions import cached_has_permission
+from django_comment_client.permissions import cached_has_permission, get_permission_snapshot
 from django_comment_client.utils import (
     merge_dict,
     extract,
@@ -239,7 +239,7 @@ def forum_form_discussion(request, course_key):
             'annotated_content_info': _attr_safe_json(annotated_content_info),
             'course_id': course.id.to_deprecated_string(),
             'roles': _attr_safe_json(utils.get_role_ids(course_key)),
-            'is_moderator': cached_has_permission(request.user, "see_all_cohorts", course_key),
+            'is_moderator': get_permission_snapshot(request.user, course_key).is_moderator,
             'cohorts': course_settings["cohorts"],  # still needed to render _thread_list_template
             'user_cohort': user_cohort_id,  # read from container in NewPostView
             'is_course_cohorted': is_course_cohorted(course_key),  # still needed to render _thread_list_template
@@ -264,18 +264,21 @@ def single_thread(request, course_key, discussion_id, thread_id):
     course = get_course_with_access(request.user, 'load_forum', course_key)
     course_settings = make_course_settings(course)
     cc_user = cc.User.from_django_user(request.user)
-    user_info = cc_user.to_dict()
-    is_moderator = cached_has_permission(request.user, "see_all_cohorts", course_key)
+    is_moderator = get_permission_snapshot(request.user, course_key).is_moderator
 
     # Currently, the front end always loads responses via AJAX, even for this
     # page; it would be a nice optimization to avoid that extra round trip to
     # the comments service.
     try:
-        thread = cc.Thread.find(thread_id).retrieve(
-            recursive=request.is_ajax(),
-            user_id=request.user.id,
-            response_skip=request.GET.get("resp_skip"),
-            response_limit=request.GET.get("resp_limit")
+        # The user and the thread don't depend on each other, so get both at once.
+        user_info, thread = cc.utils.call_concurrently(
+            cc_user.to_dict,
+            lambda: cc.Thread.find(thread_id).retrieve(
+                recursive=request.is_ajax(),
+                user_id=request.user.id,
+                response_skip=request.GET.get("resp_skip"),
+                response_limit=request.GET.get("resp_limit")
+            ),
         )
     except cc.utils.CommentClientRequestError as e:
         if e.status_code == 404:
@@ -5,8 +5,11 @@ Module for checking permissions with the comment_client backend
 import logging
 from types import NoneType
 from django.core import cache
+from django_comment_common.models import FORUM_ROLE_STUDENT
 from lms.lib.comment_client import Thread
 from opaque_keys.edx.keys import CourseKey
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.exceptions import ItemNotFoundError
 
 CACHE = cache.get_cache('default')
 CACHE_LIFESPAN = 60
@@ -35,6 +38,53 @@ def has_permission(user, permission, course_id=None):
     return False
 
 
+class PermissionSnapshot(object):
+    """
+    A user's forum roles and permissions in a course, loaded all at once.
+
+    Answers the same questions as has_permission, without going back to the
+    database for each one.
+    """
+    def __init__(self, user, course_id):
+        roles = list(user.roles.filter(course_id=course_id).prefetch_related('permissions'))
+        self.permissions = set()
+        if roles:
+            course = modulestore().get_course(course_id)
+            if course is None:
+                raise ItemNotFoundError(course_id)
+            for role in roles:
+                names = set(permission.name for permission in role.permissions.all())
+                # Same rule as Role.has_permission: students can't post when posting is disabled.
+                if role.name == FORUM_ROLE_STUDENT and not course.forum_posts_allowed:
+                    names = set(name for name in names if not name.startswith(('edit', 'update', 'create')))
+                self.permissions |= names
+
+    def has_permission(self, permission):
+        return permission in self.permissions
+
+    @property
+    def is_moderator(self):
+        """Can the user see and moderate the posts of every cohort?"""
+        return self.has_permission('see_all_cohorts')
+
+
+def get_permission_snapshot(user, course_id):
+    """
+    Return the PermissionSnapshot of `user` in `course_id`.
+
+    The snapshot is kept on the user object, which lives as long as the
+    request, so checking many pieces of content costs a fixed number of
+    queries.
+    """
+    assert isinstance(course_id, (NoneType, CourseKey))
+    snapshots = getattr(user, '_forum_permission_snapshots', None)
+    if snapshots is None:
+        snapshots = user._forum_permission_snapshots = {}  # pylint: disable=protected-access
+    if course_id not in snapshots:
+        snapshots[course_id] = PermissionSnapshot(user, course_id)
+    return snapshots[course_id]
+
+
 CONDITIONS = ['is_open', 'is_author', 'is_question_author']
 
 
@@ -79,12 +129,13 @@ def _check_conditions_permissions(user, permissions, course_id, content):
     "can_view" or "can_edit" permission. To use AND operator in between, wrap them in
     a list.
     """
+    snapshot = get_permission_snapshot(user, course_id)
 
     def test(user, per, operator="or"):
         if isinstance(per, basestring):
             if per in CONDITIONS:
                 return _check_condition(user, per, content)
-            return cached_has_permission(user, per, course_id=course_id)
+            return snapshot.has_permission(per)
         elif isinstance(per, list) and operator in ["and", "or"]:
             results = [test(user, x, operator="and") for x in per]
             if operator == "or":
@@ -1,18 +1,26 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime
+from httplib import HTTPMessage
 import json
+from StringIO import StringIO
+import sys
+import traceback
 from pytz import UTC
 
 from django.core.urlresolvers import reverse
 from django.test import TestCase
 from django.test.utils import override_settings
+from django.utils import translation
 from edxmako import add_lookup
 import mock
+import requests
+from requests.cookies import extract_cookies_to_jar
 
 from xmodule.modulestore.tests.django_utils import TEST_DATA_MOCK_MODULESTORE
 from django_comment_client.tests.factories import RoleFactory
 from django_comment_client.tests.unicode import UnicodeTestMixin
 import django_comment_client.utils as utils
+import lms.lib.comment_client.utils as cc_utils
 from student.tests.factories import UserFactory, CourseEnrollmentFactory
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
@@ -83,6 +91,23 @@ class AccessUtilsTestCase(ModuleStoreTestCase):
         ret = utils.has_forum_access('student', self.course_id, 'NotARole')
         self.assertFalse(ret)
 
+    def test_annotate_thread_queries(self):
+        # Permissions are loaded once, however many comments there are.
+        self.student_role.add_permission('vote')
+        thread = {
+            'id': 'thread', 'type': 'thread', 'closed': False, 'user_id': str(self.student1.id),
+            'children': [
+                {'id': 'comment{}'.format(i), 'type': 'comment', 'user_id': str(self.student2.id)}
+                for i in xrange(500)
+            ],
+        }
+        user_info = {'upvoted_ids': [], 'downvoted_ids': [], 'subscribed_thread_ids': []}
+        with self.assertNumQueries(2):
+            infos = utils.get_annotated_content_infos(self.course_id, thread, self.student1, user_info)
+        self.assertEqual(len(infos), 501)
+        self.assertTrue(infos['thread']['ability']['can_vote'])
+        self.assertFalse(infos['comment0']['ability']['editable'])
+
 
 class CoursewareContextTestCase(ModuleStoreTestCase):
     """
@@ -190,6 +215,17 @@ class CategoryMapTestCase(ModuleStoreTestCase):
             {"entries": {}, "subcategories": {}, "children": []}
         )
 
+    def test_discussion_data_cached(self):
+        self.create_discussion("Chapter", "Discussion")
+        self.addCleanup(utils.DISCUSSION_DATA_CACHE.delete, "test_discussion_data")
+        with mock.patch.object(utils, "_discussion_data_cache_key", return_value="test_discussion_data"):
+            with mock.patch.object(utils, "_get_discussion_modules", wraps=utils._get_discussion_modules) as mock_get:
+                category_map = utils.get_discussion_category_map(self.course)
+                self.assertEqual(utils.get_discussion_category_map(self.course), category_map)
+                self.assertEqual(utils.get_discussion_categories_ids(self.course), ["discussion1"])
+                self.assertIn("discussion1", utils.get_discussion_id_map(self.course))
+        self.assertEqual(mock_get.call_count, 1)
+
     def test_configured_topics(self):
         self.course.discussion_topics = {
             "Topic A": {"id": "Topic_A"},
@@ -639,3 +675,61 @@ class RenderMustacheTests(TestCase):
         """
         add_lookup('main', '', package=__name__)
         self.assertEqual(utils.render_mustache('test.mustache', {}), 'Testing 1 2 3.\n')
+
+
+class CommentClientConcurrencyTestCase(TestCase):
+    """
+    Tests for the comments service session and concurrent calls.
+    """
+    def test_session_is_shared(self):
+        self.assertIs(cc_utils.get_session(), cc_utils.get_session())
+
+    @override_settings(COMMENTS_SERVICE_MAX_RETRIES=2)
+    @mock.patch.object(cc_utils, '_sessions', {})
+    def test_only_reads_are_retried(self):
+        self.assertEqual(cc_utils.get_session('get').get_adapter('http://localhost').max_retries, 2)
+        for method in ['post', 'put', 'delete']:
+            self.assertEqual(cc_utils.get_session(method).get_adapter('http://localhost').max_retries, 0)
+
+    def test_session_keeps_no_cookies(self):
+        session = cc_utils.get_session()
+        request = requests.Request('GET', 'http://localhost:4567/api/v1/threads').prepare()
+        headers = HTTPMessage(StringIO("Set-Cookie: sessionid=secret; Path=/\r\n\r\n"))
+        response = mock.Mock(_original_response=mock.Mock(msg=headers))
+        extract_cookies_to_jar(session.cookies, request, response)
+        self.assertEqual(len(session.cookies), 0)
+
+    @override_settings(COMMENTS_SERVICE_CONCURRENCY=4)
+    def test_call_concurrently(self):
+        results = cc_utils.call_concurrently(lambda: 1, lambda: 2, lambda: 3)
+        self.assertEqual(results, [1, 2, 3])
+
+    @override_settings(COMMENTS_SERVICE_CONCURRENCY=4)
+    def test_call_concurrently_raises_first_error(self):
+        def fail(message):
+            """Raise a comments service error."""
+            raise cc_utils.CommentClientRequestError(message, 404)
+
+        with self.assertRaises(cc_utils.CommentClientRequestError) as assertion:
+            cc_utils.call_concurrently(lambda: 1, lambda: fail("first"), lambda: fail("second"))
+        self.assertEqual(assertion.exception.message, "first")
+
+    @override_settings(COMMENTS_SERVICE_CONCURRENCY=4)
+    def test_call_concurrently_keeps_traceback(self):
+        def fail():
+            """Raise a comments service error."""
+            raise cc_utils.CommentClientRequestError("failed", 500)
+
+        try:
+            cc_utils.call_concurrently(lambda: 1, fail)
+        except cc_utils.CommentClientRequestError:
+            frames = traceback.extract_tb(sys.exc_info()[2])
+            self.assertEqual(frames[-1][2], 'fail')
+        else:
+            self.fail("call_concurrently didn't raise")
+
+    @override_settings(COMMENTS_SERVICE_CONCURRENCY=4, LANGUAGE_CODE='en')
+    def test_call_concurrently_keeps_language(self):
+        with translation.override('eo'):
+            results = cc_utils.call_concurrently(translation.get_language, translation.get_language)
+        self.assertEqual(results, ['eo', 'eo'])
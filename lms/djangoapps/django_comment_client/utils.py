@@ -1,3 +1,4 @@
+import hashlib
 import json
 import pytz
 from collections import defaultdict
@@ -5,6 +6,7 @@ import logging
 from datetime import datetime
 
 from django.contrib.auth.models import User
+from django.core import cache
 from django.core.urlresolvers import reverse
 from django.db import connection
 from django.http import HttpResponse
@@ -12,7 +14,9 @@ from django.utils import simplejson
 from django.utils.timezone import UTC
 
 from django_comment_common.models import Role, FORUM_ROLE_STUDENT
-from django_comment_client.permissions import check_permissions_by_view, cached_has_permission
+from django_comment_client.permissions import (
+    check_permissions_by_view, cached_has_permission, get_permission_snapshot
+)
 
 from edxmako import lookup_template
 import pystache_custom as pystache
@@ -25,6 +29,11 @@ from xmodule.modulestore.django import modulestore
 
 log = logging.getLogger(__name__)
 
+DISCUSSION_DATA_CACHE = cache.get_cache('default')
+# A course's discussion data is cached by the version of its content, so
+# this is only to let unused entries expire.
+DISCUSSION_DATA_CACHE_LIFESPAN = 60 * 60 * 24
+
 
 def extract(dic, keys):
     return {k: dic.get(k) for k in keys}
@@ -72,14 +81,64 @@ def _get_discussion_modules(course):
     return filter(has_required_keys, all_modules)
 
 
-def get_discussion_id_map(course):
-    def get_entry(module):
-        discussion_id = module.discussion_id
-        title = module.discussion_target
-        last_category = module.discussion_category.split("/")[-1].strip()
-        return (discussion_id, {"location": module.location, "title": last_category + " / " + title})
+def _get_discussion_id_map_entry(module):
+    discussion_id = module.discussion_id
+    title = module.discussion_target
+    last_category = module.discussion_category.split("/")[-1].strip()
+    return (discussion_id, {"location": module.location, "title": last_category + " / " + title})
 
-    return dict(map(get_entry, _get_discussion_modules(course)))
+
+def _discussion_data_cache_key(course):
+    """
+    Return the key of `course`'s discussion data in DISCUSSION_DATA_CACHE, or
+    None if the course doesn't know the version of its content.
+
+    Besides the content, the key covers the course settings the category map
+    depends on.
+    """
+    try:
+        edited_on = course.subtree_edited_on
+    except (AttributeError, NotImplementedError):
+        # Not every runtime tracks edit info (e.g. XML courses)
+        edited_on = None
+    if edited_on is None:
+        return None
+    stamp = json.dumps([
+        unicode(course.id),
+        unicode(edited_on),
+        course.discussion_topics,
+        course.discussion_sort_alpha,
+        course.is_cohorted,
+        sorted(course.cohorted_discussions),
+    ], sort_keys=True, default=unicode)
+    return "django_comment_client.discussion_data.{}".format(hashlib.sha1(stamp).hexdigest())
+
+
+def _get_discussion_data(course):
+    """
+    Return a dict of `course`'s discussion data, built from its discussion
+    modules: "id_map", as returned by get_discussion_id_map, and
+    "category_map", the sorted category map before unstarted categories are
+    filtered out.
+
+    Finding the modules and building the map is done once per version of the
+    course's content; after that the data comes from DISCUSSION_DATA_CACHE.
+    """
+    key = _discussion_data_cache_key(course)
+    data = DISCUSSION_DATA_CACHE.get(key) if key else None
+    if data is None:
+        modules = _get_discussion_modules(course)
+        data = {
+            "id_map": dict(map(_get_discussion_id_map_entry, modules)),
+            "category_map": _build_discussion_category_map(course, modules),
+        }
+        if key:
+            DISCUSSION_DATA_CACHE.set(key, data, DISCUSSION_DATA_CACHE_LIFESPAN)
+    return data
+
+
+def get_discussion_id_map(course):
+    return _get_discussion_data(course)["id_map"]
 
 
 def _filter_unstarted_categories(category_map):
@@ -132,13 +191,13 @@ def _sort_map_entries(category_map, sort_alpha):
     category_map["children"] = [x[0] for x in sorted(things, key=lambda x: x[1]["sort_key"])]
 
 
-def get_discussion_category_map(course):
-    course_id = course.id
-
+def _build_discussion_category_map(course, modules):
+    """
+    Build the sorted category map of `course`, whose discussion modules are
+    `modules`.  Entries and categories still have their start dates.
+    """
     unexpanded_category_map = defaultdict(list)
 
-    modules = _get_discussion_modules(course)
-
     is_course_cohorted = course.is_cohorted
     cohorted_discussion_ids = course.cohorted_discussions
 
@@ -193,14 +252,22 @@ def get_discussion_category_map(course):
     # (I think Kevin already noticed this)  Need to send course_id with requests, store it
     # in the backend.
     for topic, entry in course.discussion_topics.items():
+        # Configured topics are always started.
         category_map['entries'][topic] = {"id": entry["id"],
                                           "sort_key": entry.get("sort_key", topic),
-                                          "start_date": datetime.now(UTC()),
+                                          "start_date": datetime.min.replace(tzinfo=pytz.UTC),
                                           "is_cohorted": is_course_cohorted and entry["id"] in cohorted_discussion_ids}
 
     _sort_map_entries(category_map, course.discussion_sort_alpha)
 
-    return _filter_unstarted_categories(category_map)
+    return category_map
+
+
+def get_discussion_category_map(course):
+    """
+    Return the category map of `course`'s discussions that have started.
+    """
+    return _filter_unstarted_categories(_get_discussion_data(course)["category_map"])
 
 
 def get_discussion_categories_ids(course):
@@ -467,7 +534,7 @@ def get_group_id_for_comments_service(request, course_key, commentable_id=None):
             requested_group_id = request.GET.get('group_id')
         elif request.method == "POST":
             requested_group_id = request.POST.get('group_id')
-        if cached_has_permission(request.user, "see_all_cohorts", course_key):
+        if get_permission_snapshot(request.user, course_key).is_moderator:
             if not requested_group_id:
                 return None
             try:
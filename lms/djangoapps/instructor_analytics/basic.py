@@ -35,6 +35,9 @@ AVAILABLE_FEATURES = STUDENT_FEATURES + PROFILE_FEATURES
 COURSE_REGISTRATION_FEATURES = ('code', 'course_id', 'created_by', 'created_at')
 COUPON_FEATURES = ('code', 'course_id', 'percentage_discount', 'description', 'expiration_date', 'is_active')
 
+# Number of students read per query by iter_enrolled_students_features
+STUDENTS_CHUNK_SIZE = 1000
+
 
 def sale_order_record_features(course_id, features):
     """
@@ -159,6 +162,16 @@ def enrolled_students_features(course_key, features):
         {'username': 'username3', 'first_name': 'firstname3'}
     ]
     """
+    return list(iter_enrolled_students_features(course_key, features))
+
+
+def iter_enrolled_students_features(course_key, features, chunk_size=STUDENTS_CHUNK_SIZE):
+    """
+    Generator version of `enrolled_students_features`.
+
+    Students are read from the database `chunk_size` at a time, so only one
+    chunk of users and profiles is held in memory at once.
+    """
     include_cohort_column = 'cohort' in features
 
     students = User.objects.filter(
@@ -206,7 +219,14 @@ def enrolled_students_features(course_key, features):
             )
         return student_dict
 
-    return [extract_student(student, features) for student in students]
+    start = 0
+    while True:
+        chunk = list(students[start:start + chunk_size])
+        for student in chunk:
+            yield extract_student(student, features)
+        if len(chunk) < chunk_size:
+            break
+        start += chunk_size
 
 
 def coupon_codes_features(features, coupons_list):
@@ -64,6 +64,17 @@ def format_dictlist(dictlist, features):
     }
     """
 
+    header, datarows = iter_dictlist(dictlist, features)
+    return header, list(datarows)
+
+
+def iter_dictlist(dictlist, features):
+    """
+    Like `format_dictlist`, but `dictlist` can be any iterable of
+    dictionaries and the rows are returned as a generator, so that they
+    can be written out without being held in memory.
+    """
+
     def dict_to_entry(dct):
         """ Convert dictionary to a list for a csv row """
         relevant_items = [(k, v) for (k, v) in dct.items() if k in features]
@@ -72,7 +83,7 @@ def format_dictlist(dictlist, features):
         return vals
 
     header = features
-    datarows = map(dict_to_entry, dictlist)
+    datarows = (dict_to_entry(dct) for dct in dictlist)
 
     return header, datarows
 
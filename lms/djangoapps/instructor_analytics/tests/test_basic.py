@@ -16,7 +16,7 @@ from shoppingcart.models import (
 from course_modes.models import CourseMode
 from instructor_analytics.basic import (
     sale_record_features, sale_order_record_features, enrolled_students_features, course_registration_features,
-    coupon_codes_features, AVAILABLE_FEATURES, STUDENT_FEATURES, PROFILE_FEATURES
+    coupon_codes_features, iter_enrolled_students_features, AVAILABLE_FEATURES, STUDENT_FEATURES, PROFILE_FEATURES
 )
 from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory
 from courseware.tests.factories import InstructorFactory
@@ -110,6 +110,13 @@ class TestAnalyticsBasic(ModuleStoreTestCase):
             else:
                 self.assertEqual(report['cohort'], '[unassigned]')
 
+    def test_iter_enrolled_students_features_chunked(self):
+        userreports = list(iter_enrolled_students_features(self.course_key, ['username'], chunk_size=3))
+        self.assertEqual(
+            sorted(userreport['username'] for userreport in userreports),
+            sorted(user.username for user in self.users)
+        )
+
     def test_available_features(self):
         self.assertEqual(len(AVAILABLE_FEATURES), len(STUDENT_FEATURES + PROFILE_FEATURES))
         self.assertEqual(set(AVAILABLE_FEATURES), set(STUDENT_FEATURES + PROFILE_FEATURES))
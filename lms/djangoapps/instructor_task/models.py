@@ -57,6 +57,9 @@ class InstructorTask(models.Model):
     `requester` stores id of user who submitted the task
     `created` stores date that entry was first created
     `updated` stores date that entry was last modified
+    `subtasks` stores a JSON-serialized dict of counts of subtasks, if the task has any.
+        The status of each subtask is stored in InstructorSubtask.
+    `subtasks_completed` counts the subtasks that have finished running.
     """
     task_type = models.CharField(max_length=50, db_index=True)
     course_id = CourseKeyField(max_length=255, db_index=True)
@@ -69,6 +72,7 @@ class InstructorTask(models.Model):
     created = models.DateTimeField(auto_now_add=True, null=True)
     updated = models.DateTimeField(auto_now=True)
     subtasks = models.TextField(blank=True)  # JSON dictionary
+    subtasks_completed = models.IntegerField(default=0)
 
     def __repr__(self):
         return 'InstructorTask<%r>' % ({
@@ -190,12 +194,45 @@ class InstructorTask(models.Model):
         return json.dumps({'message': 'Task revoked before running'})
 
 
+class InstructorSubtask(models.Model):
+    """
+    Stores the status of one subtask of an InstructorTask.
+
+    Each subtask updates only its own row, so subtasks running in parallel don't
+    contend for the parent InstructorTask's row while they report progress.
+
+    `instructor_task` is the InstructorTask the subtask belongs to.
+    `task_id` stores the id used by celery for the subtask.
+    `state` stores the last known state of the subtask.
+    The remaining fields are the counters of a SubtaskStatus.
+    """
+    instructor_task = models.ForeignKey(InstructorTask, db_index=True, related_name='subtask_statuses')
+    task_id = models.CharField(max_length=255, unique=True)  # max_length from celery_taskmeta
+    state = models.CharField(max_length=50, db_index=True)  # max_length from celery_taskmeta
+    attempted = models.IntegerField(default=0)
+    succeeded = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    skipped = models.IntegerField(default=0)
+    retried_nomax = models.IntegerField(default=0)
+    retried_withmax = models.IntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __repr__(self):
+        return 'InstructorSubtask<%r>' % ({
+            'instructor_task_id': self.instructor_task_id,
+            'task_id': self.task_id,
+            'state': self.state,
+        },)
+
+    def __unicode__(self):
+        return unicode(repr(self))
+
+
 class ReportStore(object):
     """
     Simple abstraction layer that can fetch and store CSV files for reports
-    download. Should probably refactor later to create a ReportFile object that
-    can simply be appended to for the sake of memory efficiency, rather than
-    passing in the whole dataset. Doing that for now just because it's simpler.
+    download. `store_rows` consumes its rows lazily, so callers can pass a
+    generator and keep memory use independent of the size of the report.
     """
     @classmethod
     def from_config(cls):
@@ -231,6 +268,10 @@ class S3ReportStore(ReportStore):
     conventions on where files are stored to know what to display. Clients using
     this class can name the final file whatever they want.
     """
+    # Size of the parts that `store_rows` uploads. This is the smallest part
+    # size S3 accepts for all but the last part of a multipart upload.
+    MULTIPART_CHUNK_SIZE = 5 * 1024 * 1024
+
     def __init__(self, bucket_name, root_path):
         self.root_path = root_path
 
@@ -308,8 +349,13 @@ class S3ReportStore(ReportStore):
     def store_rows(self, course_id, filename, rows):
         """
         Given a `course_id`, `filename`, and `rows` (each row is an iterable of
-        strings), create a buffer that is a gzip'd csv file, and then `store()`
-        that buffer.
+        strings), write the rows out as a gzip'd csv file.
+
+        `rows` is consumed lazily and the compressed output is uploaded as an
+        S3 multipart upload in parts of `MULTIPART_CHUNK_SIZE` bytes, so only
+        one part is ever held in memory. Reports that fit in a single part are
+        simply `store()`d. Either way, the file only becomes visible in S3 once
+        it is complete.
 
         Even though we store it in gzip format, browsers will transparently
         download and decompress it. Filenames should end in `.csv`, not `.gz`.
@@ -317,10 +363,44 @@ class S3ReportStore(ReportStore):
         output_buffer = StringIO()
         gzip_file = GzipFile(fileobj=output_buffer, mode="wb")
         csvwriter = csv.writer(gzip_file)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
-        gzip_file.close()
-
-        self.store(course_id, filename, output_buffer)
+        multipart_upload = None
+        part_count = 0
+
+        try:
+            for row in self._get_utf8_encoded_rows(rows):
+                csvwriter.writerow(row)
+                if output_buffer.tell() >= self.MULTIPART_CHUNK_SIZE:
+                    if multipart_upload is None:
+                        multipart_upload = self.bucket.initiate_multipart_upload(
+                            self.key_for(course_id, filename).key,
+                            headers={
+                                "Content-Encoding": "gzip",
+                                "Content-Type": "text/csv",
+                            }
+                        )
+                    part_count += 1
+                    self._upload_part(multipart_upload, part_count, output_buffer)
+            gzip_file.close()
+
+            if multipart_upload is None:
+                self.store(course_id, filename, output_buffer)
+            else:
+                self._upload_part(multipart_upload, part_count + 1, output_buffer)
+                multipart_upload.complete_upload()
+        except Exception:
+            if multipart_upload is not None:
+                multipart_upload.cancel_upload()
+            raise
+
+    def _upload_part(self, multipart_upload, part_num, buff):
+        """
+        Upload the contents of `buff` as part number `part_num` of
+        `multipart_upload`, then empty `buff`.
+        """
+        buff.seek(0)
+        multipart_upload.upload_part_from_file(buff, part_num)
+        buff.seek(0)
+        buff.truncate()
 
     def links_for(self, course_id):
         """
@@ -371,6 +451,12 @@ class LocalFSReportStore(ReportStore):
         """Return the full path to a given file for a given course."""
         return os.path.join(self.root_path, urllib.quote(course_id.to_deprecated_string(), safe=''), filename)
 
+    def _ensure_course_dir(self, course_id):
+        """Create the directory holding the files of `course_id` if needed."""
+        directory = os.path.dirname(self.path_to(course_id, ''))
+        if not os.path.exists(directory):
+            os.mkdir(directory)
+
     def store(self, course_id, filename, buff):
         """
         Given the `course_id` and `filename`, store the contents of `buff` in
@@ -378,24 +464,31 @@ class LocalFSReportStore(ReportStore):
         assumed to be a StringIO objecd (or anything that can flush its contents
         to string using `.getvalue()`).
         """
-        full_path = self.path_to(course_id, filename)
-        directory = os.path.dirname(full_path)
-        if not os.path.exists(directory):
-            os.mkdir(directory)
+        self._ensure_course_dir(course_id)
 
-        with open(full_path, "wb") as f:
+        with open(self.path_to(course_id, filename), "wb") as f:
             f.write(buff.getvalue())
 
     def store_rows(self, course_id, filename, rows):
         """
         Given a course_id, filename, and rows (each row is an iterable of strings),
         write this data out.
-        """
-        output_buffer = StringIO()
-        csvwriter = csv.writer(output_buffer)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
 
-        self.store(course_id, filename, output_buffer)
+        Rows are written to disk as they are consumed, into a temporary file
+        outside of the course directory that is renamed into place once it is
+        complete.
+        """
+        self._ensure_course_dir(course_id)
+
+        temp_path = os.path.join(self.root_path, "{}.tmp".format(uuid4()))
+        try:
+            with open(temp_path, "wb") as f:
+                csvwriter = csv.writer(f)
+                csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+            os.rename(temp_path, self.path_to(course_id, filename))
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
 
     def links_for(self, course_id):
         """
@@ -9,13 +9,14 @@ import psutil
 from contextlib import contextmanager
 
 from celery.utils.log import get_task_logger
-from celery.states import SUCCESS, READY_STATES, RETRY
+from celery.states import SUCCESS, FAILURE, READY_STATES, RETRY
 import dogstats_wrapper as dog_stats_api
 
 from django.db import transaction, DatabaseError
+from django.db.models import F, Sum
 from django.core.cache import cache
 
-from instructor_task.models import InstructorTask, PROGRESS, QUEUING
+from instructor_task.models import InstructorTask, InstructorSubtask, PROGRESS, QUEUING
 
 TASK_LOG = get_task_logger(__name__)
 
@@ -24,6 +25,13 @@ SUBTASK_LOCK_EXPIRE = 60 * 10  # Lock expires in 10 minutes
 # Number of times to retry if a subtask update encounters a lock on the InstructorTask.
 # (These are recursive retries, so don't make this number too large.)
 MAX_DATABASE_LOCK_RETRIES = 5
+# Number of InstructorSubtask entries to create with each query.
+SUBTASK_STATUS_BATCH_SIZE = 500
+
+# The SubtaskStatus counters stored in each InstructorSubtask.
+SUBTASK_STATUS_COUNTERS = ['attempted', 'succeeded', 'failed', 'skipped', 'retried_nomax', 'retried_withmax']
+# The counters of completed subtasks that are added into the InstructorTask's progress.
+PROGRESS_COUNTERS = ['attempted', 'succeeded', 'failed', 'skipped']
 
 
 class DuplicateTaskException(Exception):
@@ -226,14 +234,14 @@ def initialize_subtask_info(entry, action_name, total_num, subtask_id_list):
     task_progress messages.
 
     The InstructorTask's "subtasks" field is also initialized.  This is also a JSON-serialized dict.
-    Keys include 'total', 'succeeded', 'retried', 'failed', which are counters for the number of
-    subtasks.  'Total' is set here to the total number, while the other three are initialized to zero.
-    Once the counters for 'succeeded' and 'failed' match the 'total', the subtasks are done and
+    Keys include 'total', 'succeeded', 'failed', which are counters for the number of
+    subtasks.  'Total' is set here to the total number, while the other two are initialized to zero,
+    and are filled in when the last subtask completes.  The InstructorTask's "subtasks_completed"
+    counter is reset to zero.  Once it matches the 'total', the subtasks are done and
     the InstructorTask's "status" will be changed to SUCCESS.
 
-    The "subtasks" field also contains a 'status' key, that contains a dict that stores status
-    information for each subtask.  The value for each subtask (keyed by its task_id)
-    is its subtask status, as defined by SubtaskStatus.to_dict().
+    An InstructorSubtask is also created for each subtask, to store its status information,
+    as defined by SubtaskStatus.  Any left from an earlier queuing of the same task are removed.
 
     This information needs to be set up in the InstructorTask before any of the subtasks start
     running.  If not, there is a chance that the subtasks could complete before the parent task
@@ -259,22 +267,83 @@ def initialize_subtask_info(entry, action_name, total_num, subtask_id_list):
 
     # Write out the subtasks information.
     num_subtasks = len(subtask_id_list)
-    # Note that may not be necessary to store initial value with all those zeroes!
-    # Write out as a dict, so it will go more smoothly into json.
-    subtask_status = {subtask_id: (SubtaskStatus.create(subtask_id)).to_dict() for subtask_id in subtask_id_list}
     subtask_dict = {
         'total': num_subtasks,
         'succeeded': 0,
         'failed': 0,
-        'status': subtask_status
     }
     entry.subtasks = json.dumps(subtask_dict)
+    entry.subtasks_completed = 0
 
     # and save the entry immediately, before any subtasks actually start work:
     entry.save_now()
+    _create_subtask_statuses(entry, subtask_id_list)
+    return task_progress
+
+
+@transaction.autocommit
+def _create_subtask_statuses(entry, subtask_id_list):
+    """
+    Replaces the InstructorSubtask entries of `entry` with new ones for `subtask_id_list`.
+
+    Like InstructorTask.save_now, the autocommit annotation makes sure that the entries are
+    committed before any of the subtasks start running.
+    """
+    InstructorSubtask.objects.filter(instructor_task=entry).delete()
+    for start in xrange(0, len(subtask_id_list), SUBTASK_STATUS_BATCH_SIZE):
+        InstructorSubtask.objects.bulk_create([
+            InstructorSubtask(instructor_task=entry, task_id=subtask_id, state=QUEUING)
+            for subtask_id in subtask_id_list[start:start + SUBTASK_STATUS_BATCH_SIZE]
+        ])
+
+
+def get_subtask_status(entry_id, subtask_id):
+    """
+    Returns the SubtaskStatus stored for subtask `subtask_id` of InstructorTask `entry_id`.
+
+    Returns None if the InstructorTask doesn't know about the subtask.
+    """
+    try:
+        subtask = InstructorSubtask.objects.get(instructor_task_id=entry_id, task_id=subtask_id)
+    except InstructorSubtask.DoesNotExist:
+        return None
+    counts = {name: getattr(subtask, name) for name in SUBTASK_STATUS_COUNTERS}
+    return SubtaskStatus.create(subtask.task_id, state=subtask.state, **counts)
+
+
+def get_subtask_progress(entry):
+    """
+    Returns the task progress of an InstructorTask whose subtasks are still running.
+
+    Subtasks store their status in their own InstructorSubtask entries rather than in the
+    InstructorTask, so the counts of the subtasks that are done are summed up here, and added
+    to those stored in the InstructorTask's "task_output".  The 'duration_ms' value is brought
+    up to date too.
+    """
+    task_progress = json.loads(entry.task_output)
+    totals = InstructorSubtask.objects.filter(
+        instructor_task_id=entry.id, state__in=READY_STATES
+    ).aggregate(*[Sum(statname) for statname in PROGRESS_COUNTERS])
+    for statname in PROGRESS_COUNTERS:
+        total = totals[statname + '__sum']
+        if total is not None:
+            task_progress[statname] = task_progress.get(statname, 0) + total
+    _update_duration(task_progress)
     return task_progress
 
 
+def _update_duration(task_progress):
+    """
+    Sets the estimate of duration in `task_progress`, but only if it increases.
+
+    Clock skew between time() returned by different machines may result in
+    non-monotonic values for duration.
+    """
+    if 'start_time' in task_progress:
+        new_duration = int((time() - task_progress['start_time']) * 1000)
+        task_progress['duration_ms'] = max(task_progress.get('duration_ms', 0), new_duration)
+
+
 def queue_subtasks_for_query(entry, action_name, create_subtask_fcn, item_queryset, item_fields, items_per_task):
     """
     Generates and queues subtasks to each execute a chunk of "items" generated by a queryset.
@@ -336,6 +405,13 @@ def queue_subtasks_for_query(entry, action_name, create_subtask_fcn, item_querys
         new_subtask = create_subtask_fcn(item_list, subtask_status)
         new_subtask.apply_async()
 
+    # If the queryset shrank after it was counted, queue the subtasks left without
+    # items anyway, so that all the subtasks the InstructorTask expects complete.
+    for subtask_id in subtask_id_list[num_subtasks:]:
+        TASK_LOG.info("Task %s: queuing subtask %s with no items to process.", task_id, subtask_id)
+        new_subtask = create_subtask_fcn([], SubtaskStatus.create(subtask_id))
+        new_subtask.apply_async()
+
     # Subtasks have been queued so no exceptions should be raised after this point.
 
     # Return the task progress as stored in the InstructorTask object.
@@ -406,9 +482,8 @@ def check_subtask_is_valid(entry_id, current_task_id, new_subtask_status):
         raise DuplicateTaskException(msg)
 
     # Confirm that the InstructorTask knows about this particular subtask.
-    subtask_dict = json.loads(entry.subtasks)
-    subtask_status_info = subtask_dict['status']
-    if current_task_id not in subtask_status_info:
+    subtask_status = get_subtask_status(entry_id, current_task_id)
+    if subtask_status is None:
         format_str = "Unexpected task_id '{}': unable to find status for subtask of instructor task '{}': rejecting task {}"
         msg = format_str.format(current_task_id, entry, new_subtask_status)
         TASK_LOG.warning(msg)
@@ -417,7 +492,6 @@ def check_subtask_is_valid(entry_id, current_task_id, new_subtask_status):
 
     # Confirm that the InstructorTask doesn't think that this subtask has already been
     # performed successfully.
-    subtask_status = SubtaskStatus.from_dict(subtask_status_info[current_task_id])
     subtask_state = subtask_status.state
     if subtask_state in READY_STATES:
         format_str = "Unexpected task_id '{}': already completed - status {} for subtask of instructor task '{}': rejecting task {}"
@@ -451,20 +525,26 @@ def check_subtask_is_valid(entry_id, current_task_id, new_subtask_status):
         raise DuplicateTaskException(msg)
 
 
-def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_count=0):
+def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_count=0, complete_task=True):
     """
-    Update the status of the subtask in the parent InstructorTask object tracking its progress.
+    Update the status of the subtask in the InstructorSubtask tracking it, and the progress of the parent
+    InstructorTask.
 
-    Because select_for_update is used to lock the InstructorTask object while it is being updated,
-    multiple subtasks updating at the same time may time out while waiting for the lock.
-    The actual update operation is surrounded by a try/except/else that permits the update to be
-    retried if the transaction times out.
+    Multiple subtasks completing at the same time may time out while waiting for the lock on the
+    parent InstructorTask's counter of completed subtasks.  The actual update operation is
+    surrounded by a try/except/else that permits the update to be retried if the transaction
+    times out.
 
     The subtask lock acquired in the call to check_subtask_is_valid() is released here, only when
     the attempting of retries has concluded.
+
+    If `complete_task` is false, the InstructorTask is left running when its last subtask
+    completes, for the caller to finish its work and then call `complete_instructor_task`.
+
+    Returns True if this update completed the last of the InstructorTask's subtasks.
     """
     try:
-        _update_subtask_status(entry_id, current_task_id, new_subtask_status)
+        return _update_subtask_status(entry_id, current_task_id, new_subtask_status, complete_task)
     except DatabaseError:
         # If we fail, try again recursively.
         retry_count += 1
@@ -472,7 +552,7 @@ def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_c
             TASK_LOG.info("Retrying to update status for subtask %s of instructor task %d with status %s:  retry %d",
                           current_task_id, entry_id, new_subtask_status, retry_count)
             dog_stats_api.increment('instructor_task.subtask.retry_after_failed_update')
-            update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_count)
+            return update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_count, complete_task)
         else:
             TASK_LOG.info("Failed to update status after %d retries for subtask %s of instructor task %d with status %s",
                           retry_count, current_task_id, entry_id, new_subtask_status)
@@ -486,91 +566,71 @@ def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_c
 
 
 @transaction.commit_manually
-def _update_subtask_status(entry_id, current_task_id, new_subtask_status):
+def _update_subtask_status(entry_id, current_task_id, new_subtask_status, complete_task=True):
     """
-    Update the status of the subtask in the parent InstructorTask object tracking its progress.
+    Update the status of the subtask in the InstructorSubtask tracking it.
 
-    Uses select_for_update to lock the InstructorTask object while it is being updated.
     The operation is surrounded by a try/except/else that permit the manual transaction to be
     committed on completion, or rolled back on error.
 
+    Only the subtask's own InstructorSubtask entry is written while the subtask is running or
+    retrying, so subtasks don't wait on each other, and the cost of an update doesn't grow with
+    the number of subtasks.  The progress of the parent InstructorTask is summed up from these
+    entries when it is read (see get_subtask_progress).  A subtask that is already done is not
+    updated again, so that its counts are only added in once.
+
+    When the subtask is done, the parent InstructorTask's "subtasks_completed" counter is
+    incremented in place.  Once it matches the 'total' in the "subtasks" field, this is the
+    last subtask to complete, and the InstructorTask is updated with the final results:
+
     The InstructorTask's "task_output" field is updated.  This is a JSON-serialized dict.
-    Accumulates values for 'attempted', 'succeeded', 'failed', 'skipped' from `new_subtask_status`
-    into the corresponding values in the InstructorTask's task_output.  Also updates the 'duration_ms'
-    value with the current interval since the original InstructorTask started.  Note that this
-    value is only approximate, since the subtask may be running on a different server than the
-    original task, so is subject to clock skew.
+    Values for 'attempted', 'succeeded', 'failed', 'skipped' are totalled up from the
+    InstructorSubtask entries.  Also updates the 'duration_ms' value with the current interval
+    since the original InstructorTask started.  Note that this value is only approximate, since
+    the subtask may be running on a different server than the original task, so is subject to
+    clock skew.
 
     The InstructorTask's "subtasks" field is also updated.  This is also a JSON-serialized dict.
-    Keys include 'total', 'succeeded', 'retried', 'failed', which are counters for the number of
-    subtasks.  'Total' is expected to have been set at the time the subtasks were created.
-    The other three counters are incremented depending on the value of `status`.  Once the counters
-    for 'succeeded' and 'failed' match the 'total', the subtasks are done and the InstructorTask's
-    "status" is changed to SUCCESS.
+    Keys include 'total', 'succeeded', 'failed', which are counters for the number of subtasks.
+    'Total' is expected to have been set at the time the subtasks were created, and the other
+    two are counted up from the states of the subtasks.  The InstructorTask's "status" is
+    changed to SUCCESS.  Unless `complete_task` is false, in which case all this is left to
+    a later call of `complete_instructor_task`.
 
-    The "subtasks" field also contains a 'status' key, that contains a dict that stores status
-    information for each subtask.  At the moment, the value for each subtask (keyed by its task_id)
-    is the value of the SubtaskStatus.to_dict(), but could be expanded in future to store information
-    about failure messages, progress made, etc.
+    Returns True if this update completed the last of the InstructorTask's subtasks.
     """
     TASK_LOG.info("Preparing to update status for subtask %s for instructor task %d with status %s",
                   current_task_id, entry_id, new_subtask_status)
 
     try:
-        entry = InstructorTask.objects.select_for_update().get(pk=entry_id)
-        subtask_dict = json.loads(entry.subtasks)
-        subtask_status_info = subtask_dict['status']
-        if current_task_id not in subtask_status_info:
-            # unexpected error -- raise an exception
-            format_str = "Unexpected task_id '{}': unable to update status for subtask of instructor task '{}'"
-            msg = format_str.format(current_task_id, entry_id)
-            TASK_LOG.warning(msg)
-            raise ValueError(msg)
-
-        # Update status:
-        subtask_status_info[current_task_id] = new_subtask_status.to_dict()
-
-        # Update the parent task progress.
-        # Set the estimate of duration, but only if it
-        # increases.  Clock skew between time() returned by different machines
-        # may result in non-monotonic values for duration.
-        task_progress = json.loads(entry.task_output)
-        start_time = task_progress['start_time']
-        prev_duration = task_progress['duration_ms']
-        new_duration = int((time() - start_time) * 1000)
-        task_progress['duration_ms'] = max(prev_duration, new_duration)
-
-        # Update counts only when subtask is done.
-        # In future, we can make this more responsive by updating status
-        # between retries, by comparing counts that change from previous
-        # retry.
         new_state = new_subtask_status.state
-        if new_subtask_status is not None and new_state in READY_STATES:
-            for statname in ['attempted', 'succeeded', 'failed', 'skipped']:
-                task_progress[statname] += getattr(new_subtask_status, statname)
-
-        # Figure out if we're actually done (i.e. this is the last task to complete).
-        # This is easier if we just maintain a counter, rather than scanning the
-        # entire new_subtask_status dict.
-        if new_state == SUCCESS:
-            subtask_dict['succeeded'] += 1
+        subtask_fields = {name: getattr(new_subtask_status, name) for name in SUBTASK_STATUS_COUNTERS}
+        num_updated = InstructorSubtask.objects.filter(
+            instructor_task_id=entry_id, task_id=current_task_id
+        ).exclude(state__in=READY_STATES).update(state=new_state, **subtask_fields)
+
+        is_last_subtask = False
+        if num_updated == 0:
+            if not InstructorSubtask.objects.filter(instructor_task_id=entry_id, task_id=current_task_id).exists():
+                # unexpected error -- raise an exception
+                format_str = "Unexpected task_id '{}': unable to update status for subtask of instructor task '{}'"
+                msg = format_str.format(current_task_id, entry_id)
+                TASK_LOG.warning(msg)
+                raise ValueError(msg)
+            TASK_LOG.warning("Subtask %s of instructor task %d already completed: ignoring status %s",
+                             current_task_id, entry_id, new_subtask_status)
         elif new_state in READY_STATES:
-            subtask_dict['failed'] += 1
-        num_remaining = subtask_dict['total'] - subtask_dict['succeeded'] - subtask_dict['failed']
-
-        # If we're done with the last task, update the parent status to indicate that.
-        # At present, we mark the task as having succeeded.  In future, we should see
-        # if there was a catastrophic failure that occurred, and figure out how to
-        # report that here.
-        if num_remaining <= 0:
-            entry.task_state = SUCCESS
-        entry.subtasks = json.dumps(subtask_dict)
-        entry.task_output = InstructorTask.create_output_for_success(task_progress)
-
-        TASK_LOG.debug("about to save....")
-        entry.save()
-        TASK_LOG.info("Task output updated to %s for subtask %s of instructor task %d",
-                      entry.task_output, current_task_id, entry_id)
+            # Count the subtask as done.  The update locks the InstructorTask's row until
+            # the commit, so exactly one subtask sees the count reach the total.
+            InstructorTask.objects.filter(pk=entry_id).update(subtasks_completed=F('subtasks_completed') + 1)
+            entry = InstructorTask.objects.select_for_update().get(pk=entry_id)
+            subtask_dict = json.loads(entry.subtasks)
+            is_last_subtask = entry.subtasks_completed >= subtask_dict['total']
+            if is_last_subtask and complete_task:
+                _complete_instructor_task(entry, subtask_dict)
+
+        TASK_LOG.info("Status updated to %s for subtask %s of instructor task %d",
+                      new_subtask_status, current_task_id, entry_id)
     except Exception:
         TASK_LOG.exception("Unexpected error while updating InstructorTask.")
         transaction.rollback()
@@ -579,3 +639,57 @@ def _update_subtask_status(entry_id, current_task_id, new_subtask_status):
     else:
         TASK_LOG.debug("about to commit....")
         transaction.commit()
+        return is_last_subtask
+
+
+@transaction.commit_on_success
+def complete_instructor_task(entry_id, exception=None, traceback_string=None):
+    """
+    Totals up the results of all the subtasks of InstructorTask `entry_id`, and marks it as done.
+
+    For use once the last subtask has completed, when its status was updated with
+    `complete_task` false.  If `exception` is given, the InstructorTask is marked as having
+    failed with it, rather than as having succeeded.
+    """
+    entry = InstructorTask.objects.select_for_update().get(pk=entry_id)
+    _complete_instructor_task(entry, json.loads(entry.subtasks), exception, traceback_string)
+
+
+def _complete_instructor_task(entry, subtask_dict, exception=None, traceback_string=None):
+    """
+    Totals up the results of all the subtasks of `entry`, and marks it as having succeeded,
+    or as having failed with `exception` if one is given.
+
+    Called within the transaction of the update that completed the last subtask, or of
+    `complete_instructor_task`.  The InstructorSubtask entries are read with
+    select_for_update, so that the totals come from their latest committed values.
+    """
+    task_progress = json.loads(entry.task_output)
+    subtask_dict['succeeded'] = 0
+    subtask_dict['failed'] = 0
+    subtask_results = InstructorSubtask.objects.select_for_update().filter(
+        instructor_task_id=entry.id
+    ).values_list('state', *PROGRESS_COUNTERS)
+    for result in subtask_results:
+        state, counts = result[0], result[1:]
+        for statname, count in zip(PROGRESS_COUNTERS, counts):
+            task_progress[statname] += count
+        if state == SUCCESS:
+            subtask_dict['succeeded'] += 1
+        else:
+            subtask_dict['failed'] += 1
+    _update_duration(task_progress)
+
+    # Unless the caller reports a failure of the task as a whole, we mark it as
+    # having succeeded: failures of individual subtasks show up in the counts.
+    entry.subtasks = json.dumps(subtask_dict)
+    if exception is None:
+        entry.task_state = SUCCESS
+        entry.task_output = InstructorTask.create_output_for_success(task_progress)
+    else:
+        entry.task_state = FAILURE
+        entry.task_output = InstructorTask.create_output_for_failure(exception, traceback_string)
+
+    TASK_LOG.debug("about to save....")
+    entry.save()
+    TASK_LOG.info("Task output updated to %s for instructor task %d", entry.task_output, entry.id)
@@ -31,6 +31,7 @@ from instructor_task.tasks_helper import (
     reset_attempts_module_state,
     delete_problem_module_state,
     upload_grades_csv,
+    grade_students_for_report_part,
     upload_students_csv,
     cohort_students_and_upload
 )
@@ -144,6 +145,19 @@ def calculate_grades_csv(entry_id, xmodule_instance_args):
     return run_main_task(entry_id, task_fn, action_name)
 
 
+@task(routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
+def calculate_grades_csv_part(entry_id, student_ids, part_index, subtask_status_dict):
+    """
+    Grade one chunk of the students of a course for a grade report that has
+    been split across subtasks by `calculate_grades_csv`.
+
+    `student_ids` are the ids of the students to grade, `part_index` is the
+    position of this chunk in the final report and `subtask_status_dict` is
+    the initial SubtaskStatus of this subtask, as a dict.
+    """
+    return grade_students_for_report_part(entry_id, student_ids, part_index, subtask_status_dict)
+
+
 @task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
 def calculate_students_features_csv(entry_id, xmodule_instance_args):
     """
@@ -3,17 +3,23 @@ This file contains tasks that are designed to perform background operations on t
 running state of a course.
 
 """
+import itertools
 import json
+from cStringIO import StringIO
 from datetime import datetime
 from time import time
+import traceback
 import unicodecsv
 
 from celery import Task, current_task
 from celery.utils.log import get_task_logger
 from celery.states import SUCCESS, FAILURE
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
 from django.core.files.storage import DefaultStorage
 from django.db import transaction, reset_queries
+from django.db.models import Sum
 import dogstats_wrapper as dog_stats_api
 from pytz import UTC
 
@@ -26,9 +32,16 @@ from courseware.grades import iterate_grades_for
 from courseware.models import StudentModule
 from courseware.model_data import FieldDataCache
 from courseware.module_render import get_module_for_descriptor_internal
-from instructor_analytics.basic import enrolled_students_features
-from instructor_analytics.csvs import format_dictlist
-from instructor_task.models import ReportStore, InstructorTask, PROGRESS
+from instructor_analytics.basic import iter_enrolled_students_features
+from instructor_analytics.csvs import iter_dictlist
+from instructor_task.models import ReportStore, InstructorTask, InstructorSubtask, PROGRESS
+from instructor_task.subtasks import (
+    SubtaskStatus,
+    check_subtask_is_valid,
+    complete_instructor_task,
+    queue_subtasks_for_query,
+    update_subtask_status,
+)
 from lms.djangoapps.lms_xblock.runtime import LmsPartitionService
 from openedx.core.djangoapps.course_groups.cohorts import get_cohort
 from openedx.core.djangoapps.course_groups.models import CourseUserGroup
@@ -47,6 +60,9 @@ UPDATE_STATUS_SUCCEEDED = 'succeeded'
 UPDATE_STATUS_FAILED = 'failed'
 UPDATE_STATUS_SKIPPED = 'skipped'
 
+# number of StudentModules whose students' data is loaded together by perform_module_state_update
+MODULE_STATE_UPDATE_BATCH_SIZE = 100
+
 
 class BaseInstructorTask(Task):
     """
@@ -273,8 +289,10 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
 
     The `update_fcn` is called on each StudentModule that passes the resulting filtering.
     It is passed three arguments:  the module_descriptor for the module pointed to by the
-    module_state_key, the particular StudentModule to update, and the xmodule_instance_args being
-    passed through.  If the value returned by the update function evaluates to a boolean True,
+    module_state_key, the particular StudentModule to update, and a function returning the
+    FieldDataCache for the module's student.  StudentModules are handled in batches, and the
+    FieldDataCaches of a batch's students are loaded together the first time one is needed.
+    If the value returned by the update function evaluates to a boolean True,
     the update is successful; False indicates the update on the particular student module failed.
     A raised exception indicates a fatal condition -- that no other student modules should be considered.
 
@@ -324,26 +342,61 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     task_progress = TaskProgress(action_name, modules_to_update.count(), start_time)
     task_progress.update_task_state()
 
-    for module_to_update in modules_to_update:
-        task_progress.attempted += 1
-        # There is no try here:  if there's an error, we let it throw, and the task will
-        # be marked as FAILED, with a stack trace.
-        with dog_stats_api.timer('instructor_tasks.module.time.step', tags=[u'action:{name}'.format(name=action_name)]):
-            update_status = update_fcn(module_descriptor, module_to_update)
-            if update_status == UPDATE_STATUS_SUCCEEDED:
-                # If the update_fcn returns true, then it performed some kind of work.
-                # Logging of failures is left to the update_fcn itself.
-                task_progress.succeeded += 1
-            elif update_status == UPDATE_STATUS_FAILED:
-                task_progress.failed += 1
-            elif update_status == UPDATE_STATUS_SKIPPED:
-                task_progress.skipped += 1
-            else:
-                raise UpdateProblemModuleStateError("Unexpected update_status returned: {}".format(update_status))
+    modules_to_update = iter(modules_to_update.select_related('student'))
+    while True:
+        batch = list(itertools.islice(modules_to_update, MODULE_STATE_UPDATE_BATCH_SIZE))
+        if not batch:
+            break
+        get_field_data_cache = _lazy_field_data_caches(
+            course_id, [module_to_update.student for module_to_update in batch], module_descriptor
+        )
+        for module_to_update in batch:
+            task_progress.attempted += 1
+            # There is no try here:  if there's an error, we let it throw, and the task will
+            # be marked as FAILED, with a stack trace.
+            with dog_stats_api.timer(
+                'instructor_tasks.module.time.step', tags=[u'action:{name}'.format(name=action_name)]
+            ):
+                update_status = update_fcn(module_descriptor, module_to_update, get_field_data_cache)
+                if update_status == UPDATE_STATUS_SUCCEEDED:
+                    # If the update_fcn returns true, then it performed some kind of work.
+                    # Logging of failures is left to the update_fcn itself.
+                    task_progress.succeeded += 1
+                elif update_status == UPDATE_STATUS_FAILED:
+                    task_progress.failed += 1
+                elif update_status == UPDATE_STATUS_SKIPPED:
+                    task_progress.skipped += 1
+                else:
+                    raise UpdateProblemModuleStateError("Unexpected update_status returned: {}".format(update_status))
 
     return task_progress.update_task_state()
 
 
+def _lazy_field_data_caches(course_id, students, module_descriptor):
+    """
+    Return a function which returns the FieldDataCache for `module_descriptor`
+    of any of `students`. The data shared by all `students` is loaded together
+    the first time it's called. Each student's StudentModules are read when
+    their cache is asked for, so that a submission they've made since the
+    batch started isn't overwritten with older state.
+    """
+    field_data_caches = []
+
+    def get_field_data_cache(student):
+        """
+        Return the FieldDataCache of `student`, loading all of them if need be
+        """
+        if not field_data_caches:
+            field_data_caches.append(FieldDataCache.cache_for_users(
+                course_id, students, module_descriptor, load_user_state=False
+            ))
+        field_data_cache = field_data_caches[0][student.id]
+        field_data_cache.reload_user_state()
+        return field_data_cache
+
+    return get_field_data_cache
+
+
 def _get_task_id_from_xmodule_args(xmodule_instance_args):
     """Gets task_id from `xmodule_instance_args` dict, or returns default value if missing."""
     return xmodule_instance_args.get('task_id', UNKNOWN_TASK_ID) if xmodule_instance_args is not None else UNKNOWN_TASK_ID
@@ -371,16 +424,19 @@ def _get_track_function_for_task(student, xmodule_instance_args=None, source_pag
 
 
 def _get_module_instance_for_task(course_id, student, module_descriptor, xmodule_instance_args=None,
-                                  grade_bucket_type=None):
+                                  grade_bucket_type=None, field_data_cache=None):
     """
     Fetches a StudentModule instance for a given `course_id`, `student` object, and `module_descriptor`.
 
     `xmodule_instance_args` is used to provide information for creating a track function and an XQueue callback.
     These are passed, along with `grade_bucket_type`, to get_module_for_descriptor_internal, which sidesteps
     the need for a Request object when instantiating an xmodule instance.
+
+    `field_data_cache` is the student's FieldDataCache for `module_descriptor`, loaded here if not given.
     """
     # reconstitute the problem's corresponding XModule:
-    field_data_cache = FieldDataCache.cache_for_descriptor_descendents(course_id, student, module_descriptor)
+    if field_data_cache is None:
+        field_data_cache = FieldDataCache.cache_for_descriptor_descendents(course_id, student, module_descriptor)
 
     # get request-related tracking information from args passthrough, and supplement with task-specific
     # information:
@@ -414,7 +470,7 @@ def _get_module_instance_for_task(course_id, student, module_descriptor, xmodule
 
 
 @transaction.autocommit
-def rescore_problem_module_state(xmodule_instance_args, module_descriptor, student_module):
+def rescore_problem_module_state(xmodule_instance_args, module_descriptor, student_module, get_field_data_cache=None):
     '''
     Takes an XModule descriptor and a corresponding StudentModule object, and
     performs rescoring on the student's problem submission.
@@ -430,7 +486,11 @@ def rescore_problem_module_state(xmodule_instance_args, module_descriptor, stude
     course_id = student_module.course_id
     student = student_module.student
     usage_key = student_module.module_state_key
-    instance = _get_module_instance_for_task(course_id, student, module_descriptor, xmodule_instance_args, grade_bucket_type='rescore')
+    field_data_cache = get_field_data_cache(student) if get_field_data_cache is not None else None
+    instance = _get_module_instance_for_task(
+        course_id, student, module_descriptor, xmodule_instance_args, grade_bucket_type='rescore',
+        field_data_cache=field_data_cache
+    )
 
     if instance is None:
         # Either permissions just changed, or someone is trying to be clever
@@ -464,7 +524,7 @@ def rescore_problem_module_state(xmodule_instance_args, module_descriptor, stude
 
 
 @transaction.autocommit
-def reset_attempts_module_state(xmodule_instance_args, _module_descriptor, student_module):
+def reset_attempts_module_state(xmodule_instance_args, _module_descriptor, student_module, _get_field_data_cache=None):
     """
     Resets problem attempts to zero for specified `student_module`.
 
@@ -491,7 +551,7 @@ def reset_attempts_module_state(xmodule_instance_args, _module_descriptor, stude
 
 
 @transaction.autocommit
-def delete_problem_module_state(xmodule_instance_args, _module_descriptor, student_module):
+def delete_problem_module_state(xmodule_instance_args, _module_descriptor, student_module, _get_field_data_cache=None):
     """
     Delete the StudentModule entry.
 
@@ -516,6 +576,8 @@ def upload_csv_to_report_store(rows, csv_name, course_id, timestamp):
                 [row1_colum1, row1_colum2, ...],
                 ...
             ]
+            Any iterable of rows can be passed; a generator is written out
+            as it is consumed, without being held in memory.
         csv_name: Name of the resulting CSV
         course_id: ID of the course
     """
@@ -531,40 +593,27 @@ def upload_csv_to_report_store(rows, csv_name, course_id, timestamp):
     )
 
 
-def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
+def _grade_report_rows(course, students, task_progress, err_rows, status_interval=None):
     """
-    For a given `course_id`, generate a grades CSV file for all students that
-    are enrolled, and store using a `ReportStore`. Once created, the files can
-    be accessed by instantiating another `ReportStore` (via
-    `ReportStore.from_config()`) and calling `link_for()` on it. Writes are
-    buffered, so we'll never write part of a CSV file to S3 -- i.e. any files
-    that are visible in ReportStore will be complete ones.
+    Grade `students` in `course` and yield the rows of their grade report,
+    starting with the header row.
 
-    As we start to add more CSV downloads, it will probably be worthwhile to
-    make a more general CSVDoc class instead of building out the rows like we
-    do here.
+    `task_progress` counts are updated as students are graded, and every
+    `status_interval` students the task state is updated as well. Rows for
+    students that could not be graded are appended to `err_rows` instead.
     """
-    start_time = time()
-    start_date = datetime.now(UTC)
-    status_interval = 100
-    enrolled_students = CourseEnrollment.users_enrolled_in(course_id)
-    task_progress = TaskProgress(action_name, enrolled_students.count(), start_time)
-
-    course = get_course_by_id(course_id)
+    course_id = course.id
     cohorts_header = ['Cohort Name'] if course.is_cohorted else []
 
     partition_service = LmsPartitionService(user=None, course_id=course_id)
     partitions = partition_service.course_partitions
     group_configs_header = ['Group Configuration Group Name ({})'.format(partition.name) for partition in partitions]
 
-    # Loop over all our students and build our CSV lists in memory
-    header = None
-    rows = []
-    err_rows = [["id", "username", "error_msg"]]
     current_step = {'step': 'Calculating Grades'}
-    for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students):
+    header = None
+    for student, gradeset, err_msg in iterate_grades_for(course_id, students):
         # Periodically update task status (this is a cache write)
-        if task_progress.attempted % status_interval == 0:
+        if status_interval and task_progress.attempted % status_interval == 0:
             task_progress.update_task_state(extra_meta=current_step)
         task_progress.attempted += 1
 
@@ -573,9 +622,7 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
             task_progress.succeeded += 1
             if not header:
                 header = [section['label'] for section in gradeset[u'section_breakdown']]
-                rows.append(
-                    ["id", "email", "username", "grade"] + header + cohorts_header + group_configs_header
-                )
+                yield ["id", "email", "username", "grade"] + header + cohorts_header + group_configs_header
 
             percents = {
                 section['label']: section.get('percent', 0.0)
@@ -600,7 +647,7 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
             # possible for a student to have a 0.0 show up in their row but
             # still have 100% for the course.
             row_percents = [percents.get(label, 0.0) for label in header]
-            rows.append(
+            yield (
                 [student.id, student.email, student.username, gradeset['percent']] +
                 row_percents + cohorts_group_name + group_configs_group_names
             )
@@ -609,13 +656,47 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
             task_progress.failed += 1
             err_rows.append([student.id, student.username, err_msg])
 
-    # By this point, we've got the rows we're going to stuff into our CSV files.
-    current_step = {'step': 'Uploading CSVs'}
-    task_progress.update_task_state(extra_meta=current_step)
 
-    # Perform the actual upload
+def upload_grades_csv(_xmodule_instance_args, entry_id, course_id, _task_input, action_name):
+    """
+    For a given `course_id`, generate a grades CSV file for all students that
+    are enrolled, and store using a `ReportStore`. Once created, the files can
+    be accessed by instantiating another `ReportStore` (via
+    `ReportStore.from_config()`) and calling `link_for()` on it.
+
+    Rows are generated as students are graded and streamed to the
+    `ReportStore`, so memory use doesn't depend on the number of students.
+    The `ReportStore` only makes the file visible once it's complete, so we'll
+    never expose part of a CSV file.
+
+    Courses with more than `settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK`
+    enrolled students are instead graded in parallel by subtasks, see
+    `queue_grade_report_subtasks`.
+    """
+    start_time = time()
+    start_date = datetime.now(UTC)
+    status_interval = 100
+    enrolled_students = CourseEnrollment.users_enrolled_in(course_id)
+    num_students = enrolled_students.count()
+
+    students_per_task = settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK
+    if students_per_task and num_students > students_per_task:
+        return queue_grade_report_subtasks(entry_id, course_id, action_name, enrolled_students, students_per_task)
+
+    task_progress = TaskProgress(action_name, num_students, start_time)
+    course = get_course_by_id(course_id)
+
+    # Students that couldn't be graded are rare, so their rows are kept in
+    # memory and written out once all the grades are.
+    err_rows = [["id", "username", "error_msg"]]
+
+    # Grading happens as the report store consumes the rows
+    rows = _grade_report_rows(course, enrolled_students.iterator(), task_progress, err_rows, status_interval)
     upload_csv_to_report_store(rows, 'grade_report', course_id, start_date)
 
+    current_step = {'step': 'Uploading CSVs'}
+    task_progress.update_task_state(extra_meta=current_step)
+
     # If there are any error rows (don't count the header), write them out as well
     if len(err_rows) > 1:
         upload_csv_to_report_store(err_rows, 'grade_report_err', course_id, start_date)
@@ -624,11 +705,223 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     return task_progress.update_task_state(extra_meta=current_step)
 
 
+def _grade_report_part_name(entry, part_index, csv_name):
+    """
+    Return the name in `DefaultStorage` of the partial `csv_name` CSV written
+    by subtask number `part_index` of the InstructorTask `entry`.
+    """
+    return u"grade_report_parts/{task_id}/{part_index:05d}_{csv_name}.csv".format(
+        task_id=entry.task_id,
+        part_index=part_index,
+        csv_name=csv_name,
+    )
+
+
+def queue_grade_report_subtasks(entry_id, course_id, action_name, enrolled_students, students_per_task):
+    """
+    Split the grading of `enrolled_students` into subtasks of at most
+    `students_per_task` students each, and queue them.
+
+    Each subtask stores its part of the report with
+    `grade_students_for_report_part`, and the last one to finish merges all
+    the parts into the final report with `merge_grade_report_parts` before it
+    marks the InstructorTask as done. Progress is aggregated into the
+    InstructorTask by the subtasks themselves.
+    """
+    # Imported here, as instructor_task.tasks imports this module.
+    from instructor_task.tasks import calculate_grades_csv_part
+
+    entry = InstructorTask.objects.get(pk=entry_id)
+
+    # As with bulk email, don't define a second raft of subtasks if this task
+    # gets run again after they've been queued.
+    if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+        TASK_LOG.warning(u"Task %s has already queued its grade report subtasks", entry.task_id)
+        return json.loads(entry.task_output)
+
+    part_indexes = itertools.count()
+
+    def _create_grades_subtask(student_list, initial_subtask_status):
+        """Creates a subtask to grade a given list of students."""
+        return calculate_grades_csv_part.subtask(
+            (
+                entry_id,
+                [student['pk'] for student in student_list],
+                next(part_indexes),
+                initial_subtask_status.to_dict(),
+            ),
+            task_id=initial_subtask_status.task_id,
+            routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+        )
+
+    return queue_subtasks_for_query(
+        entry,
+        action_name,
+        _create_grades_subtask,
+        enrolled_students.order_by('id'),
+        [],
+        students_per_task,
+    )
+
+
+def grade_students_for_report_part(entry_id, student_ids, part_index, subtask_status_dict):
+    """
+    Grade the students with ids `student_ids` as subtask number `part_index`
+    of a grade report, and store their rows as a part of the report.
+
+    If grading fails, the part is stored as error rows for all the students
+    instead. Once the last subtask of the report has completed, the parts are
+    merged into the final report, and only then is the InstructorTask marked
+    as done.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    entry = InstructorTask.objects.get(pk=entry_id)
+    task_progress = TaskProgress(entry.task_type, len(student_ids), time())
+    try:
+        course = get_course_by_id(entry.course_id)
+        students = User.objects.filter(id__in=student_ids).order_by('id')
+        err_rows = [["id", "username", "error_msg"]]
+        rows = list(_grade_report_rows(course, students, task_progress, err_rows))
+
+        storage = DefaultStorage()
+        if rows:
+            _store_grade_report_part(storage, _grade_report_part_name(entry, part_index, 'grade_report'), rows)
+        if len(err_rows) > 1:
+            _store_grade_report_part(storage, _grade_report_part_name(entry, part_index, 'grade_report_err'), err_rows)
+    except Exception as exc:
+        TASK_LOG.exception(u"Grade report subtask %s of instructor task %d failed", current_task_id, entry_id)
+        # We don't know how far grading got, so count all students as failed.
+        _store_failed_grade_report_part(entry, part_index, student_ids, exc)
+        subtask_status.increment(failed=len(student_ids), state=FAILURE)
+        if update_subtask_status(entry_id, current_task_id, subtask_status, complete_task=False):
+            _finish_grade_report(entry_id)
+        raise
+
+    subtask_status.increment(succeeded=task_progress.succeeded, failed=task_progress.failed, state=SUCCESS)
+    if update_subtask_status(entry_id, current_task_id, subtask_status, complete_task=False):
+        _finish_grade_report(entry_id)
+    return subtask_status.to_dict()
+
+
+def _store_failed_grade_report_part(entry, part_index, student_ids, exc):
+    """
+    Replace whatever subtask number `part_index` of the grade report of `entry`
+    stored with error rows for all of its `student_ids`, failed with `exc`.
+
+    Errors are only logged: if the rows can't be stored, the merge finds them
+    missing and fails the report.
+    """
+    storage = DefaultStorage()
+    try:
+        for csv_name in ('grade_report', 'grade_report_err'):
+            name = _grade_report_part_name(entry, part_index, csv_name)
+            if storage.exists(name):
+                storage.delete(name)
+        usernames = dict(User.objects.filter(id__in=student_ids).values_list('id', 'username'))
+        err_msg = u"Grade report subtask failed: {}".format(exc)
+        err_rows = [["id", "username", "error_msg"]]
+        err_rows.extend([student_id, usernames.get(student_id, u''), err_msg] for student_id in sorted(student_ids))
+        _store_grade_report_part(storage, _grade_report_part_name(entry, part_index, 'grade_report_err'), err_rows)
+    except Exception:  # pylint: disable=broad-except
+        TASK_LOG.exception(u"Could not store the error rows of grade report part %d of %s", part_index, entry.task_id)
+
+
+def _finish_grade_report(entry_id):
+    """
+    Merge the parts of the grade report of InstructorTask `entry_id` once its
+    last subtask has completed, then mark the InstructorTask as done: as
+    having failed, if the merge did.
+    """
+    try:
+        merge_grade_report_parts(entry_id)
+    except Exception as exc:
+        TASK_LOG.exception(u"Could not merge the grade report parts of instructor task %d", entry_id)
+        complete_instructor_task(entry_id, exc, traceback.format_exc())
+        raise
+    complete_instructor_task(entry_id)
+
+
+def _store_grade_report_part(storage, name, rows):
+    """Write `rows` as a utf-8 CSV file named `name` in `storage`."""
+    output_buffer = StringIO()
+    csvwriter = unicodecsv.writer(output_buffer, encoding='utf-8')
+    csvwriter.writerows(rows)
+    storage.save(name, ContentFile(output_buffer.getvalue()))
+
+
+def _merged_grade_report_rows(storage, part_names):
+    """
+    Yield the rows of the partial CSVs named `part_names` in `storage`, in
+    order, keeping only the first part's header row. Each part is deleted
+    once it has been read.
+    """
+    header_seen = False
+    for name in part_names:
+        with storage.open(name) as part_file:
+            reader = unicodecsv.reader(part_file, encoding='utf-8')
+            header = next(reader)
+            if not header_seen:
+                header_seen = True
+                yield header
+            for row in reader:
+                yield row
+        storage.delete(name)
+
+
+def _count_grade_report_part_rows(storage, part_names):
+    """Count the rows, other than the header rows, of the partial CSVs named `part_names` in `storage`."""
+    count = 0
+    for name in part_names:
+        with storage.open(name) as part_file:
+            count += sum(1 for __ in unicodecsv.reader(part_file, encoding='utf-8')) - 1
+    return count
+
+
+def merge_grade_report_parts(entry_id):
+    """
+    Merge the partial grade reports stored by the subtasks of the
+    InstructorTask `entry_id` into the final reports, and store them using a
+    `ReportStore`.
+
+    Raises ValueError, and stores nothing, if the parts don't have a row for
+    every student the subtasks attempted.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+    num_parts = json.loads(entry.subtasks)['total']
+    storage = DefaultStorage()
+
+    part_names = {}
+    for csv_name in ('grade_report', 'grade_report_err'):
+        part_names[csv_name] = [
+            name for name in (_grade_report_part_name(entry, index, csv_name) for index in xrange(num_parts))
+            if storage.exists(name)
+        ]
+
+    num_attempted = InstructorSubtask.objects.filter(
+        instructor_task_id=entry_id
+    ).aggregate(Sum('attempted'))['attempted__sum'] or 0
+    num_rows = sum(_count_grade_report_part_rows(storage, names) for names in part_names.values())
+    if num_rows != num_attempted:
+        raise ValueError(u"Grade report parts have {} rows for {} students".format(num_rows, num_attempted))
+
+    for csv_name in ('grade_report', 'grade_report_err'):
+        # A grade report is always uploaded, but an error report only if
+        # some students couldn't be graded.
+        if part_names[csv_name] or csv_name == 'grade_report':
+            upload_csv_to_report_store(
+                _merged_grade_report_rows(storage, part_names[csv_name]), csv_name, entry.course_id, entry.created
+            )
+
+
 def upload_students_csv(_xmodule_instance_args, _entry_id, course_id, task_input, action_name):
     """
     For a given `course_id`, generate a CSV file containing profile
     information for all students that are enrolled, and store using a
-    `ReportStore`.
+    `ReportStore`. Rows are streamed to the `ReportStore` as the students
+    are read from the database.
     """
     start_time = time()
     start_date = datetime.now(UTC)
@@ -638,20 +931,23 @@ def upload_students_csv(_xmodule_instance_args, _entry_id, course_id, task_input
 
     # compute the student features table and format it
     query_features = task_input.get('features')
-    student_data = enrolled_students_features(course_id, query_features)
-    header, rows = format_dictlist(student_data, query_features)
-
-    task_progress.attempted = task_progress.succeeded = len(rows)
-    task_progress.skipped = task_progress.total - task_progress.attempted
-
-    rows.insert(0, header)
+    student_data = iter_enrolled_students_features(course_id, query_features)
+    header, rows = iter_dictlist(student_data, query_features)
 
-    current_step = {'step': 'Uploading CSV'}
-    task_progress.update_task_state(extra_meta=current_step)
+    def counted_rows():
+        """Yield the header and rows of the report, counting the students."""
+        yield header
+        for row in rows:
+            task_progress.attempted += 1
+            yield row
 
     # Perform the upload
-    upload_csv_to_report_store(rows, 'student_profile_info', course_id, start_date)
+    upload_csv_to_report_store(counted_rows(), 'student_profile_info', course_id, start_date)
 
+    task_progress.succeeded = task_progress.attempted
+    task_progress.skipped = task_progress.total - task_progress.attempted
+
+    current_step = {'step': 'Uploading CSV'}
     return task_progress.update_task_state(extra_meta=current_step)
 
 
@@ -3,7 +3,9 @@ Tests for instructor_task/models.py.
 """
 
 from cStringIO import StringIO
+from gzip import GzipFile
 import mock
+import os
 import time
 from datetime import datetime
 from unittest import TestCase
@@ -30,10 +32,40 @@ class MockKey(object):
         return "http://fake-edx-s3.edx.org/"
 
 
+class MockMultiPartUpload(object):
+    """
+    Mocking a boto S3 MultiPartUpload object.
+    """
+    def __init__(self, bucket, key_name):
+        self.bucket = bucket
+        self.key_name = key_name
+        self.parts = []
+        self.completed = False
+
+    def upload_part_from_file(self, fp, part_num):
+        """ Expected method on a MultiPartUpload object. """
+        self.parts.append((part_num, fp.read()))
+
+    def complete_upload(self):
+        """ Expected method on a MultiPartUpload object. """
+        self.completed = True
+
+    def cancel_upload(self):
+        """ Expected method on a MultiPartUpload object. """
+        self.parts = []
+
+
 class MockBucket(object):
     """ Mocking a boto S3 Bucket object. """
     def __init__(self, _name):
         self.keys = []
+        self.multipart_uploads = []
+
+    def initiate_multipart_upload(self, key_name, headers):  # pylint: disable=unused-argument
+        """ Expected method on a Bucket object. """
+        multipart_upload = MockMultiPartUpload(self, key_name)
+        self.multipart_uploads.append(multipart_upload)
+        return multipart_upload
 
     def store_key(self, key):
         """ Not a Bucket method, created just to store the keys in the Bucket for testing purposes. """
@@ -93,6 +125,29 @@ class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase
         """ Create and return a LocalFSReportStore. """
         return LocalFSReportStore.from_config()
 
+    def test_store_rows_from_generator(self):
+        report_store = self.create_report_store()
+        report_store.store_rows(self.course_id, 'report.csv', ([i, u'r\xf6w'] for i in xrange(3)))
+
+        with open(report_store.path_to(self.course_id, 'report.csv')) as report_file:
+            self.assertEqual(report_file.read().splitlines(), ['{},r\xc3\xb6w'.format(i) for i in xrange(3)])
+        # The temporary file has been moved into place
+        self.assertEqual(
+            [name for name in os.listdir(report_store.root_path) if name.endswith('.tmp')],
+            []
+        )
+
+    def test_store_rows_failure_leaves_no_file(self):
+        def failing_rows():
+            """ Yield a row, then fail. """
+            yield ['row']
+            raise ValueError()
+
+        report_store = self.create_report_store()
+        with self.assertRaises(ValueError):
+            report_store.store_rows(self.course_id, 'report.csv', failing_rows())
+        self.assertEqual(report_store.links_for(self.course_id), [])
+
 
 @mock.patch('instructor_task.models.S3Connection', new=MockS3Connection)
 @mock.patch('instructor_task.models.Key', new=MockKey)
@@ -105,3 +160,29 @@ class S3ReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase):
     def create_report_store(self):
         """ Create and return a S3ReportStore. """
         return S3ReportStore.from_config()
+
+    def test_store_rows_single_part(self):
+        report_store = self.create_report_store()
+        report_store.store_rows(self.course_id, 'report.csv', [['a', 'b']])
+        self.assertEqual(len(report_store.bucket.keys), 1)
+        self.assertEqual(report_store.bucket.multipart_uploads, [])
+
+    @mock.patch('instructor_task.models.S3ReportStore.MULTIPART_CHUNK_SIZE', 64)
+    def test_store_rows_multipart(self):
+        report_store = self.create_report_store()
+        # Random data, so that the compressed output spans several parts
+        expected_rows = [os.urandom(500).encode('hex') for _ in xrange(100)]
+        report_store.store_rows(self.course_id, 'report.csv', ([row] for row in expected_rows))
+
+        self.assertEqual(report_store.bucket.keys, [])
+        multipart_upload, = report_store.bucket.multipart_uploads
+        self.assertTrue(multipart_upload.completed)
+        self.assertGreater(len(multipart_upload.parts), 1)
+        self.assertEqual(
+            [part_num for part_num, _data in multipart_upload.parts],
+            range(1, len(multipart_upload.parts) + 1)
+        )
+
+        data = ''.join(data for _part_num, data in multipart_upload.parts)
+        content = GzipFile(fileobj=StringIO(data)).read()
+        self.assertEqual(content.splitlines(), expected_rows)
@@ -1,13 +1,24 @@
 """
 Unit tests for instructor_task subtasks.
 """
+import json
 from uuid import uuid4
 
+from celery.states import SUCCESS, FAILURE, RETRY
 from mock import Mock, patch
 
 from student.models import CourseEnrollment
 
-from instructor_task.subtasks import queue_subtasks_for_query
+from instructor_task.models import InstructorTask, PROGRESS
+from instructor_task.subtasks import (
+    SubtaskStatus,
+    complete_instructor_task,
+    get_subtask_progress,
+    get_subtask_status,
+    initialize_subtask_info,
+    queue_subtasks_for_query,
+    update_subtask_status,
+)
 from instructor_task.tests.factories import InstructorTaskFactory
 from instructor_task.tests.test_base import InstructorTaskCourseTestCase
 
@@ -79,3 +90,103 @@ class TestSubtasks(InstructorTaskCourseTestCase):
         self.assertEqual(len(mock_create_subtask_fcn_args[0][0][0]), 3)
         self.assertEqual(len(mock_create_subtask_fcn_args[1][0][0]), 3)
         self.assertEqual(len(mock_create_subtask_fcn_args[2][0][0]), 5)
+
+    def test_queue_subtasks_for_query_shrinking(self):
+        """Test queue_subtasks_for_query() if there are fewer items than were counted."""
+
+        instructor_task = InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_id=str(uuid4()),
+            task_key='dummy_task_key',
+            task_type='bulk_course_email',
+        )
+        self._enroll_students_in_course(self.course.id, 7)
+        task_queryset = CourseEnrollment.objects.filter(course_id=self.course.id)
+
+        def initialize_subtask_info(*args):  # pylint: disable=unused-argument
+            """Instead of initializing subtask info unenroll some students from the course."""
+            enrollment_ids = list(task_queryset.values_list('id', flat=True)[:4])
+            CourseEnrollment.objects.filter(id__in=enrollment_ids).delete()
+            return {}
+
+        mock_create_subtask_fcn = Mock()
+        with patch('instructor_task.subtasks.initialize_subtask_info') as mock_initialize_subtask_info:
+            mock_initialize_subtask_info.side_effect = initialize_subtask_info
+            queue_subtasks_for_query(
+                entry=instructor_task,
+                action_name='action_name',
+                create_subtask_fcn=mock_create_subtask_fcn,
+                item_queryset=task_queryset,
+                item_fields=[],
+                items_per_task=3,
+            )
+
+        # All three subtasks counted are queued, those left without items with none.
+        mock_create_subtask_fcn_args = mock_create_subtask_fcn.call_args_list
+        self.assertEqual([len(args[0][0]) for args in mock_create_subtask_fcn_args], [3, 0, 0])
+
+    def test_update_subtask_status(self):
+        """Test that subtasks' statuses are totalled up on read, and by the last subtask to complete."""
+        entry = InstructorTaskFactory.create(course_id=self.course.id, task_id=str(uuid4()), task_key='dummy_task_key')
+        subtask_ids = ['subtask-1', 'subtask-2', 'subtask-3']
+        initialize_subtask_info(entry, 'emailed', 30, subtask_ids)
+
+        retried = SubtaskStatus.create('subtask-1', state=RETRY, retried_nomax=1)
+        self.assertFalse(update_subtask_status(entry.id, 'subtask-1', retried))
+        self.assertEqual(get_subtask_status(entry.id, 'subtask-1').get_retry_count(), 1)
+        self.assertFalse(update_subtask_status(
+            entry.id, 'subtask-1', SubtaskStatus.create('subtask-1', succeeded=10, state=SUCCESS)
+        ))
+        self.assertFalse(update_subtask_status(
+            entry.id, 'subtask-2', SubtaskStatus.create('subtask-2', succeeded=8, failed=2, state=FAILURE)
+        ))
+        # A subtask that has completed is only counted once.
+        self.assertFalse(update_subtask_status(
+            entry.id, 'subtask-2', SubtaskStatus.create('subtask-2', succeeded=10, state=SUCCESS)
+        ))
+
+        entry = InstructorTask.objects.get(id=entry.id)
+        self.assertEqual(entry.task_state, PROGRESS)
+        progress = get_subtask_progress(entry)
+        self.assertEqual(progress['attempted'], 20)
+        self.assertEqual(progress['succeeded'], 18)
+        self.assertEqual(progress['failed'], 2)
+
+        self.assertTrue(update_subtask_status(
+            entry.id, 'subtask-3', SubtaskStatus.create('subtask-3', succeeded=10, state=SUCCESS)
+        ))
+        entry = InstructorTask.objects.get(id=entry.id)
+        self.assertEqual(entry.task_state, SUCCESS)
+        task_output = json.loads(entry.task_output)
+        self.assertEqual(task_output['attempted'], 30)
+        self.assertEqual(task_output['succeeded'], 28)
+        self.assertEqual(task_output['failed'], 2)
+        self.assertEqual(json.loads(entry.subtasks), {'total': 3, 'succeeded': 2, 'failed': 1})
+
+    def test_complete_task_later(self):
+        """Test that the InstructorTask can be left running after its last subtask, and completed later."""
+        entry = InstructorTaskFactory.create(course_id=self.course.id, task_id=str(uuid4()), task_key='dummy_task_key')
+        initialize_subtask_info(entry, 'emailed', 10, ['subtask-1'])
+
+        self.assertTrue(update_subtask_status(
+            entry.id, 'subtask-1', SubtaskStatus.create('subtask-1', succeeded=10, state=SUCCESS), complete_task=False
+        ))
+        self.assertEqual(InstructorTask.objects.get(id=entry.id).task_state, PROGRESS)
+
+        complete_instructor_task(entry.id)
+        entry = InstructorTask.objects.get(id=entry.id)
+        self.assertEqual(entry.task_state, SUCCESS)
+        self.assertEqual(json.loads(entry.task_output)['succeeded'], 10)
+
+    def test_complete_task_with_failure(self):
+        """Test that completing the InstructorTask with an exception marks it as failed."""
+        entry = InstructorTaskFactory.create(course_id=self.course.id, task_id=str(uuid4()), task_key='dummy_task_key')
+        initialize_subtask_info(entry, 'emailed', 10, ['subtask-1'])
+        update_subtask_status(
+            entry.id, 'subtask-1', SubtaskStatus.create('subtask-1', succeeded=10, state=SUCCESS), complete_task=False
+        )
+
+        complete_instructor_task(entry.id, ValueError("Could not finish"), None)
+        entry = InstructorTask.objects.get(id=entry.id)
+        self.assertEqual(entry.task_state, FAILURE)
+        self.assertEqual(json.loads(entry.task_output)['message'], "Could not finish")
@@ -11,10 +11,12 @@ from uuid import uuid4
 from mock import Mock, MagicMock, patch
 
 from celery.states import SUCCESS, FAILURE
+from xblock.fields import Scope
 
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from opaque_keys.edx.locations import i4xEncoder
 
+from courseware.model_data import FieldDataCache
 from courseware.models import StudentModule
 from courseware.tests.factories import StudentModuleFactory
 from student.tests.factories import UserFactory, CourseEnrollmentFactory
@@ -258,6 +260,50 @@ class TestRescoreInstructorTask(TestInstructorTasks):
         self.assertEquals(output.get('action_name'), 'rescored')
         self.assertGreater(output.get('duration_ms'), 0)
 
+    def test_rescoring_loads_field_data_caches_together(self):
+        input_state = json.dumps({'done': True})
+        num_students = 10
+        students = self._create_students_with_state(num_students, input_state)
+        task_entry = self._create_input_entry()
+        mock_instance = Mock()
+        mock_instance.rescore_problem = Mock(return_value={'success': 'correct'})
+        with patch('instructor_task.tasks_helper.get_module_for_descriptor_internal') as mock_get_module:
+            mock_get_module.return_value = mock_instance
+            with patch(
+                'instructor_task.tasks_helper.FieldDataCache.cache_for_users',
+                wraps=FieldDataCache.cache_for_users
+            ) as mock_cache_for_users:
+                self._run_task_with_mock_celery(rescore_problem, task_entry.id, task_entry.task_id)
+        # the students' data was loaded once, and each module got its own student's cache
+        self.assertEquals(mock_cache_for_users.call_count, 1)
+        self.assertEquals(
+            sorted(call[1]['field_data_cache'].user.id for call in mock_get_module.call_args_list),
+            sorted(student.id for student in students)
+        )
+
+    def test_rescoring_reads_current_state(self):
+        input_state = json.dumps({'done': True})
+        new_state = json.dumps({'done': True, 'attempts': 2})
+        self._create_students_with_state(2, input_state)
+        task_entry = self._create_input_entry()
+        mock_instance = Mock()
+        mock_instance.rescore_problem = Mock(return_value={'success': 'correct'})
+        states = []
+
+        def get_module(**kwargs):
+            """Change the other student's state while the first is rescored, and record what each one saw."""
+            if not states:
+                StudentModule.objects.exclude(student=kwargs['user']).update(state=new_state)
+            states.append([
+                field_object.state for key, field_object in kwargs['field_data_cache'].cache.items()
+                if key[0] == Scope.user_state
+            ])
+            return mock_instance
+
+        with patch('instructor_task.tasks_helper.get_module_for_descriptor_internal', side_effect=get_module):
+            self._run_task_with_mock_celery(rescore_problem, task_entry.id, task_entry.task_id)
+        self.assertEquals(states, [[input_state], [new_state]])
+
     def test_rescoring_bad_result(self):
         # Confirm that rescoring does not succeed if "success" key is not an expected value.
         input_state = json.dumps({'done': True})
@@ -7,9 +7,14 @@ Tests that CSV grade report generation works with unicode emails.
 
 """
 import ddt
+import json
 from mock import Mock, patch
 import tempfile
 import unicodecsv
+from uuid import uuid4
+
+from celery.states import SUCCESS, FAILURE
+from django.conf import settings
 
 from xmodule.modulestore.tests.factories import CourseFactory
 from student.tests.factories import UserFactory
@@ -17,8 +22,10 @@ from student.models import CourseEnrollment
 from xmodule.partitions.partitions import Group, UserPartition
 
 from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory
-from instructor_task.models import ReportStore
+from instructor_task.models import InstructorTask, ReportStore
 from instructor_task.tasks_helper import cohort_students_and_upload, upload_grades_csv, upload_students_csv
+from courseware.grades import iterate_grades_for
+from instructor_task.tests.factories import InstructorTaskFactory
 from instructor_task.tests.test_base import InstructorTaskCourseTestCase, TestReportMixin
 
 
@@ -157,6 +164,106 @@ class TestInstructorGradeReport(TestReportMixin, InstructorTaskCourseTestCase):
         result = upload_grades_csv(None, None, self.course.id, None, 'graded')
         self.assertDictContainsSubset({'attempted': 1, 'succeeded': 1, 'failed': 0}, result)
 
+    @patch('instructor_task.tasks_helper._get_current_task')
+    def test_grading_in_subtasks(self, _mock_current_task):
+        """
+        Test that a grade report split across subtasks is merged into a
+        single report, with progress aggregated into the InstructorTask.
+        """
+        usernames = ['student{}'.format(i) for i in range(5)]
+        for username in usernames:
+            self.create_student(username)
+        entry = InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_id=str(uuid4()),
+            task_type='grade_course',
+        )
+
+        with patch.object(settings, 'GRADES_DOWNLOAD_STUDENTS_PER_TASK', 2):
+            upload_grades_csv(None, entry.id, self.course.id, None, 'graded')
+
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(entry.task_state, SUCCESS)
+        self.assertEqual(json.loads(entry.subtasks)['total'], 3)
+        self.assertDictContainsSubset(
+            {'attempted': 5, 'succeeded': 5, 'failed': 0},
+            json.loads(entry.task_output)
+        )
+
+        report_store = ReportStore.from_config()
+        links = report_store.links_for(self.course.id)
+        self.assertEqual(len(links), 1)
+        with open(report_store.path_to(self.course.id, links[0][0])) as csv_file:
+            self.assertEqual(
+                sorted(row['username'] for row in unicodecsv.DictReader(csv_file)),
+                usernames
+            )
+
+    @patch('instructor_task.tasks_helper._get_current_task')
+    def test_grading_subtask_failure(self, _mock_current_task):
+        """
+        Test that the students of a subtask which fails are in the error
+        report, and the rest in the grade report.
+        """
+        usernames = ['student{}'.format(i) for i in range(5)]
+        for username in usernames:
+            self.create_student(username)
+        entry = InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_id=str(uuid4()),
+            task_type='grade_course',
+        )
+
+        def fail_for_student2(course_id, students):
+            """Fail to grade the chunk with student2 in it"""
+            students = list(students)
+            if 'student2' in [student.username for student in students]:
+                raise Exception("Grading failed")
+            return iterate_grades_for(course_id, students)
+
+        with patch.object(settings, 'GRADES_DOWNLOAD_STUDENTS_PER_TASK', 2):
+            with patch('instructor_task.tasks_helper.iterate_grades_for', side_effect=fail_for_student2):
+                upload_grades_csv(None, entry.id, self.course.id, None, 'graded')
+
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(entry.task_state, SUCCESS)
+        self.assertDictContainsSubset(
+            {'attempted': 5, 'succeeded': 3, 'failed': 2},
+            json.loads(entry.task_output)
+        )
+
+        report_store = ReportStore.from_config()
+        usernames_by_report = {}
+        for filename, __ in report_store.links_for(self.course.id):
+            report = 'grade_report_err' if 'grade_report_err' in filename else 'grade_report'
+            with open(report_store.path_to(self.course.id, filename)) as csv_file:
+                usernames_by_report[report] = sorted(row['username'] for row in unicodecsv.DictReader(csv_file))
+        self.assertEqual(usernames_by_report['grade_report'], ['student0', 'student1', 'student4'])
+        self.assertEqual(usernames_by_report['grade_report_err'], ['student2', 'student3'])
+
+    @patch('instructor_task.tasks_helper._get_current_task')
+    def test_grade_report_merge_failure(self, _mock_current_task):
+        """
+        Test that the InstructorTask fails, rather than succeeds with no
+        report, if the parts of the report can't be merged.
+        """
+        for i in range(3):
+            self.create_student('student{}'.format(i))
+        entry = InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_id=str(uuid4()),
+            task_type='grade_course',
+        )
+
+        with patch.object(settings, 'GRADES_DOWNLOAD_STUDENTS_PER_TASK', 2):
+            with patch('instructor_task.tasks_helper._merged_grade_report_rows', side_effect=Exception("Merge failed")):
+                upload_grades_csv(None, entry.id, self.course.id, None, 'graded')
+
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(entry.task_state, FAILURE)
+        self.assertEqual(json.loads(entry.task_output)['message'], "Merge failed")
+        self.assertEqual(ReportStore.from_config().links_for(self.course.id), [])
+
 
 @ddt.ddt
 class TestStudentReport(TestReportMixin, InstructorTaskCourseTestCase):
@@ -250,6 +250,10 @@ VIRTUAL_UNIVERSITIES = ENV_TOKENS.get('VIRTUAL_UNIVERSITIES', [])
 META_UNIVERSITIES = ENV_TOKENS.get('META_UNIVERSITIES', {})
 COMMENTS_SERVICE_URL = ENV_TOKENS.get("COMMENTS_SERVICE_URL", '')
 COMMENTS_SERVICE_KEY = ENV_TOKENS.get("COMMENTS_SERVICE_KEY", '')
+COMMENTS_SERVICE_POOL_SIZE = ENV_TOKENS.get("COMMENTS_SERVICE_POOL_SIZE", COMMENTS_SERVICE_POOL_SIZE)
+COMMENTS_SERVICE_MAX_RETRIES = ENV_TOKENS.get("COMMENTS_SERVICE_MAX_RETRIES", COMMENTS_SERVICE_MAX_RETRIES)
+COMMENTS_SERVICE_KEEP_ALIVE = ENV_TOKENS.get("COMMENTS_SERVICE_KEEP_ALIVE", COMMENTS_SERVICE_KEEP_ALIVE)
+COMMENTS_SERVICE_CONCURRENCY = ENV_TOKENS.get("COMMENTS_SERVICE_CONCURRENCY", COMMENTS_SERVICE_CONCURRENCY)
 CERT_QUEUE = ENV_TOKENS.get("CERT_QUEUE", 'test-pull')
 ZENDESK_URL = ENV_TOKENS.get("ZENDESK_URL")
 FEEDBACK_SUBMISSION_EMAIL = ENV_TOKENS.get("FEEDBACK_SUBMISSION_EMAIL")
@@ -349,6 +353,8 @@ XQUEUE_INTERFACE = AUTH_TOKENS['XQUEUE_INTERFACE']
 # Get the MODULESTORE from auth.json, but if it doesn't exist,
 # use the one from common.py
 MODULESTORE = convert_module_store_setting_if_needed(AUTH_TOKENS.get('MODULESTORE', MODULESTORE))
+SPLIT_STRUCTURE_CACHE_SIZE = ENV_TOKENS.get('SPLIT_STRUCTURE_CACHE_SIZE', SPLIT_STRUCTURE_CACHE_SIZE)
+STATIC_CONTENT_DISK_CACHE_DIR = ENV_TOKENS.get('STATIC_CONTENT_DISK_CACHE_DIR', STATIC_CONTENT_DISK_CACHE_DIR)
 CONTENTSTORE = AUTH_TOKENS.get('CONTENTSTORE', CONTENTSTORE)
 DOC_STORE_CONFIG = AUTH_TOKENS.get('DOC_STORE_CONFIG', DOC_STORE_CONFIG)
 MONGODB_LOG = AUTH_TOKENS.get('MONGODB_LOG', {})
@@ -423,6 +429,9 @@ VERIFY_STUDENT = AUTH_TOKENS.get("VERIFY_STUDENT", VERIFY_STUDENT)
 GRADES_DOWNLOAD_ROUTING_KEY = HIGH_MEM_QUEUE
 
 GRADES_DOWNLOAD = ENV_TOKENS.get("GRADES_DOWNLOAD", GRADES_DOWNLOAD)
+GRADES_DOWNLOAD_STUDENTS_PER_TASK = ENV_TOKENS.get(
+    "GRADES_DOWNLOAD_STUDENTS_PER_TASK", GRADES_DOWNLOAD_STUDENTS_PER_TASK
+)
 
 ##### ORA2 ######
 # Prefix for uploads of example-based assessment AI classifiers
@@ -64,6 +64,16 @@ DISCUSSION_SETTINGS = {
     'MAX_COMMENT_DEPTH': 2,
 }
 
+# Connections kept open to the comments service by each process, and how many
+# times to retry a GET request that failed to get a response.  Other requests
+# are never retried, as they could be applied twice.
+COMMENTS_SERVICE_POOL_SIZE = 10
+COMMENTS_SERVICE_MAX_RETRIES = 1
+COMMENTS_SERVICE_KEEP_ALIVE = True
+# Threads each process uses to make independent comments service requests at
+# the same time.  1 makes them one after another.
+COMMENTS_SERVICE_CONCURRENCY = 4
+
 
 # Features
 FEATURES = {
@@ -335,6 +345,10 @@ FEATURES = {
 
     # Courseware search feature
     'ENABLE_COURSEWARE_SEARCH': False,
+
+    # Persist students' subsection grades and reuse them in grade() and
+    # progress_summary() until the student's scores or the course change
+    'ENABLE_PERSISTENT_GRADES': False,
 }
 
 # Ignore static asset files on import which match this pattern
@@ -659,6 +673,15 @@ MODULESTORE = {
     }
 }
 
+# Number of split modulestore structures each process keeps in memory. Loaded structures are
+# also shared between processes through the 'course_structure_cache' cache, if one is configured.
+# Set to 0 (and leave 'course_structure_cache' out of CACHES) to always read structures from mongo.
+SPLIT_STRUCTURE_CACHE_SIZE = 100
+
+# Directory in which StaticContentServer caches assets too large for memcached, so repeat
+# downloads don't read them from GridFS. None disables the disk cache.
+STATIC_CONTENT_DISK_CACHE_DIR = None
+
 #################### Python sandbox ############################################
 
 CODE_JAIL = {
@@ -672,6 +695,14 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # Warm sandbox processes kept by each LMS process for capa code.  A size
+    # of 0 starts a new sandboxed process for every execution.
+    'pool': {
+        'size': 0,
+        # How many executions before a process is replaced?
+        'max_uses': 100,
+    },
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
@@ -1704,6 +1735,11 @@ GRADES_DOWNLOAD = {
     'ROOT_PATH': '/tmp/edx-s3/grades',
 }
 
+# Grade reports for courses with more enrolled students than this are split
+# into subtasks grading this many students each, which run in parallel.
+# Set to None to always grade a course in a single task.
+GRADES_DOWNLOAD_STUDENTS_PER_TASK = 2000
+
 ######################## PROGRESS SUCCESS BUTTON ##############################
 # The following fields are available in the URL: {course_id} {student_id}
 PROGRESS_SUCCESS_BUTTON_URL = 'http://<domain>/<path>/{course_id}'
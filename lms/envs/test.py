@@ -155,6 +155,8 @@ update_module_store_settings(
         'collection': 'test_modulestore{0}'.format(THIS_UUID),
     },
 )
+# Keep mongo query counts in tests independent of which tests ran before
+SPLIT_STRUCTURE_CACHE_SIZE = 0
 
 CONTENTSTORE = {
     'ENGINE': 'xmodule.contentstore.mongo.MongoContentStore',
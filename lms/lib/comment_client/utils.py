@@ -1,10 +1,17 @@
 from contextlib import contextmanager
+from cookielib import DefaultCookiePolicy
 import dogstats_wrapper as dog_stats_api
 import logging
+from multiprocessing.pool import ThreadPool
+import os
 import requests
+from requests.adapters import HTTPAdapter
+import sys
+import threading
 from django.conf import settings
 from time import time
 from uuid import uuid4
+from django.utils import translation
 from django.utils.translation import get_language
 
 log = logging.getLogger(__name__)
@@ -31,6 +38,102 @@ def merge_dict(dic1, dic2):
     return dict(dic1.items() + dic2.items())
 
 
+# The only requests which are retried.  urllib3 sends a request again not only
+# when it couldn't connect, but after a read timeout or a dropped connection
+# too, which could create a post or count a vote twice.
+RETRIED_METHODS = frozenset(['get', 'head'])
+
+_sessions = {}
+_thread_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _check_pid():
+    """
+    Forget the session and thread pool if we're not the process that made
+    them: a forked process mustn't share its parent's connections.  Call with
+    _pool_lock held.
+    """
+    global _sessions, _thread_pool, _pool_pid  # pylint: disable=global-statement
+    if _pool_pid != os.getpid():
+        _sessions = {}
+        _thread_pool = None
+        _pool_pid = os.getpid()
+
+
+def get_session(method='get'):
+    """
+    Return the process-wide `requests.Session` for making `method` requests
+    to the comments service, which keeps a pool of connections to it alive
+    between requests.
+
+    The pool size comes from the COMMENTS_SERVICE_POOL_SIZE setting.  Only
+    RETRIED_METHODS requests are retried if they fail to get a response, as
+    many times as the COMMENTS_SERVICE_MAX_RETRIES setting says; others have
+    a session of their own which never retries them.  The sessions are shared
+    by the requests of every user, so they never keep cookies.
+    """
+    retried = method.lower() in RETRIED_METHODS
+    with _pool_lock:
+        _check_pid()
+        if retried not in _sessions:
+            pool_size = getattr(settings, "COMMENTS_SERVICE_POOL_SIZE", 10)
+            adapter = HTTPAdapter(
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+                max_retries=getattr(settings, "COMMENTS_SERVICE_MAX_RETRIES", 1) if retried else 0,
+            )
+            session = requests.Session()
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[retried] = session
+        return _sessions[retried]
+
+
+def call_concurrently(*calls):
+    """
+    Make independent calls to the comments service at the same time.
+
+    Each of `calls` is a function of no arguments, like
+    `lambda: cc.Thread.find(thread_id).retrieve()`.  They're run on a
+    process-wide pool of COMMENTS_SERVICE_CONCURRENCY threads, so they
+    mustn't touch the database.  Returns a list of their results, in the
+    order of `calls`.  If any of them raised an exception, the first one's
+    is raised instead.
+    """
+    global _thread_pool  # pylint: disable=global-statement
+    concurrency = getattr(settings, "COMMENTS_SERVICE_CONCURRENCY", 4)
+    if concurrency <= 1 or len(calls) <= 1:
+        return [call() for call in calls]
+
+    with _pool_lock:
+        _check_pid()
+        if _thread_pool is None:
+            _thread_pool = ThreadPool(concurrency)
+        thread_pool = _thread_pool
+
+    # The language is per thread, and goes in our requests' headers.
+    language = get_language()
+
+    def run(call):
+        """Return call's result and None, or None and the exc_info of what it raised."""
+        try:
+            with translation.override(language):
+                return call(), None
+        except Exception:  # pylint: disable=broad-except
+            return None, sys.exc_info()
+
+    results = []
+    for result, exc_info in thread_pool.map(run, calls):
+        if exc_info is not None:
+            # re-raise with the traceback from the pool thread
+            raise exc_info[0], exc_info[1], exc_info[2]
+        results.append(result)
+    return results
+
+
 @contextmanager
 def request_timer(request_id, method, url, tags=None):
     start = time()
@@ -66,6 +169,8 @@ def perform_request(method, url, data_or_params=None, raw=False,
         'X-Edx-Api-Key': getattr(settings, "COMMENTS_SERVICE_KEY", None),
         'Accept-Language': get_language(),
     }
+    if not getattr(settings, "COMMENTS_SERVICE_KEEP_ALIVE", True):
+        headers['Connection'] = 'close'
     request_id = uuid4()
     request_id_dict = {'request_id': request_id}
 
@@ -76,7 +181,7 @@ def perform_request(method, url, data_or_params=None, raw=False,
         data = None
         params = merge_dict(data_or_params, request_id_dict)
     with request_timer(request_id, method, url, metric_tags):
-        response = requests.request(
+        response = get_session(method).request(
             method,
             url,
             data=data,
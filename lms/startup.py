@@ -39,6 +39,9 @@ def run():
     if settings.FEATURES.get('ENABLE_THIRD_PARTY_AUTH', False):
         enable_third_party_auth()
 
+    if settings.CODE_JAIL.get('pool', {}).get('size'):
+        enable_sandbox_pool()
+
     # Initialize Segment.io analytics module. Flushes first time a message is received and
     # every 50 messages thereafter, or if 10 seconds have passed since last flush
     if settings.FEATURES.get('SEGMENT_IO_LMS') and hasattr(settings, 'SEGMENT_IO_LMS_KEY'):
@@ -197,3 +200,13 @@ def get_keyword_function_map():
     }
 
     return kf_map
+
+
+def enable_sandbox_pool():
+    """
+    Run capa's Python code in a pool of warm sandbox processes, configured by
+    settings.CODE_JAIL['pool'].
+    """
+    from capa.safe_exec import configure_pool
+
+    configure_pool(**settings.CODE_JAIL['pool'])